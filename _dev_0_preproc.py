@@ -1,91 +1,295 @@
-from datasets import load_dataset
+import re
+from itertools import chain
+from typing import Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-# Load the dataset
-ds = load_dataset("wykonos/movies")["train"]
-df = ds.to_pandas()
+# Near-duplicate detection (MinHash/LSH over overviews)
+SHINGLE_SIZE = 3  # Words per shingle
+NUM_PERM = 64  # MinHash signature length
+LSH_BANDS = 16  # 16 bands of 4 rows: pairs above ~0.5 Jaccard are likely candidates
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Estimated Jaccard similarity of overview shingles
+MAX_BUCKET_SIZE = 100  # Larger LSH buckets are only paired with their first member
+# Short overviews ("A documentary about war.") are shared by unrelated movies, so they never match
+MIN_OVERVIEW_WORDS = 10
+# An overview shared by this many distinct titles is a placeholder, not a duplicate
+PLACEHOLDER_MIN_TITLES = 5
+# Besides their overviews, duplicates must have similar titles (re-releases) or years (translations)
+TITLE_SIMILARITY_THRESHOLD = 0.5  # Jaccard similarity of title words
+MAX_YEAR_DIFFERENCE = 1
 
-print(f"Original dataset size: {len(df)}")
 
-# Convert release_date to datetime and extract year
-df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
-df["year"] = df["release_date"].dt.year
+def load_raw_dataset() -> pd.DataFrame:
+    from datasets import load_dataset
 
-# Filter out rows with missing dates or revenue
-df_filtered = df.dropna(subset=["release_date", "year", "revenue"])
+    # Load the dataset
+    ds = load_dataset("wykonos/movies")["train"]
+    return ds.to_pandas()
 
-# Apply new filtering criteria: top 50k by vote_count OR revenue > 1M
-# First, get movie with vote count > 100
-df_vote_count_filter = df_filtered[df_filtered["vote_count"] > 100]
 
-# Then get movies with revenue > 1M
-df_high_revenue = df_filtered[df_filtered["revenue"] > 1000000]
+def _shingle_hashes(texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    64-bit hashes of the word shingles of texts, all concatenated, and the number per text.
+    Words are hashed once (vectorized, by pandas) and combined into shingles with numpy.
+    """
+    words = [re.findall(r"\w+", (text or "").lower()) for text in texts]
+    word_counts = np.array([len(text_words) for text_words in words])
+    word_hashes = pd.util.hash_array(np.array(list(chain.from_iterable(words)), dtype=object))
+    # A shingle starts at every word but the last SHINGLE_SIZE - 1 of each text
+    shingle_counts = np.maximum(word_counts - SHINGLE_SIZE + 1, 0)
+    text_starts = np.concatenate([[0], np.cumsum(word_counts)[:-1]])
+    starts = np.repeat(text_starts, shingle_counts) + (
+        np.arange(shingle_counts.sum()) - np.repeat(np.cumsum(shingle_counts) - shingle_counts, shingle_counts)
+    )
+    hashes = np.zeros(len(starts), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for i in range(SHINGLE_SIZE):
+            hashes = hashes * np.uint64(0x9E3779B97F4A7C15) + word_hashes[starts + i]
+    return hashes, shingle_counts
 
-# Combine both sets and remove duplicates based on movie ID
-df_filtered = pd.concat([df_vote_count_filter, df_high_revenue]).drop_duplicates(
-    subset=["id"]
-)
 
-# Also remove duplicates based on title and overview (content-based deduplication)
-df_filtered = df_filtered.drop_duplicates(subset=["title", "overview"])
+def minhash_signatures(texts: list[str], seed: int = 0, chunk_size: int = 50000) -> tuple[np.ndarray, np.ndarray]:
+    """
+    MinHash signatures (len(texts) x NUM_PERM) of the texts' shingle sets, and a mask of the
+    texts that have shingles at all. Each permutation is a multiply-shift hash; the minimum per
+    text is taken over all shingles at once with np.minimum.reduceat, a chunk of texts at a time.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)  # Odd multipliers
+    b = rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+    signatures = np.full((len(texts), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    has_shingles = np.zeros(len(texts), dtype=bool)
 
-# Filter to only include movies from 1930 onwards
-df_filtered = df_filtered[df_filtered["year"] >= 1930]
+    for start in range(0, len(texts), chunk_size):
+        values, counts = _shingle_hashes(texts[start : start + chunk_size])
+        rows = np.flatnonzero(counts)
+        if not len(rows):
+            continue
+        offsets = np.concatenate([[0], np.cumsum(counts[rows])[:-1]])
+        with np.errstate(over="ignore"):  # Multiply-shift hashing relies on wrapping around 2**64
+            for k in range(NUM_PERM):
+                hashed = ((a[k] * values + b[k]) >> np.uint64(32)).astype(np.uint32)
+                signatures[start + rows, k] = np.minimum.reduceat(hashed, offsets)
+        has_shingles[start + rows] = True
+    return signatures, has_shingles
 
-print(
-    f"Filtered dataset size (top 50k by vote_count OR revenue > $1M, duplicates removed, 1930+ only): {len(df_filtered)}"
-)
-print(f"Year range: {df_filtered['year'].min()} - {df_filtered['year'].max()}")
 
-# Get top 1000 movies by revenue for each year
-top_movies_by_year = []
+def _candidate_pairs(signatures: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Pairs of rows sharing an LSH bucket in at least one band, as an (n, 2) array. Each band's
+    rows are hashed to one key and sorted, so a bucket is a run of equal keys: the cost is a
+    sort per band, not a comparison per pair of movies.
+    """
+    rows_per_band = NUM_PERM // LSH_BANDS
+    multipliers = np.random.default_rng(1).integers(1, 2**63, rows_per_band, dtype=np.uint64) | np.uint64(1)
+    pairs = []
+    for band in range(LSH_BANDS):
+        with np.errstate(over="ignore"):
+            keys = (
+                signatures[rows, band * rows_per_band : (band + 1) * rows_per_band].astype(np.uint64) * multipliers
+            ).sum(axis=1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]]))
+        ends = np.concatenate([starts[1:], [len(keys)]])
+        for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+            members = rows[order[start:end]]
+            if len(members) > MAX_BUCKET_SIZE:
+                pairs.append(np.column_stack([np.full(len(members) - 1, members[0]), members[1:]]))
+            else:
+                i, j = np.triu_indices(len(members), k=1)
+                pairs.append(np.column_stack([members[i], members[j]]))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(pairs, axis=0)
 
-for year in sorted(df_filtered["year"].unique()):
-    year_data = df_filtered[df_filtered["year"] == year]
 
-    if len(year_data) > 0:
-        # Sort by revenue in descending order and get top 1000
-        year_top = year_data.sort_values(by="revenue", ascending=False).head(1000)
-        top_movies_by_year.append(year_top)
+def _clusters(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Cluster label per row, joining the rows of each pair (union-find)."""
+    parent = np.arange(n)
 
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in pairs:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    return np.array([find(x) for x in range(n)])
+
+
+def find_near_duplicates(df: pd.DataFrame, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> pd.DataFrame:
+    """
+    Clusters of movies whose overviews are near-duplicates (e.g. re-releases and copies of
+    the same movie), by MinHash/LSH: only movies sharing an LSH bucket are compared, and a
+    pair is kept if its estimated Jaccard similarity is at least `threshold`, and the
+    movies also have similar titles or release years.
+
+    Overviews shorter than MIN_OVERVIEW_WORDS, or shared by PLACEHOLDER_MIN_TITLES distinct
+    titles ("No overview found."), say too little to tell movies apart, and never match.
+
+    Returns one row per clustered movie, with its `cluster` (the position of its first
+    member in `df`) and whether it is the one `kept`: the most voted in its cluster.
+    """
+    overview_words = df["overview"].fillna("").str.lower().str.findall(r"\w+")
+    title_words = df["title"].fillna("").str.lower().str.findall(r"\w+")
+    overview_key = overview_words.str.join(" ")
+    titles_per_overview = title_words.str.join(" ").groupby(overview_key.values).transform("nunique")
+    eligible = (overview_words.str.len() >= MIN_OVERVIEW_WORDS) & (titles_per_overview < PLACEHOLDER_MIN_TITLES)
+
+    signatures, has_shingles = minhash_signatures(df["overview"].fillna("").tolist())
+    pairs = _candidate_pairs(signatures, np.flatnonzero(has_shingles & eligible.to_numpy()))
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    pairs = pairs[similarity >= threshold]
+
+    # Second signal: similar titles, or release years at most MAX_YEAR_DIFFERENCE apart
+    years = df["year"].to_numpy(dtype=float)
+    title_sets = [set(words) for words in title_words]
+    similar_year = np.abs(years[pairs[:, 0]] - years[pairs[:, 1]]) <= MAX_YEAR_DIFFERENCE
+    similar_title = np.array(
+        [
+            len(title_sets[i] & title_sets[j]) >= TITLE_SIMILARITY_THRESHOLD * len(title_sets[i] | title_sets[j]) > 0
+            for i, j in pairs
+        ],
+        dtype=bool,
+    )
+    pairs = pairs[similar_year | similar_title]
+
+    labels = _clusters(len(df), pairs)
+    clustered = np.flatnonzero(np.bincount(labels, minlength=len(df))[labels] > 1)
+    report = df.iloc[clustered][["id", "title", "year", "vote_count", "revenue"]].copy()
+    report.insert(0, "cluster", labels[clustered])
+    report = report.sort_values(["cluster", "vote_count", "revenue"], ascending=[True, False, False])
+    report["kept"] = ~report["cluster"].duplicated()
+    return report
+
+
+def remove_near_duplicates(df: pd.DataFrame, report_path: Optional[str] = None) -> pd.DataFrame:
+    """Drop all but the most voted movie of each near-duplicate cluster, and report the clusters."""
+    report = find_near_duplicates(df)
+    removed = report[~report["kept"]]
+    print(
+        f"Near-duplicate overviews: {report['cluster'].nunique()} clusters, "
+        f"{len(removed)} movies removed"
+    )
+    largest = report["cluster"].value_counts().index[:10]
+    for cluster in largest:
+        members = report[report["cluster"] == cluster]
         print(
-            f"Year {year}: {len(year_top)} movies (max revenue: ${year_top['revenue'].max():,})"
+            "  - "
+            + ", ".join(
+                f"{'' if kept else '✗ '}{title} ({year:.0f})"
+                for title, year, kept in zip(members["title"], members["year"], members["kept"])
+            )
         )
+    if report_path:
+        report.to_csv(report_path, index=False)
+        print(f"Near-duplicate clusters written to {report_path}")
+    return df[~df["id"].isin(removed["id"])]
+
+
+def preprocess(df: pd.DataFrame, report_path: Optional[str] = None) -> pd.DataFrame:
+    print(f"Original dataset size: {len(df)}")
+
+    # Convert release_date to datetime and extract year
+    df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce")
+    df["year"] = df["release_date"].dt.year
+
+    # Filter out rows with missing dates or revenue
+    df_filtered = df.dropna(subset=["release_date", "year", "revenue"])
+
+    # Apply new filtering criteria: top 50k by vote_count OR revenue > 1M
+    # First, get movie with vote count > 100
+    df_vote_count_filter = df_filtered[df_filtered["vote_count"] > 100]
+
+    # Then get movies with revenue > 1M
+    df_high_revenue = df_filtered[df_filtered["revenue"] > 1000000]
+
+    # Combine both sets and remove duplicates based on movie ID
+    df_filtered = pd.concat([df_vote_count_filter, df_high_revenue]).drop_duplicates(
+        subset=["id"]
+    )
+
+    # Also remove duplicates based on title and overview (content-based deduplication)
+    df_filtered = df_filtered.drop_duplicates(subset=["title", "overview"])
+
+    # And near-identical overviews (re-releases, alternate-language copies)
+    df_filtered = remove_near_duplicates(df_filtered, report_path)
+
+    # Filter to only include movies from 1930 onwards
+    df_filtered = df_filtered[df_filtered["year"] >= 1930]
+
+    print(
+        f"Filtered dataset size (top 50k by vote_count OR revenue > $1M, duplicates removed, 1930+ only): {len(df_filtered)}"
+    )
+    print(f"Year range: {df_filtered['year'].min()} - {df_filtered['year'].max()}")
+
+    # Get top 1000 movies by revenue for each year
+    top_movies_by_year = []
+
+    for year in sorted(df_filtered["year"].unique()):
+        year_data = df_filtered[df_filtered["year"] == year]
+
+        if len(year_data) > 0:
+            # Sort by revenue in descending order and get top 1000
+            year_top = year_data.sort_values(by="revenue", ascending=False).head(1000)
+            top_movies_by_year.append(year_top)
+
+            print(
+                f"Year {year}: {len(year_top)} movies (max revenue: ${year_top['revenue'].max():,})"
+            )
+
+    # Combine all years and sort by year first, then by revenue (descending)
+    df_top_by_year = pd.concat(top_movies_by_year, ignore_index=True)
+    df_top_by_year = df_top_by_year.sort_values(
+        ["year", "revenue"], ascending=[True, False]
+    )
+
+    print(f"\nTotal movies across all years: {len(df_top_by_year)}")
+    print(f"Unique years: {df_top_by_year['year'].nunique()}")
+
+    # Show sample of results
+    print(f"\nSample of top movies by year:")
+    for year in sorted(df_top_by_year["year"].unique())[-5:]:  # Show first 5 years
+        year_top = df_top_by_year[df_top_by_year["year"] == year].head(3)
+        print(f"\nYear {year}:")
+        for _, movie in year_top.iterrows():
+            print(f"  - {movie['title']}: ${movie['revenue']:,}")
+
+    return df_top_by_year
+
+
+def export_chunks(df_top_by_year: pd.DataFrame, output_dir: str = "data", chunk_size: int = 5000):
+    # Export to multiple parquet files (10k objects each)
+    num_chunks = len(df_top_by_year) // chunk_size + (
+        1 if len(df_top_by_year) % chunk_size != 0 else 0
+    )
 
-# Combine all years and sort by year first, then by revenue (descending)
-df_top_by_year = pd.concat(top_movies_by_year, ignore_index=True)
-df_top_by_year = df_top_by_year.sort_values(
-    ["year", "revenue"], ascending=[True, False]
-)
+    print(f"\nExporting to {num_chunks} parquet files with {chunk_size} objects each...")
 
-print(f"\nTotal movies across all years: {len(df_top_by_year)}")
-print(f"Unique years: {df_top_by_year['year'].nunique()}")
+    for i in range(num_chunks):
+        start_idx = i * chunk_size
+        end_idx = min((i + 1) * chunk_size, len(df_top_by_year))
 
-# Show sample of results
-print(f"\nSample of top movies by year:")
-for year in sorted(df_top_by_year["year"].unique())[-5:]:  # Show first 5 years
-    year_top = df_top_by_year[df_top_by_year["year"] == year].head(3)
-    print(f"\nYear {year}:")
-    for _, movie in year_top.iterrows():
-        print(f"  - {movie['title']}: ${movie['revenue']:,}")
+        chunk = df_top_by_year.iloc[start_idx:end_idx]
+        filename = f"{output_dir}/movies_popular_{i+1:02d}.parquet"
 
-# Export to multiple parquet files (10k objects each)
-chunk_size = 5000
-num_chunks = len(df_top_by_year) // chunk_size + (
-    1 if len(df_top_by_year) % chunk_size != 0 else 0
-)
+        chunk.to_parquet(path=filename)
+        print(f"Exported chunk {i+1}: {len(chunk)} objects to {filename}")
 
-print(f"\nExporting to {num_chunks} parquet files with {chunk_size} objects each...")
+    print(f"\nExport complete! Total files created: {num_chunks}")
 
-for i in range(num_chunks):
-    start_idx = i * chunk_size
-    end_idx = min((i + 1) * chunk_size, len(df_top_by_year))
 
-    chunk = df_top_by_year.iloc[start_idx:end_idx]
-    filename = f"data/movies_popular_{i+1:02d}.parquet"
+def main():
+    df = load_raw_dataset()
+    df_top_by_year = preprocess(df, report_path="data/near_duplicates.csv")
+    export_chunks(df_top_by_year)
 
-    chunk.to_parquet(path=filename)
-    print(f"Exported chunk {i+1}: {len(chunk)} objects to {filename}")
 
-print(f"\nExport complete! Total files created: {num_chunks}")
+if __name__ == "__main__":
+    main()
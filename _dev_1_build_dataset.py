@@ -1,4 +1,4 @@
-from helpers import CollectionName, process_str_categorical, process_int_categorical, connect_to_weaviate
+from helpers import CollectionName, process_str_categorical, process_int_categorical, connect_to_weaviate, mark_ingest_generation
 from weaviate.util import generate_uuid5
 from weaviate.classes.config import Property, DataType, Configure, Tokenization
 from tqdm import tqdm
@@ -63,72 +63,78 @@ def get_data_objects_from_parquet() -> Iterator[Dict[str, Union[datetime, str, i
 MAX_OBJECTS = 20000
 
 
-with connect_to_weaviate() as client:
-
-    # client.collections.delete(CollectionName.MOVIES)
-
-    if not client.collections.exists(CollectionName.MOVIES):
-        client.collections.create(
-            name=CollectionName.MOVIES,
-            properties=[
-                Property(name="title", data_type=DataType.TEXT),
-                Property(name="overview", data_type=DataType.TEXT),
-                Property(name="original_language", data_type=DataType.TEXT),
-                Property(name="tagline", data_type=DataType.TEXT),
-                Property(name="poster_path", data_type=DataType.TEXT),
-                Property(name="genres", data_type=DataType.TEXT_ARRAY),
-                Property(name="keywords", data_type=DataType.TEXT_ARRAY),
-                Property(name="recommendations", data_type=DataType.INT_ARRAY),
-                Property(
-                    name="credits",
-                    data_type=DataType.TEXT_ARRAY,
-                    tokenization=Tokenization.FIELD,
-                ),
-                Property(name="movie_id", data_type=DataType.INT),
-                Property(name="budget", data_type=DataType.INT),
-                Property(name="revenue", data_type=DataType.INT),
-                Property(name="vote_average", data_type=DataType.NUMBER),
-                Property(name="vote_count", data_type=DataType.INT),
-                Property(name="popularity", data_type=DataType.NUMBER),
-                Property(name="runtime", data_type=DataType.INT),
-                Property(name="year", data_type=DataType.INT),
-                Property(name="release_date", data_type=DataType.DATE),
-            ],
-            vector_config=[
-                Configure.Vectors.text2vec_weaviate(
-                    name="default",
-                    source_properties=["title", "overview"],
-                    model="Snowflake/snowflake-arctic-embed-l-v2.0",
-                    quantizer=Configure.VectorIndex.Quantizer.rq(),
-                ),
-                Configure.Vectors.text2vec_weaviate(
-                    name="genres",
-                    source_properties=["genres"],
-                    model="Snowflake/snowflake-arctic-embed-l-v2.0",
-                    quantizer=Configure.VectorIndex.Quantizer.rq(),
-                ),
-            ],
-        )
-
-    movies = client.collections.get(CollectionName.MOVIES)
-
-    # Add objects to the collection
-    counter = 0
-    with movies.batch.fixed_size(batch_size=200) as batch:
-        for obj in tqdm(get_data_objects_from_parquet()):
-            uuid = generate_uuid5(obj)
-            batch.add_object(properties=obj, uuid=generate_uuid5(obj))
-
-            counter += 1
-
-            if counter >= MAX_OBJECTS:
-                break
-
-
-    if len(movies.batch.failed_objects) > 0:
-        print("*" * 80)
-        print(f"***** Failed to add {len(movies.batch.failed_objects)} objects *****")
-        print("*" * 80)
-        print(movies.batch.failed_objects[:3])
-
-    print(len(movies))
+def main():
+    with connect_to_weaviate() as client:
+
+        # client.collections.delete(CollectionName.MOVIES)
+
+        if not client.collections.exists(CollectionName.MOVIES):
+            client.collections.create(
+                name=CollectionName.MOVIES,
+                properties=[
+                    Property(name="title", data_type=DataType.TEXT),
+                    Property(name="overview", data_type=DataType.TEXT),
+                    Property(name="original_language", data_type=DataType.TEXT),
+                    Property(name="tagline", data_type=DataType.TEXT),
+                    Property(name="poster_path", data_type=DataType.TEXT),
+                    Property(name="genres", data_type=DataType.TEXT_ARRAY),
+                    Property(name="keywords", data_type=DataType.TEXT_ARRAY),
+                    Property(name="recommendations", data_type=DataType.INT_ARRAY),
+                    Property(
+                        name="credits",
+                        data_type=DataType.TEXT_ARRAY,
+                        tokenization=Tokenization.FIELD,
+                    ),
+                    Property(name="movie_id", data_type=DataType.INT),
+                    Property(name="budget", data_type=DataType.INT),
+                    Property(name="revenue", data_type=DataType.INT),
+                    Property(name="vote_average", data_type=DataType.NUMBER),
+                    Property(name="vote_count", data_type=DataType.INT),
+                    Property(name="popularity", data_type=DataType.NUMBER),
+                    Property(name="runtime", data_type=DataType.INT),
+                    Property(name="year", data_type=DataType.INT),
+                    Property(name="release_date", data_type=DataType.DATE),
+                ],
+                vector_config=[
+                    Configure.Vectors.text2vec_weaviate(
+                        name="default",
+                        source_properties=["title", "overview"],
+                        model="Snowflake/snowflake-arctic-embed-l-v2.0",
+                        quantizer=Configure.VectorIndex.Quantizer.rq(),
+                    ),
+                    Configure.Vectors.text2vec_weaviate(
+                        name="genres",
+                        source_properties=["genres"],
+                        model="Snowflake/snowflake-arctic-embed-l-v2.0",
+                        quantizer=Configure.VectorIndex.Quantizer.rq(),
+                    ),
+                ],
+            )
+
+        movies = client.collections.get(CollectionName.MOVIES)
+
+        # Add objects to the collection
+        counter = 0
+        with movies.batch.fixed_size(batch_size=200) as batch:
+            for obj in tqdm(get_data_objects_from_parquet()):
+                uuid = generate_uuid5(obj)
+                batch.add_object(properties=obj, uuid=generate_uuid5(obj))
+
+                counter += 1
+
+                if counter >= MAX_OBJECTS:
+                    break
+
+
+        if len(movies.batch.failed_objects) > 0:
+            print("*" * 80)
+            print(f"***** Failed to add {len(movies.batch.failed_objects)} objects *****")
+            print("*" * 80)
+            print(movies.batch.failed_objects[:3])
+
+        print(len(movies))
+        mark_ingest_generation()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,23 @@
+import numpy as np
 import pandas as pd
 from helpers import CollectionName, connect_to_weaviate
+from vector_store import VECTOR_SIDECAR_DTYPE, remove_vector_sidecars, write_vector_sidecars
+
+
+def save_batch(buffer: list[dict], filename: str):
+    """Save properties to parquet, and vectors to compact sidecar files (see vector_store.py)"""
+    if VECTOR_SIDECAR_DTYPE == "none":
+        remove_vector_sidecars(filename)
+        pd.DataFrame(buffer).to_parquet(filename, index=False)
+        return
+
+    pd.DataFrame({"properties": [o["properties"] for o in buffer]}).to_parquet(filename, index=False)
+    vector_names = buffer[0]["vectors"].keys()
+    write_vector_sidecars(
+        filename,
+        {name: np.array([o["vectors"][name] for o in buffer], dtype=np.float32) for name in vector_names},
+    )
+
 
 with connect_to_weaviate() as client:
 
@@ -18,10 +36,9 @@ with connect_to_weaviate() as client:
         counter += 1
 
         if counter % batch_size == 0:
-            # Convert buffer to DataFrame and save to parquet
-            df = pd.DataFrame(buffer)
+            # Save the batch to parquet (and vector sidecars)
             filename = f"data/{file_prefix}{batch_number+1:02d}.parquet"
-            df.to_parquet(filename, index=False)
+            save_batch(buffer, filename)
             print(f"Saved {len(buffer)} records to {filename}")
 
             # Clear buffer and increment batch number
@@ -30,9 +47,8 @@ with connect_to_weaviate() as client:
 
     # Save remaining records in the final batch
     if buffer:
-        df = pd.DataFrame(buffer)
         filename = f"data/{file_prefix}{batch_number+1:02d}.parquet"
-        df.to_parquet(filename, index=False)
+        save_batch(buffer, filename)
         print(f"Saved {len(buffer)} records to {filename}")
 
     print(
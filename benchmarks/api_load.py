@@ -0,0 +1,245 @@
+"""
+Load test: drive the API with a realistic request mix, against local fake backends.
+
+Starts `main_complete.app` in a subprocess, with Weaviate and Anthropic replaced by the
+stand-ins in `benchmarks/fakes.py` (with injected latency), then sends a weighted mix of
+/search, /explore, /movie and /recommend requests at each concurrency level. Reports
+throughput, p50/p95/p99 latency and server memory, and writes the results as JSON.
+
+Usage:
+    python -m benchmarks.api_load [--concurrency 1,8,32] [--requests 400]
+    python -m benchmarks.api_load --compare benchmarks/results/api_load-<baseline>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+RESULTS_DIR = Path("benchmarks/results")
+
+# Weighted endpoint mix, roughly matching UI traffic
+REQUEST_MIX = {"search": 0.5, "explore": 0.2, "movie": 0.2, "recommend": 0.1}
+SEARCH_TERMS = ["space adventure", "heist", "love story", "haunted house", "dark secret", "family road trip", "superhero", "war drama"]
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Romance", "Science Fiction", "Thriller"]
+OCCASIONS = ["date night", "family movie night", "rainy day", "cozy night in", "halloween party", "long flight"]
+
+
+def serve(port: int):
+    """Run the API with fake backends (executed in the server subprocess)."""
+    from benchmarks.fakes import FakeAnthropic, FakeWeaviateClient, make_corpus
+    import helpers
+    import main_complete
+    import uvicorn
+
+    corpus = make_corpus()
+    weaviate_latency = float(os.environ["BENCH_WEAVIATE_LATENCY_MS"]) / 1000
+    generation_latency = float(os.environ["BENCH_ANTHROPIC_LATENCY_MS"]) / 1000
+    FakeAnthropic.latency = generation_latency
+    helpers.Anthropic = FakeAnthropic
+    main_complete.connect_to_weaviate = lambda: FakeWeaviateClient(
+        corpus, weaviate_latency, generation_latency
+    )
+    uvicorn.run(main_complete.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def make_request(rng: random.Random) -> tuple[str, str, dict]:
+    kind = rng.choices(list(REQUEST_MIX), weights=list(REQUEST_MIX.values()))[0]
+    if kind == "search":
+        params = {"q": rng.choice(SEARCH_TERMS), "page": rng.choice([1, 1, 1, 2, 3])}
+        if rng.random() < 0.3:
+            params["year_min"] = rng.choice([1970, 1980, 1990, 2000])
+        return kind, "/search", params
+    if kind == "explore":
+        return kind, "/explore", {"genre": rng.choice(GENRES)}
+    if kind == "movie":
+        return kind, f"/movie/{rng.randint(1, 20000)}", {}
+    return kind, "/recommend", {"occasion": rng.choice(OCCASIONS)}
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(latencies: list[float]) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def server_memory(pid: int) -> dict:
+    """Current and peak RSS of the server process, in MiB (Linux only)."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return {}
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+    return {
+        "rss_mib": int(fields["VmRSS"].split()[0]) / 1024,
+        "peak_rss_mib": int(fields["VmHWM"].split()[0]) / 1024,
+    }
+
+
+async def run_level(base_url: str, concurrency: int, total_requests: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    requests = [make_request(rng) for _ in range(total_requests)]
+    latencies: dict[str, list[float]] = {kind: [] for kind in REQUEST_MIX}
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while not queue.empty():
+            kind, path, params = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies[kind].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "throughput_rps": total_requests / elapsed,
+        "overall": summarize(all_latencies),
+        "endpoints": {kind: summarize(values) for kind, values in latencies.items()},
+    }
+
+
+def wait_for_server(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline_path: Path, tolerance: float) -> bool:
+    """Print p95 and throughput deltas against a baseline; return False on a regression."""
+    baseline = {level["concurrency"]: level for level in json.loads(baseline_path.read_text())["levels"]}
+    ok = True
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for level in current["levels"]:
+        base = baseline.get(level["concurrency"])
+        if base is None:
+            continue
+        p95_change = level["overall"]["p95_ms"] / base["overall"]["p95_ms"] - 1
+        rps_change = level["throughput_rps"] / base["throughput_rps"] - 1
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        ok = ok and not regressed
+        print(
+            f"  concurrency {level['concurrency']:>3}: p95 {p95_change:+.1%}, "
+            f"throughput {rps_change:+.1%}{'  <-- REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per concurrency level")
+    parser.add_argument("--weaviate-latency-ms", type=float, default=20)
+    parser.add_argument("--anthropic-latency-ms", type=float, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/api_load-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="Baseline results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)  # Internal: run the server
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "BENCH_WEAVIATE_LATENCY_MS": str(args.weaviate_latency_ms),
+        "BENCH_ANTHROPIC_LATENCY_MS": str(args.anthropic_latency_ms),
+        "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", "benchmark"),
+    }
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.api_load", "--serve", str(port)], env=env)
+    try:
+        wait_for_server(base_url)
+        levels = []
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            level = asyncio.run(run_level(base_url, concurrency, args.requests, args.seed))
+            level["server_memory"] = server_memory(server.pid)
+            levels.append(level)
+            overall = level["overall"]
+            print(
+                f"concurrency {concurrency:>3}: {level['throughput_rps']:8.1f} req/s  "
+                f"p50 {overall['p50_ms']:7.1f} ms  p95 {overall['p95_ms']:7.1f} ms  "
+                f"p99 {overall['p99_ms']:7.1f} ms  errors {level['errors']}  "
+                f"rss {level['server_memory'].get('rss_mib', 0):.0f} MiB"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+    results = {
+        "benchmark": "api_load",
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "requests_per_level": args.requests,
+            "weaviate_latency_ms": args.weaviate_latency_ms,
+            "anthropic_latency_ms": args.anthropic_latency_ms,
+            "mix": REQUEST_MIX,
+            "seed": args.seed,
+        },
+        "levels": levels,
+    }
+    output = args.output or RESULTS_DIR / f"api_load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
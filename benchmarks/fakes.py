@@ -0,0 +1,133 @@
+"""
+Local stand-ins for Weaviate and Anthropic, for benchmarking the API without external services.
+
+The fakes serve a synthetic movie corpus, and sleep for a configurable latency on
+every call to mimic network and model time:
+- `FakeWeaviateClient` mimics the parts of the Weaviate client the API uses
+- `FakeAnthropic` mimics `anthropic.Anthropic().messages.create`
+"""
+
+import random
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Optional
+
+GENRES = ["Action", "Adventure", "Comedy", "Drama", "Family", "Horror", "Romance", "Science Fiction", "Thriller"]
+WORDS = "love war space family friend city night dark secret return story last world life hero heist".split()
+
+
+def make_corpus(size: int = 20000, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "movie_id": i + 1,
+            "title": " ".join(rng.choice(WORDS) for _ in range(3)).title(),
+            "overview": " ".join(rng.choice(WORDS) for _ in range(60)),
+            "genres": rng.sample(GENRES, 2),
+            "popularity": rng.expovariate(1 / 20),
+            "year": rng.randint(1930, 2025),
+        }
+        for i in range(size)
+    ]
+
+
+class _FakeQuery:
+    def __init__(self, collection: "FakeCollection", generative: bool):
+        self.collection = collection
+        self.generative = generative
+
+    def _respond(self, limit: Optional[int], offset: Optional[int], filters, return_properties, seed):
+        time.sleep(self.collection.latency + (self.collection.generation_latency if self.generative else 0))
+        corpus = self.collection.corpus
+        # Seeding with the string itself is stable across runs; hash() of a str changes with PYTHONHASHSEED
+        rng = random.Random(str(seed))
+        start = rng.randrange(len(corpus))
+        rows = [corpus[(start + i) % len(corpus)] for i in range((offset or 0) + (limit or 10))][offset or 0 :]
+        objects = [
+            SimpleNamespace(
+                uuid=uuid.UUID(int=row["movie_id"]),
+                properties=row if return_properties is None else {k: row[k] for k in return_properties},
+                metadata=SimpleNamespace(score=1.0 / (rank + 1), distance=rank / 100),
+            )
+            for rank, row in enumerate(rows)
+        ]
+        generative = SimpleNamespace(text="We recommend these movies.", metadata=None) if self.generative else None
+        return SimpleNamespace(objects=objects, generative=generative)
+
+    def hybrid(self, query, *, limit=None, offset=None, filters=None, return_properties=None, **kwargs):
+        return self._respond(limit, offset, filters, return_properties, query)
+
+    def near_text(self, query, *, limit=None, offset=None, filters=None, return_properties=None, **kwargs):
+        return self._respond(limit, offset, filters, return_properties, query)
+
+    def near_vector(self, near_vector, *, limit=None, offset=None, filters=None, return_properties=None, **kwargs):
+        return self._respond(limit, offset, filters, return_properties, len(near_vector))
+
+    def near_object(self, near_object, *, limit=None, offset=None, filters=None, return_properties=None, **kwargs):
+        return self._respond(limit, offset, filters, return_properties, str(near_object))
+
+    def fetch_objects(self, *, limit=None, offset=None, filters=None, return_properties=None, **kwargs):
+        return self._respond(limit, offset, filters, return_properties, repr(filters))
+
+
+class FakeCollection:
+    def __init__(self, corpus: list[dict], latency: float, generation_latency: float):
+        self.corpus = corpus
+        self.latency = latency
+        self.generation_latency = generation_latency
+        self.query = _FakeQuery(self, generative=False)
+        self.generate = _FakeQuery(self, generative=True)
+
+    def __len__(self):
+        time.sleep(self.latency)
+        return len(self.corpus)
+
+    def iterator(self, *, return_properties=None, cache_size=100, **kwargs):
+        for i, row in enumerate(self.corpus):
+            if i % cache_size == 0:
+                time.sleep(self.latency)  # One query per page
+            properties = row if return_properties is None else {k: row[k] for k in return_properties}
+            yield SimpleNamespace(uuid=uuid.UUID(int=row["movie_id"]), properties=properties)
+
+
+class FakeWeaviateClient:
+    """
+    Stands in for a connected `WeaviateClient`.
+
+    `latency` is added to every query (and to connecting), and `generation_latency`
+    additionally to `generate` queries, which call an LLM in the real service.
+    """
+
+    def __init__(self, corpus: list[dict], latency: float = 0.02, generation_latency: float = 1.0):
+        time.sleep(latency)  # Connection setup
+        collection = FakeCollection(corpus, latency, generation_latency)
+        self.collections = SimpleNamespace(
+            use=lambda name: collection, get=lambda name: collection, exists=lambda name: True
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def close(self):
+        pass
+
+
+class FakeAnthropic:
+    """Stands in for `anthropic.Anthropic`; `latency` is set on the class before use."""
+
+    latency = 0.5
+
+    def __init__(self, *args, **kwargs):
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, *, messages, max_tokens, model, **kwargs):
+        time.sleep(self.latency)
+        prompt = messages[0]["content"]
+        return SimpleNamespace(
+            content=[SimpleNamespace(text="feel-good movies for a cozy evening")],
+            usage=SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=8),
+        )
@@ -0,0 +1,308 @@
+"""
+Index evaluation: recall, memory and query cost of vector quantizers on the exported vectors.
+
+Loads one named vector ("default" or "genres") from the exported data files (vector sidecars
+or the parquet `vectors` column), holds out a sample as queries, and computes exact cosine
+top-k ground truth with batched NumPy. Then emulates the quantizers Weaviate offers:
+- sq: 8-bit scalar quantization (per-dimension ranges)
+- rq: rotational quantization (random rotation, then 8 bits per dimension with a per-vector range)
+- bq: binary quantization (1 bit per dimension, Hamming distance)
+- pq: product quantization (k-means codebooks with 256 centroids per segment)
+each with and without rescoring the top `k * rescore` candidates using the full vectors,
+as Weaviate does by default.
+
+Searches are flat scans, so recall reflects the quantizer alone (HNSW's own approximation
+comes on top), and timings are NumPy emulations; compare them relative to each other.
+
+Usage:
+    python -m benchmarks.index_eval [--vector default] [--k 10] [--queries 500]
+    python -m benchmarks.index_eval --synthetic 20000  # without exported data
+"""
+
+import argparse
+import glob
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+RESULTS_DIR = Path("benchmarks/results")
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def load_vectors(name: str, pattern: str = "data/movies_popular_w_vectors_*.parquet") -> np.ndarray:
+    """Load a named vector for every exported object, as a float32 matrix."""
+    import pandas as pd
+    from vector_store import read_vector_sidecars
+
+    matrices = []
+    for path in sorted(glob.glob(pattern)):
+        sidecars = read_vector_sidecars(path)
+        if sidecars is not None:
+            if sidecars[name].data.dtype != np.float32:
+                # Ground truth and rescoring would use already-quantized vectors
+                raise ValueError(
+                    f"{path} has {sidecars[name].data.dtype} vector sidecars; re-export with "
+                    "VECTOR_SIDECAR_DTYPE=float32 (or none) to evaluate against exact vectors"
+                )
+            matrices.append(sidecars[name].to_float32())
+        else:
+            vectors = pd.read_parquet(path, columns=["vectors"])["vectors"]
+            matrices.append(np.stack([v[name] for v in vectors]).astype(np.float32))
+    if not matrices:
+        raise FileNotFoundError(f"No exported data files match {pattern}; try --synthetic")
+    return np.concatenate(matrices)
+
+
+def synthetic_vectors(n: int, dims: int, rng: np.random.Generator, clusters: int = 200) -> np.ndarray:
+    """Clustered Gaussian vectors, a rough stand-in for text embeddings."""
+    centers = rng.standard_normal((clusters, dims), dtype=np.float32)
+    return centers[rng.integers(0, clusters, n)] + 0.8 * rng.standard_normal((n, dims), dtype=np.float32)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores per row, best first."""
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def exact_search(base: np.ndarray, queries: np.ndarray, k: int, batch_size: int = 256) -> np.ndarray:
+    """Brute-force cosine top-k (vectors are normalized), in query batches to bound memory."""
+    return np.concatenate(
+        [top_k(queries[i : i + batch_size] @ base.T, k) for i in range(0, len(queries), batch_size)]
+    )
+
+
+class Float32:
+    """Uncompressed vectors (the baseline)."""
+
+    name = "float32"
+
+    def fit(self, base: np.ndarray):
+        self.base = base
+
+    def bytes_per_vector(self) -> float:
+        return self.base.shape[1] * 4
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        return queries @ self.base.T
+
+
+class ScalarQuantizer:
+    """8 bits per dimension, over each dimension's [min, max] range."""
+
+    name = "sq"
+
+    def fit(self, base: np.ndarray):
+        self.low = base.min(axis=0)
+        self.step = (base.max(axis=0) - self.low) / 255
+        self.step[self.step == 0] = 1.0
+        self.codes = np.rint((base - self.low) / self.step).astype(np.uint8)
+        self._codes_f32 = self.codes.astype(np.float32)  # Emulation only: real kernels use the uint8s
+
+    def bytes_per_vector(self) -> float:
+        return self.codes.shape[1]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        return (queries * self.step) @ self._codes_f32.T + (queries @ self.low)[:, None]
+
+
+class RotationalQuantizer:
+    """Random rotation (spreads information evenly across dimensions), then 8 bits per dimension."""
+
+    name = "rq"
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def fit(self, base: np.ndarray):
+        dims = base.shape[1]
+        gaussian = np.random.default_rng(self.seed).standard_normal((dims, dims))
+        self.rotation = np.linalg.qr(gaussian)[0].astype(np.float32)
+        rotated = base @ self.rotation
+        self.low = rotated.min(axis=1)
+        self.step = (rotated.max(axis=1) - self.low) / 255
+        self.step[self.step == 0] = 1.0
+        self.codes = np.rint((rotated - self.low[:, None]) / self.step[:, None]).astype(np.uint8)
+        self._codes_f32 = self.codes.astype(np.float32)
+
+    def bytes_per_vector(self) -> float:
+        return self.codes.shape[1] + 8  # Codes, plus a float32 offset and step per vector
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        rotated = queries @ self.rotation
+        return (rotated @ self._codes_f32.T) * self.step + np.outer(rotated.sum(axis=1), self.low)
+
+
+class BinaryQuantizer:
+    """1 bit per dimension (its sign); similarity is the negated Hamming distance."""
+
+    name = "bq"
+
+    def fit(self, base: np.ndarray):
+        self.bits = np.packbits(base > 0, axis=1)
+
+    def bytes_per_vector(self) -> float:
+        return self.bits.shape[1]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        query_bits = np.packbits(queries > 0, axis=1)
+        return np.stack([-POPCOUNT[self.bits ^ q].sum(axis=1, dtype=np.int32) for q in query_bits]).astype(np.float32)
+
+
+class ProductQuantizer:
+    """Split vectors into segments, and encode each as the nearest of 256 k-means centroids."""
+
+    name = "pq"
+
+    def __init__(self, segments: int, train_size: int = 10000, iterations: int = 8, seed: int = 0):
+        self.segments, self.train_size, self.iterations, self.seed = segments, train_size, iterations, seed
+
+    def _kmeans(self, data: np.ndarray, rng: np.random.Generator, centroids: int = 256) -> np.ndarray:
+        centers = data[rng.choice(len(data), size=min(centroids, len(data)), replace=False)].copy()
+        for _ in range(self.iterations):
+            assignment = self._nearest(data, centers)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, assignment, data)
+            counts = np.bincount(assignment, minlength=len(centers))
+            filled = counts > 0
+            centers[filled] = sums[filled] / counts[filled, None]
+        return centers
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (centers**2).sum(axis=1) - 2 * data @ centers.T
+        return distances.argmin(axis=1)
+
+    def fit(self, base: np.ndarray):
+        rng = np.random.default_rng(self.seed)
+        train = base[rng.choice(len(base), size=min(self.train_size, len(base)), replace=False)]
+        self.splits = np.array_split(np.arange(base.shape[1]), self.segments)
+        self.codebooks = [self._kmeans(train[:, dims], rng) for dims in self.splits]
+        self.codes = np.stack(
+            [self._nearest(base[:, dims], book) for dims, book in zip(self.splits, self.codebooks)], axis=1
+        ).astype(np.uint8)
+
+    def bytes_per_vector(self) -> float:
+        return self.segments
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        segment_index = np.arange(self.segments)
+        results = []
+        for query in queries:
+            # Asymmetric distance: look up each code's dot product with the query segment
+            tables = np.stack([book @ query[dims] for dims, book in zip(self.splits, self.codebooks)])
+            results.append(tables[segment_index, self.codes].sum(axis=1))
+        return np.stack(results)
+
+
+def evaluate(quantizer, base, queries, truth, k: int, rescore: int, batch_size: int = 64) -> dict:
+    """Recall@k and per-query time of a fitted quantizer, with optional full-vector rescoring."""
+    candidates = k * rescore if rescore else k
+    found = []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        batch = queries[i : i + batch_size]
+        ids = top_k(quantizer.scores(batch), candidates)
+        if rescore:
+            exact = np.einsum("qd,qcd->qc", batch, base[ids])
+            ids = np.take_along_axis(ids, top_k(exact, k), axis=1)
+        found.append(ids[:, :k])
+    elapsed = time.perf_counter() - start
+    found = np.concatenate(found)
+    recall = np.mean([len(np.intersect1d(f, t)) / k for f, t in zip(found, truth)])
+    return {"recall": float(recall), "ms_per_query": elapsed / len(queries) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--vector", default="default", help="Named vector to evaluate")
+    parser.add_argument("--synthetic", type=int, help="Use this many synthetic vectors instead of exported data")
+    parser.add_argument("--dims", type=int, default=1024, help="Dimensions of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=500, help="Held-out query vectors")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=4, help="Rescore the top k * N candidates (0 to skip)")
+    parser.add_argument("--pq-segments", type=int, default=128)
+    parser.add_argument("--quantizers", default="sq,rq,bq,pq", help="Comma-separated quantizers to evaluate")
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/index_eval-<time>.json)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dims, rng)
+        source = f"synthetic ({args.synthetic:,} x {args.dims})"
+    else:
+        vectors = load_vectors(args.vector)
+        source = f"exported '{args.vector}' vectors ({len(vectors):,} x {vectors.shape[1]})"
+    vectors = normalize(vectors)
+    held_out = rng.choice(len(vectors), size=args.queries, replace=False)
+    queries = vectors[held_out]
+    base = np.delete(vectors, held_out, axis=0)
+
+    print(f"Data: {source}; {len(base):,} base vectors, {len(queries)} queries, recall@{args.k}")
+    start = time.perf_counter()
+    truth = exact_search(base, queries, args.k)
+    print(f"Ground truth: {time.perf_counter() - start:.2f}s\n")
+
+    available = {
+        "sq": ScalarQuantizer,
+        "rq": RotationalQuantizer,
+        "bq": BinaryQuantizer,
+        "pq": lambda: ProductQuantizer(args.pq_segments),
+    }
+    quantizers = [Float32()] + [available[name]() for name in args.quantizers.split(",")]
+    baseline_bytes = base.shape[1] * 4
+
+    print(f"{'config':<14}{'bytes/vec':>10}{'compression':>13}{'recall':>9}{'ms/query':>10}{'fit (s)':>9}")
+    results = []
+    for quantizer in quantizers:
+        start = time.perf_counter()
+        quantizer.fit(base)
+        fit_seconds = time.perf_counter() - start
+        variants = [0] if isinstance(quantizer, Float32) else [0, args.rescore] if args.rescore else [0]
+        for rescore in variants:
+            config = quantizer.name + (f"+rescore{rescore}" if rescore else "")
+            metrics = evaluate(quantizer, base, queries, truth, args.k, rescore)
+            bytes_per_vector = quantizer.bytes_per_vector()
+            result = {
+                "config": config,
+                "bytes_per_vector": bytes_per_vector,
+                "compression": baseline_bytes / bytes_per_vector,
+                "fit_seconds": fit_seconds,
+                **metrics,
+            }
+            results.append(result)
+            print(
+                f"{config:<14}{bytes_per_vector:>10.0f}{result['compression']:>12.1f}x"
+                f"{metrics['recall']:>9.3f}{metrics['ms_per_query']:>10.2f}{fit_seconds:>9.1f}"
+            )
+
+    output = args.output or RESULTS_DIR / f"index_eval-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "benchmark": "index_eval",
+                "source": source,
+                "base_vectors": len(base),
+                "queries": len(queries),
+                "k": args.k,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
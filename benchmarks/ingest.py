@@ -0,0 +1,361 @@
+"""
+Ingestion benchmark: throughput and memory of the data loading and preprocessing stages.
+
+Generates synthetic parquet files at a configurable scale, shaped like:
+- `movies_popular_w_vectors_*` (properties struct + two 1024-dim named vectors), read by `populate_complete.py`
+- `movies_popular_*` (raw columns, "-"-joined list columns), read by `_dev_1_build_dataset.py`
+- the raw `wykonos/movies` dataset, processed by `_dev_0_preproc.py`
+
+Each stage runs in a fresh process, and reports rows/sec and peak RSS:
+- decode: iterating `get_data_objects_from_parquet()`
+- decode_sidecar_<dtype>: the same, with vectors in `.npy` sidecars (see `vector_store.py`)
+- uuid: decode + `generate_uuid5` per object
+- batch: `populate_complete.ingest_movies_data` against a mock batcher (decode + uuid + batching)
+- preproc: `_dev_0_preproc.preprocess` on the raw dataset
+- dataset.*: `helpers.get_data_objects` on the raw dataset, decoding row by row (as when streaming),
+  building the local Arrow snapshot, and reading the snapshot
+
+Usage:
+    python -m benchmarks.ingest [--rows 10000] [--dims 1024] [--profile profiles/]
+"""
+
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import multiprocessing
+import os
+import pstats
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RESULTS_DIR = Path("benchmarks/results")
+ROWS_PER_FILE = 5000
+GENRES = ["Action", "Adventure", "Comedy", "Drama", "Family", "Horror", "Romance", "Science Fiction", "Thriller"]
+WORDS = np.array("love war space family friend city night dark secret return story last world life hero heist".split())
+
+
+def _text(rng: np.random.Generator, rows: int, words: int) -> list[str]:
+    return [" ".join(row) for row in rng.choice(WORDS, size=(rows, words))]
+
+
+def _joined(rng: np.random.Generator, rows: int, values, count: int) -> list[str]:
+    return ["-".join(map(str, row)) for row in rng.choice(values, size=(rows, count))]
+
+
+def _vector_column(rng: np.random.Generator, rows: int, dims: int) -> pa.ListArray:
+    values = rng.standard_normal(rows * dims)
+    offsets = np.arange(0, rows * dims + 1, dims, dtype=np.int32)
+    return pa.ListArray.from_arrays(offsets, values)
+
+
+def write_vector_files(directory: Path, rows: int, dims: int, seed: int = 0, sidecar_dtype: str = "none"):
+    """Write `movies_popular_w_vectors_*` files, as exported by `_dev_2_export_data.py`."""
+    from vector_store import write_vector_sidecars
+
+    rng = np.random.default_rng(seed)
+    for file_number, start in enumerate(range(0, rows, ROWS_PER_FILE), start=1):
+        n = min(ROWS_PER_FILE, rows - start)
+        genres = [list(rng.choice(GENRES, size=2, replace=False)) for _ in range(n)]
+        properties = pa.StructArray.from_arrays(
+            [
+                pa.array(np.arange(start, start + n) + 1),
+                pa.array(_text(rng, n, 3)),
+                pa.array(_text(rng, n, 60)),
+                pa.array(genres, type=pa.list_(pa.string())),
+                pa.array(rng.integers(1930, 2025, n)),
+                pa.array(rng.exponential(20, n)),
+                pa.array([[str(w) for w in row] for row in rng.choice(WORDS, size=(n, 15))], type=pa.list_(pa.string())),
+            ],
+            names=["movie_id", "title", "overview", "genres", "year", "popularity", "keywords"],
+        )
+        path = directory / f"movies_popular_w_vectors_{file_number:02d}.parquet"
+        if sidecar_dtype == "none":
+            vectors = pa.StructArray.from_arrays(
+                [_vector_column(rng, n, dims), _vector_column(rng, n, dims)], names=["default", "genres"]
+            )
+            pq.write_table(pa.table({"properties": properties, "vectors": vectors}), path)
+        else:
+            pq.write_table(pa.table({"properties": properties}), path)
+            vectors = {name: rng.standard_normal((n, dims), dtype=np.float32) for name in ("default", "genres")}
+            write_vector_sidecars(path, vectors, dtype=sidecar_dtype)
+
+
+def make_raw_table(rng: np.random.Generator, n: int, start: int = 0) -> pa.Table:
+    """Raw movie columns, as in `wykonos/movies` and the `movies_popular_*` files."""
+    years = rng.integers(1920, 2025, n)
+    return pa.table(
+        {
+            "id": np.arange(start, start + n) + 1,
+            "title": _text(rng, n, 3),
+            "overview": _text(rng, n, 60),
+            "original_language": ["en"] * n,
+            "tagline": _text(rng, n, 8),
+            "poster_path": [f"/{i:x}.jpg" for i in rng.integers(0, 2**40, n)],
+            "genres": _joined(rng, n, GENRES, 2),
+            "keywords": _joined(rng, n, WORDS, 10),
+            "credits": _joined(rng, n, WORDS, 20),
+            "recommendations": _joined(rng, n, np.arange(1, 100000), 20),
+            "budget": rng.integers(0, 200_000_000, n).astype(float),
+            "revenue": rng.integers(0, 1_000_000_000, n).astype(float),
+            "vote_average": rng.uniform(0, 10, n),
+            "vote_count": rng.integers(0, 30000, n).astype(float),
+            "popularity": rng.exponential(20, n),
+            "runtime": rng.integers(70, 200, n).astype(float),
+            "year": years.astype(float),
+            "release_date": [f"{y}-01-01" for y in years],
+        }
+    )
+
+
+def write_raw_files(directory: Path, rows: int, seed: int = 0):
+    """Write `movies_popular_*` files, as exported by `_dev_0_preproc.py`."""
+    rng = np.random.default_rng(seed)
+    for file_number, start in enumerate(range(0, rows, ROWS_PER_FILE), start=1):
+        table = make_raw_table(rng, min(ROWS_PER_FILE, rows - start), start)
+        pq.write_table(table, directory / f"movies_popular_{file_number:02d}.parquet")
+
+
+class MockBatch:
+    """Stands in for a Weaviate fixed-size batch: buffers objects and drops them on flush."""
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.buffer: list = []
+        self.added = 0
+
+    def add_object(self, properties, uuid=None, vector=None):
+        self.buffer.append((properties, uuid, vector))
+        self.added += 1
+        if len(self.buffer) >= self.batch_size:
+            self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.buffer = []
+        return False
+
+
+class MockCollection:
+    def __init__(self):
+        self.failed_objects: list = []
+        self.last_batch = MockBatch(0)
+
+    @property
+    def batch(self):
+        return self
+
+    def fixed_size(self, batch_size: int) -> MockBatch:
+        self.last_batch = MockBatch(batch_size)
+        return self.last_batch
+
+    def __len__(self):
+        return self.last_batch.added
+
+
+class MockClient:
+    def __init__(self):
+        collection = MockCollection()
+        self.collections = type("Collections", (), {"get": staticmethod(lambda name: collection)})()
+
+
+def _count(objects) -> int:
+    return sum(1 for _ in objects)
+
+
+def _with_uuids(objects) -> int:
+    from weaviate.util import generate_uuid5
+
+    count = 0
+    for obj in objects:
+        generate_uuid5(obj)
+        count += 1
+    return count
+
+
+def stage_populate_decode() -> int:
+    import populate_complete
+
+    return _count(populate_complete.get_data_objects_from_parquet())
+
+
+def stage_populate_uuid() -> int:
+    import populate_complete
+
+    return _with_uuids(populate_complete.get_data_objects_from_parquet())
+
+
+def stage_populate_batch() -> int:
+    import populate_complete
+
+    client = MockClient()
+    populate_complete.ingest_movies_data(client)
+    return len(client.collections.get("Movies"))
+
+
+def stage_dev1_decode() -> int:
+    import _dev_1_build_dataset
+
+    return _count(_dev_1_build_dataset.get_data_objects_from_parquet())
+
+
+def stage_dev1_uuid() -> int:
+    import _dev_1_build_dataset
+
+    return _with_uuids(_dev_1_build_dataset.get_data_objects_from_parquet())
+
+
+def stage_preproc() -> int:
+    import pandas as pd
+    import _dev_0_preproc
+
+    df = pd.read_parquet("raw/wykonos_movies.parquet")
+    rows = len(df)
+    _dev_0_preproc.preprocess(df)
+    return rows
+
+
+def stage_dataset_rowwise() -> int:
+    import helpers
+
+    table = pq.read_table("raw/wykonos_movies.parquet")
+    return _count(helpers._decode_item(item) for item in table.to_pylist())
+
+
+def stage_dataset_snapshot_build() -> int:
+    import helpers
+
+    helpers.build_dataset_snapshot("raw/wykonos_movies.parquet")
+    return pq.read_metadata("raw/wykonos_movies.parquet").num_rows
+
+
+def stage_dataset_snapshot_read() -> int:
+    import helpers
+
+    return _count(helpers.get_data_objects())  # Builds the snapshot first, unless snapshot_build ran
+
+
+# Stage name: (function, working directory under the benchmark root)
+STAGES = {
+    "populate.decode": (stage_populate_decode, "populate"),
+    "populate.uuid": (stage_populate_uuid, "populate"),
+    "populate.batch": (stage_populate_batch, "populate"),
+    "populate.decode_sidecar_float16": (stage_populate_decode, "populate_float16"),
+    "populate.decode_sidecar_int8": (stage_populate_decode, "populate_int8"),
+    "dev1.decode": (stage_dev1_decode, "dev1"),
+    "dev1.uuid": (stage_dev1_uuid, "dev1"),
+    "preproc": (stage_preproc, "dev0"),
+    "dataset.rowwise": (stage_dataset_rowwise, "dev0"),
+    "dataset.snapshot_build": (stage_dataset_snapshot_build, "dev0"),
+    "dataset.snapshot_read": (stage_dataset_snapshot_read, "dev0"),
+}
+
+
+def _peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)  # bytes on macOS, KiB on Linux
+
+
+def run_stage(name: str, root: str, profile_dir, results):
+    """Run one stage in this (fresh) process, and report its throughput and memory."""
+    function, workdir = STAGES[name]
+    os.environ["TQDM_DISABLE"] = "1"
+    os.environ["DATASET_SOURCE"] = "raw/wykonos_movies.parquet"
+    os.chdir(Path(root) / workdir)
+    import pandas, weaviate  # noqa: F401  (exclude import costs from the measurement)
+
+    baseline_rss = _peak_rss_mib()
+    profiler = cProfile.Profile() if profile_dir else None
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        rows = function()
+        if profiler:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+
+    if profiler:
+        profile_path = Path(profile_dir) / f"{name}.prof"
+        profiler.dump_stats(profile_path)
+        with open(profile_path.with_suffix(".txt"), "w") as f:
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+    results.put(
+        {
+            "stage": name,
+            "rows": rows,
+            "seconds": elapsed,
+            "rows_per_sec": rows / elapsed if elapsed else 0.0,
+            "baseline_rss_mib": baseline_rss,
+            "peak_rss_mib": _peak_rss_mib(),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per synthetic dataset")
+    parser.add_argument("--dims", type=int, default=1024, help="Vector dimensions")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run")
+    parser.add_argument("--profile", type=Path, help="Write cProfile output (.prof + .txt summary) per stage here")
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/ingest-<time>.json)")
+    args = parser.parse_args()
+
+    if args.profile:
+        # Stages run in a temporary directory, so a relative path would not resolve there
+        args.profile = args.profile.resolve()
+        args.profile.mkdir(parents=True, exist_ok=True)
+    repo_root = str(Path.cwd())
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+
+    with tempfile.TemporaryDirectory() as root:
+        root_path = Path(root)
+        print(f"Generating {args.rows:,} synthetic rows per dataset ({args.dims}-dim vectors)...")
+        for workdir in ("populate/data", "populate_float16/data", "populate_int8/data", "dev1/data", "dev0/raw"):
+            (root_path / workdir).mkdir(parents=True)
+        write_vector_files(root_path / "populate/data", args.rows, args.dims)
+        for dtype in ("float16", "int8"):
+            write_vector_files(root_path / f"populate_{dtype}/data", args.rows, args.dims, sidecar_dtype=dtype)
+        write_raw_files(root_path / "dev1/data", args.rows)
+        pq.write_table(
+            make_raw_table(np.random.default_rng(1), args.rows), root_path / "dev0/raw/wykonos_movies.parquet"
+        )
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        stages = []
+        print(f"{'stage':<34}{'rows':>10}{'seconds':>10}{'rows/sec':>12}{'peak RSS (MiB)':>16}")
+        for name in args.stages.split(","):
+            process = context.Process(target=run_stage, args=(name, root, args.profile, results))
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                print(f"{name:<34} failed (exit code {process.exitcode})")
+                continue
+            stage = results.get()
+            stages.append(stage)
+            print(
+                f"{name:<34}{stage['rows']:>10,}{stage['seconds']:>10.2f}"
+                f"{stage['rows_per_sec']:>12,.0f}{stage['peak_rss_mib']:>16.0f}"
+            )
+
+    output = args.output or RESULTS_DIR / f"ingest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"benchmark": "ingest", "rows": args.rows, "dims": args.dims, "stages": stages}, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark: payload size and deserialization cost of full objects vs. projected properties.
+
+Builds gRPC search replies shaped like the wide `_dev_1_build_dataset.py` schema, and
+compares them with replies containing only `MOVIE_PROPERTIES`. For each variant it
+measures the encoded reply size, and the time to decode the reply, convert it to
+Python dicts (as the Weaviate client does) and build the `Movie` models.
+
+Usage:
+    python -m benchmarks.projection [--objects 20] [--repeats 2000]
+"""
+
+import argparse
+import random
+import struct
+import time
+from datetime import datetime, timezone
+
+from weaviate.proto.v1 import properties_pb2, search_get_pb2
+
+from main_complete import MOVIE_PROPERTIES, Movie
+
+WORDS = "love war space family friend city night dark secret return story last world life".split()
+
+
+def make_wide_properties(rng: random.Random) -> dict:
+    def words(n: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    return {
+        "movie_id": rng.randint(1, 1_000_000),
+        "title": words(3).title(),
+        "overview": words(60),
+        "original_language": "en",
+        "tagline": words(8),
+        "poster_path": f"/{rng.getrandbits(64):x}.jpg",
+        "genres": rng.sample(["Action", "Drama", "Comedy", "Thriller", "Romance", "Horror"], 2),
+        "keywords": [words(2) for _ in range(15)],
+        "credits": [words(2).title() for _ in range(25)],
+        "recommendations": [rng.randint(1, 1_000_000) for _ in range(20)],
+        "budget": rng.randint(0, 200_000_000),
+        "revenue": rng.randint(0, 1_000_000_000),
+        "vote_average": rng.uniform(0, 10),
+        "vote_count": rng.randint(0, 30_000),
+        "popularity": rng.uniform(0, 500),
+        "runtime": rng.randint(70, 200),
+        "year": rng.randint(1930, 2025),
+        "release_date": datetime(2000, 1, 1, tzinfo=timezone.utc),
+    }
+
+
+def to_value(value) -> properties_pb2.Value:
+    if isinstance(value, str):
+        return properties_pb2.Value(text_value=value)
+    if isinstance(value, bool):
+        return properties_pb2.Value(bool_value=value)
+    if isinstance(value, int):
+        return properties_pb2.Value(int_value=value)
+    if isinstance(value, float):
+        return properties_pb2.Value(number_value=value)
+    if isinstance(value, datetime):
+        return properties_pb2.Value(date_value=value.isoformat())
+    if value and isinstance(value[0], str):
+        return properties_pb2.Value(
+            list_value=properties_pb2.ListValue(text_values=properties_pb2.TextValues(values=value))
+        )
+    packed = struct.pack(f"<{len(value)}q", *value)
+    return properties_pb2.Value(
+        list_value=properties_pb2.ListValue(int_values=properties_pb2.IntValues(values=packed))
+    )
+
+
+def make_reply(objects: list[dict]) -> bytes:
+    results = [
+        search_get_pb2.SearchResult(
+            properties=search_get_pb2.PropertiesResult(
+                non_ref_props=properties_pb2.Properties(
+                    fields={k: to_value(v) for k, v in props.items()}
+                )
+            )
+        )
+        for props in objects
+    ]
+    return search_get_pb2.SearchReply(results=results).SerializeToString()
+
+
+def from_value(value: properties_pb2.Value):
+    # Mirrors the Weaviate client's deserialization of non-reference properties
+    kind = value.WhichOneof("kind")
+    if kind == "date_value":
+        return datetime.fromisoformat(value.date_value)
+    if kind == "list_value":
+        lv = value.list_value
+        if lv.HasField("text_values"):
+            return list(lv.text_values.values)
+        raw = lv.int_values.values
+        return list(struct.unpack(f"<{len(raw) // 8}q", raw))
+    return getattr(value, kind)
+
+
+def decode_and_build(payload: bytes) -> list[Movie]:
+    reply = search_get_pb2.SearchReply.FromString(payload)
+    return [
+        Movie(**{k: from_value(v) for k, v in r.properties.non_ref_props.fields.items()})
+        for r in reply.results
+    ]
+
+
+def bench(payload: bytes, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        decode_and_build(payload)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--objects", type=int, default=20, help="Objects per response")
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    wide = [make_wide_properties(rng) for _ in range(args.objects)]
+    projected = [{k: o[k] for k in MOVIE_PROPERTIES} for o in wide]
+
+    wide_payload, projected_payload = make_reply(wide), make_reply(projected)
+    wide_time = bench(wide_payload, args.repeats)
+    projected_time = bench(projected_payload, args.repeats)
+
+    print(f"Objects per response: {args.objects}")
+    print(f"{'variant':<12}{'payload (bytes)':>18}{'decode+build (µs)':>20}")
+    print(f"{'full':<12}{len(wide_payload):>18,}{wide_time * 1e6:>20.1f}")
+    print(f"{'projected':<12}{len(projected_payload):>18,}{projected_time * 1e6:>20.1f}")
+    print(
+        f"Payload reduced by {1 - len(projected_payload) / len(wide_payload):.0%}, "
+        f"per-request time reduced by {1 - projected_time / wide_time:.0%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
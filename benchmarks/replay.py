@@ -0,0 +1,187 @@
+"""
+Replay captured traffic: send the requests of the API's query logs (see query_log.py) with
+their original timing, sped up or slowed down, and report latency per route.
+
+By default the API is started with the fake backends of benchmarks/api_load.py, so runs are
+comparable between builds; pass --base-url to replay against a running server instead.
+Writes the results as JSON; pass --compare <baseline.json> to fail on regressions.
+
+Usage:
+    python -m benchmarks.replay [--log data/query_logs/queries.*.jsonl] [--speed 2] [--limit 5000]
+    python -m benchmarks.replay --speed 0 --compare benchmarks/results/replay-<baseline>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.api_load import RESULTS_DIR, free_port, git_revision, server_memory, summarize, wait_for_server
+from query_log import REPLAY_HEADER, entry_params, is_redacted, log_files, read_entries
+
+
+def load_entries(paths: list[Path], limit: int) -> list[dict]:
+    """Logged GET requests to API routes (logged in full), in time order (the first `limit` of them)."""
+    entries = [
+        entry
+        for entry in read_entries(paths)
+        if entry.get("method", "GET") == "GET" and entry.get("route") and "ts" in entry and not is_redacted(entry)
+    ]
+    entries.sort(key=lambda entry: entry["ts"])
+    return entries[:limit] if limit else entries
+
+
+async def replay(base_url: str, entries: list[dict], speed: float, concurrency: int) -> dict:
+    """
+    Send each entry at its logged offset from the first one, divided by `speed` (0 sends
+    everything at once), with at most `concurrency` requests in flight.
+    """
+    latencies: dict[str, list[float]] = {}
+    lags: list[float] = []  # How late requests were sent, when the server or client falls behind
+    errors = mismatches = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    first_ts = entries[0]["ts"]
+
+    async def send(client: httpx.AsyncClient, entry: dict, start: float):
+        nonlocal errors, mismatches
+        due = start + ((entry["ts"] - first_ts) / speed if speed > 0 else 0.0)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            sent = time.perf_counter()
+            lags.append(sent - due)
+            try:
+                response = await client.get(entry["path"], params=entry_params(entry))
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies.setdefault(entry["route"], []).append(time.perf_counter() - sent)
+            errors += status == 0 or status >= 500
+            mismatches += status != entry.get("status", status)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    headers = {REPLAY_HEADER.decode(): "replay"}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, headers=headers, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(send(client, entry, start) for entry in entries))
+        elapsed = time.perf_counter() - start
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        "requests": len(entries),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(entries) / elapsed,
+        "errors": errors,
+        "status_mismatches": mismatches,
+        "send_lag": summarize(lags),
+        "overall": summarize(all_latencies),
+        "routes": {route: summarize(values) for route, values in sorted(latencies.items())},
+    }
+
+
+def compare(current: dict, baseline_path: Path, tolerance: float) -> bool:
+    """Print p95 deltas per route against a baseline; return False on a regression."""
+    baseline = json.loads(baseline_path.read_text())
+    ok = True
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    pairs = [("overall", current["overall"], baseline["overall"])] + [
+        (route, summary, baseline["routes"][route])
+        for route, summary in current["routes"].items()
+        if route in baseline["routes"]
+    ]
+    for name, summary, base in pairs:
+        if not base["p95_ms"]:
+            continue
+        change = summary["p95_ms"] / base["p95_ms"] - 1
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"  {name:<20} p95 {change:+.1%}{'  <-- REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--log", nargs="+", type=Path, help="Query log files (default: all in QUERY_LOG_DIR)")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N requests")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time scale: 2 = twice as fast, 0 = no delays")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--base-url", help="Replay against this running server, instead of one with fake backends")
+    parser.add_argument("--weaviate-latency-ms", type=float, default=20)
+    parser.add_argument("--anthropic-latency-ms", type=float, default=500)
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/replay-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="Baseline results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    paths = args.log or log_files()
+    entries = load_entries(paths, args.limit)
+    if not entries:
+        sys.exit(f"No requests to replay in {len(paths)} log files")
+    span = entries[-1]["ts"] - entries[0]["ts"]
+    print(f"Replaying {len(entries)} requests spanning {span:.0f}s at speed {args.speed or 'max'}")
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        env = {
+            **os.environ,
+            "BENCH_WEAVIATE_LATENCY_MS": str(args.weaviate_latency_ms),
+            "BENCH_ANTHROPIC_LATENCY_MS": str(args.anthropic_latency_ms),
+            "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", "benchmark"),
+            "QUERY_LOG_ENABLED": "0",
+        }
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.api_load", "--serve", str(port)], env=env)
+    try:
+        wait_for_server(base_url)
+        result = asyncio.run(replay(base_url, entries, args.speed, args.concurrency))
+        if server is not None:
+            result["server_memory"] = server_memory(server.pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    overall = result["overall"]
+    print(
+        f"{result['throughput_rps']:8.1f} req/s  p50 {overall['p50_ms']:7.1f} ms  "
+        f"p95 {overall['p95_ms']:7.1f} ms  p99 {overall['p99_ms']:7.1f} ms  errors {result['errors']}  "
+        f"status mismatches {result['status_mismatches']}  send lag p95 {result['send_lag']['p95_ms']:.1f} ms"
+    )
+    for route, summary in result["routes"].items():
+        print(f"  {route:<20} {summary['count']:>6}  p50 {summary['p50_ms']:7.1f} ms  p95 {summary['p95_ms']:7.1f} ms")
+
+    results = {
+        "benchmark": "replay",
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "logs": [str(path) for path in paths],
+            "speed": args.speed,
+            "concurrency": args.concurrency,
+            "base_url": args.base_url,
+            "weaviate_latency_ms": None if args.base_url else args.weaviate_latency_ms,
+            "anthropic_latency_ms": None if args.base_url else args.anthropic_latency_ms,
+        },
+        **result,
+    }
+    output = args.output or RESULTS_DIR / f"replay-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Microbenchmark: per-response overhead of building and serializing Movie list responses.
+
+Compares, for a /search response of 20 movies:
+- fastapi: building the response model, then FastAPI's `response_model` handling
+  (validating again, serializing, and encoding with `json`), as the endpoints used to do
+- validated: `serialization.json_response`, validating once and serializing to bytes
+- trusted: `serialization.json_response` with validation skipped
+
+Usage:
+    python -m benchmarks.serialization [--objects 20] [--repeats 5000]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from main_complete import SearchResponse
+from serialization import json_response
+
+WORDS = "love war space family friend city night dark secret return story last world life".split()
+
+
+def make_movies(count: int, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "movie_id": rng.randint(1, 1_000_000),
+            "title": " ".join(rng.choice(WORDS) for _ in range(3)).title(),
+            "overview": " ".join(rng.choice(WORDS) for _ in range(60)),
+            "genres": rng.sample(["Action", "Drama", "Comedy", "Thriller", "Romance"], 2),
+            "popularity": rng.uniform(0, 500),
+            "year": rng.randint(1930, 2025),
+        }
+        for _ in range(count)
+    ]
+
+
+async def bench(movies: list[dict], repeats: int) -> dict[str, float]:
+    field = create_model_field(name="Response_search", type_=SearchResponse, mode="serialization")
+
+    async def fastapi_path() -> bytes:
+        model = SearchResponse(movies=movies, current_page=1)
+        content = await serialize_response(field=field, response_content=model, is_coroutine=True)
+        return JSONResponse(content).body
+
+    async def validated_path() -> bytes:
+        return json_response(SearchResponse, {"movies": movies, "current_page": 1}, validate=True).body
+
+    async def trusted_path() -> bytes:
+        return json_response(SearchResponse, {"movies": movies, "current_page": 1}, validate=False).body
+
+    timings = {}
+    for name, path in [("fastapi", fastapi_path), ("validated", validated_path), ("trusted", trusted_path)]:
+        await path()  # Warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            await path()
+        timings[name] = (time.perf_counter() - start) / repeats
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--objects", type=int, default=20, help="Movies per response")
+    parser.add_argument("--repeats", type=int, default=5000)
+    args = parser.parse_args()
+
+    movies = make_movies(args.objects, random.Random(42))
+    timings = asyncio.run(bench(movies, args.repeats))
+
+    print(f"Movies per response: {args.objects}")
+    baseline = timings["fastapi"]
+    for name, seconds in timings.items():
+        print(f"{name:<12}{seconds * 1e6:>10.1f} µs/response{baseline / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Startup benchmark: cold import time and baseline memory of the API process.
+
+Imports `main_complete` in fresh interpreters under `python -X importtime`, and reports
+the median import time, resident memory after import, and the slowest top-level packages.
+Fails (exit code 1) when the import time or RSS exceeds its limit, or when an ingest-only
+dependency (`datasets`, `pandas` ...) is imported on the serving path.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--max-seconds 3.0] [--max-rss-mib 150]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path("benchmarks/results")
+MODULE = "main_complete"
+# Only needed by ingest / dev scripts; must stay lazy on the serving path
+INGEST_ONLY_MODULES = ["datasets", "pandas", "pyarrow", "sentence_transformers", "torch"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+rss_kib = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmRSS:"))
+print(json.dumps({{"seconds": seconds, "rss_mib": rss_kib / 1024, "modules": sorted(sys.modules)}}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """Self time per top-level package, in seconds, from `-X importtime` output."""
+    totals: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:") :].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return dict(totals)
+
+
+def measure(module: str) -> tuple[dict, dict[str, float]]:
+    """Import `module` in a fresh interpreter, returning the probe results and import profile."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure (median is reported)")
+    parser.add_argument("--max-seconds", type=float, default=3.0, help="Import time limit")
+    parser.add_argument("--max-rss-mib", type=float, default=150.0, help="RSS limit after import")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/startup-<time>.json)")
+    args = parser.parse_args()
+
+    measure(MODULE)  # Warm the OS file cache, so runs measure Python rather than disk
+    runs, profiles = zip(*(measure(MODULE) for _ in range(args.runs)))
+    seconds = statistics.median(run["seconds"] for run in runs)
+    rss_mib = statistics.median(run["rss_mib"] for run in runs)
+    packages = {name: statistics.median(p.get(name, 0.0) for p in profiles) for name in profiles[0]}
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[: args.top]
+    ingest_only = [name for name in INGEST_ONLY_MODULES if name in runs[0]["modules"]]
+
+    print(f"import {MODULE}: {seconds:.2f}s (median of {args.runs}), RSS {rss_mib:.0f} MiB")
+    print(f"\n{'package':<24}{'self time (s)':>14}")
+    for name, package_seconds in slowest:
+        print(f"{name:<24}{package_seconds:>14.3f}")
+
+    failures = []
+    if seconds > args.max_seconds:
+        failures.append(f"import time {seconds:.2f}s exceeds {args.max_seconds:.2f}s")
+    if rss_mib > args.max_rss_mib:
+        failures.append(f"RSS {rss_mib:.0f} MiB exceeds {args.max_rss_mib:.0f} MiB")
+    if ingest_only:
+        failures.append(f"ingest-only modules imported while serving: {', '.join(ingest_only)}")
+
+    output = args.output or RESULTS_DIR / f"startup-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "benchmark": "startup",
+                "module": MODULE,
+                "runs": args.runs,
+                "seconds": seconds,
+                "rss_mib": rss_mib,
+                "slowest_packages": dict(slowest),
+                "ingest_only_modules": ingest_only,
+                "failures": failures,
+            },
+            indent=2,
+        )
+    )
+    print(f"\nResults written to {output}")
+
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import math
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Optional
+from fastapi import HTTPException
+from metrics import REGISTRY, Counter, current_endpoint
+
+COALESCED = REGISTRY.register(
+    Counter(
+        "movieinsights_coalesced_requests_total",
+        "Requests served by joining an identical in-flight request",
+        ["endpoint"],
+    )
+)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls: while a call for a key is in flight, callers with
+    the same key wait for it and share its result (or exception), instead of repeating it.
+
+    Nothing is kept once the call completes; caching results is left to the caches.
+
+    Waiting callers hold a worker thread without going through a ConcurrencyLimiter, so at
+    most `max_waiters` (across all keys) wait, for up to `wait_timeout` seconds each; callers
+    beyond that get `503 Service Unavailable` with a `Retry-After` header.
+    """
+
+    def __init__(self, max_waiters: Optional[int] = None, wait_timeout: Optional[float] = None):
+        self.max_waiters = max_waiters
+        self.wait_timeout = wait_timeout
+        self.retry_after = str(max(1, math.ceil(wait_timeout or 1)))
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.shed = 0
+
+    def _reject(self, reason: str) -> HTTPException:
+        with self._lock:
+            self.shed += 1
+        return HTTPException(
+            status_code=503,
+            detail=f"Too many identical requests in flight ({reason}), retry later",
+            headers={"Retry-After": self.retry_after},
+        )
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                waiters_full = self.max_waiters is not None and self._waiting >= self.max_waiters
+                if not waiters_full:
+                    self._waiting += 1
+
+        if not leader:
+            if waiters_full:
+                raise self._reject("too many waiting")
+            COALESCED.inc(current_endpoint())
+            try:
+                finished = flight.done.wait(self.wait_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not finished:
+                raise self._reject("wait timeout")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "waiting": self._waiting,
+                "max_waiters": self.max_waiters,
+                "shed": self.shed,
+            }
+
+
+class ConcurrencyLimiter:
+    """
+    Cap concurrent upstream calls, queueing up to `max_queue` callers for up to
+    `queue_timeout` seconds. Callers beyond that are shed with `429 Too Many Requests`
+    and a `Retry-After` header, rather than piling more load onto Weaviate / Anthropic.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = str(max(1, math.ceil(queue_timeout)))
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._active = 0
+        self.shed = 0
+
+    def _reject(self, reason: str) -> HTTPException:
+        with self._lock:
+            self.shed += 1
+        return HTTPException(
+            status_code=429,
+            detail=f"Too many concurrent requests ({reason}), retry later",
+            headers={"Retry-After": self.retry_after},
+        )
+
+    @contextmanager
+    def slot(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                queue_full = self._waiting >= self.max_queue
+                if not queue_full:
+                    self._waiting += 1
+            if queue_full:
+                raise self._reject("queue full")
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise self._reject("queue timeout")
+
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self._active,
+                "waiting": self._waiting,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "shed": self.shed,
+            }
@@ -0,0 +1,62 @@
+import importlib.util
+import os
+import re
+import zlib
+from functools import lru_cache
+import numpy as np
+
+
+# Same model as the collection's vectorizer (see populate_complete.py)
+EMBEDDING_MODEL = "Snowflake/snowflake-arctic-embed-l-v2.0"
+# "sentence-transformers": run EMBEDDING_MODEL locally (the `semantic` extra: `uv sync --extra semantic`)
+# "hashing": dependency-free hashed word & character n-gram vectors; these measure word overlap,
+# not meaning, so they are only a fallback. The default is the first one installed.
+EMBEDDING_BACKEND = os.getenv(
+    "EMBEDDING_BACKEND",
+    "sentence-transformers" if importlib.util.find_spec("sentence_transformers") else "hashing",
+)
+HASHING_DIMENSIONS = 1024
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace, so trivial variations share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def _hash_token(token: str) -> int:
+    # crc32 is stable across processes, unlike `hash()`
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def hashing_embed(text: str, dimensions: int = HASHING_DIMENSIONS) -> np.ndarray:
+    """Embed text as an L2-normalized bag of hashed words and character trigrams."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in normalize_text(text).split():
+        vector[_hash_token(word) % dimensions] += 2.0
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            vector[_hash_token(padded[i : i + 3]) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+@lru_cache(maxsize=1)
+def _load_sentence_transformer(model: str):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ImportError(
+            "The 'sentence-transformers' embedding backend requires the `semantic` extra "
+            "(`uv sync --extra semantic`)."
+        ) from e
+    return SentenceTransformer(model)
+
+
+def embed_text(text: str, backend: str = EMBEDDING_BACKEND) -> np.ndarray:
+    """Embed a single text as an L2-normalized float32 vector."""
+    if backend == "hashing":
+        return hashing_embed(text)
+    if backend == "sentence-transformers":
+        model = _load_sentence_transformer(EMBEDDING_MODEL)
+        return model.encode(text, normalize_embeddings=True).astype(np.float32)
+    raise ValueError(f"Unknown embedding backend: {backend}")
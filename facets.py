@@ -0,0 +1,199 @@
+import glob
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence
+import numpy as np
+
+
+# Written by populate at ingest; the API falls back to building the facets from Weaviate
+FACETS_FILE = Path(os.getenv("FACETS_FILE", "data/facets.npz"))
+PERCENTILES = (50, 75, 90, 99)
+
+
+def build_facets(movies: Iterable[dict]) -> Dict[str, np.ndarray]:
+    """
+    Precompute facet arrays from movie properties (movie_id, genres, year, popularity).
+
+    Movies are sorted by year, so any year window is a contiguous range of rows:
+    - year_start[i]: first row of year first_year + i (with one extra entry for the end), which
+      doubles as the prefix sum of movies per year
+    - genre_cumulative[g, i]: movies of genre g before year first_year + i (prefix sums)
+    - genre_pairs[g, h, i]: movies of both genres g and h before year first_year + i, so counts
+      filtered by one genre are prefix sum lookups too (genre_pairs[g, g] is genre_cumulative[g])
+    - bitmaps[g]: rows of genre g, one bit per row (np.packbits), to combine genres
+    - popularity_percentiles[g]: PERCENTILES of popularity per genre, and overall in the last row
+    """
+    movies = list(movies)
+    years = np.array([movie["year"] for movie in movies], dtype=np.int32)
+    order = np.argsort(years, kind="stable")
+    movies = [movies[i] for i in order]
+    years = years[order]
+    popularity = np.array([movie.get("popularity") or 0.0 for movie in movies], dtype=np.float32)
+
+    genres = sorted({genre for movie in movies for genre in movie.get("genres") or ()})
+    genre_index = {genre: i for i, genre in enumerate(genres)}
+    membership = np.zeros((len(genres), len(movies)), dtype=bool)
+    for row, movie in enumerate(movies):
+        for genre in movie.get("genres") or ():
+            membership[genre_index[genre], row] = True
+
+    first_year = int(years[0]) if len(years) else 0
+    last_year = int(years[-1]) if len(years) else -1
+    year_start = np.searchsorted(years, np.arange(first_year, last_year + 2)).astype(np.int64)
+    genre_pairs = np.zeros((len(genres), len(genres), last_year - first_year + 2), dtype=np.int64)
+    for g in range(len(genres)):
+        for h in range(g, len(genres)):
+            both = membership[g] & membership[h]
+            per_year = np.bincount(years[both] - first_year, minlength=last_year - first_year + 1)
+            genre_pairs[g, h, 1:] = genre_pairs[h, g, 1:] = np.cumsum(per_year)
+    genre_cumulative = genre_pairs[np.arange(len(genres)), np.arange(len(genres))]
+
+    percentiles = np.zeros((len(genres) + 1, len(PERCENTILES)), dtype=np.float32)
+    for g, mask in enumerate([*membership, np.ones(len(movies), dtype=bool)]):
+        if mask.any():
+            percentiles[g] = np.percentile(popularity[mask], PERCENTILES)
+
+    return {
+        "genres": np.array(genres, dtype=str),
+        "first_year": np.array(first_year),
+        "year_start": year_start,
+        "genre_cumulative": genre_cumulative,
+        "genre_pairs": genre_pairs,
+        "bitmaps": np.packbits(membership, axis=1),
+        "movie_ids": np.array([movie["movie_id"] for movie in movies], dtype=np.int64),
+        "popularity_percentiles": percentiles,
+        "percentiles": np.array(PERCENTILES),
+    }
+
+
+def facets_from_parquet(pattern: str = "data/movies_popular_w_vectors_*.parquet") -> Dict[str, np.ndarray]:
+    """Build the facets from the exported data files (the properties only, not the vectors)."""
+    import pyarrow.parquet as pq
+
+    movies = []
+    for path in sorted(glob.glob(pattern)):
+        properties = pq.read_table(path, columns=["properties"]).column("properties")
+        movies.extend(properties.to_pylist())
+    return build_facets(movies)
+
+
+def write_facets(arrays: Dict[str, np.ndarray], generation: int, path: Path = FACETS_FILE):
+    """
+    Atomically write the facet arrays for ingest `generation`.
+
+    Write them before bumping the generation, so the API never sees a newer generation
+    without its facets (and rebuilds them from Weaviate in the meantime).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(tmp_path, **arrays, generation=np.array(generation))
+    tmp_path.replace(path)
+
+
+def read_facets(generation: int, path: Path = FACETS_FILE) -> Optional[Dict[str, np.ndarray]]:
+    """The facet arrays written for ingest `generation`, or None if the file is missing or for another one."""
+    try:
+        with np.load(path) as arrays:
+            if "generation" not in arrays.files or int(arrays["generation"]) != generation:
+                return None
+            return {name: arrays[name] for name in arrays.files}
+    except FileNotFoundError:
+        return None
+
+
+def _popcount(bits: np.ndarray, start: int, end: int) -> int:
+    """Set bits in rows [start, end) of a packed bitmap."""
+    if start >= end:
+        return 0
+    chunk = bits[start // 8 : (end - 1) // 8 + 1].copy()
+    chunk[0] &= 0xFF >> (start % 8)  # packbits is big-endian: the first row is the high bit
+    chunk[-1] &= (0xFF << (7 - (end - 1) % 8)) & 0xFF
+    return int(np.bitwise_count(chunk).sum())
+
+
+class Facets:
+    """Genre and year facet counts for any year window, from arrays made by `build_facets`."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.genres = [str(genre) for genre in arrays["genres"]]
+        self.first_year = int(arrays["first_year"])
+        self.year_start = arrays["year_start"]
+        self.last_year = self.first_year + len(self.year_start) - 2
+        self.genre_cumulative = arrays["genre_cumulative"]
+        # Not in facets written before genre pairs were precomputed (then counted from the bitmaps)
+        self.genre_pairs = arrays.get("genre_pairs")
+        self.bitmaps = arrays["bitmaps"]
+        self.movie_ids = arrays["movie_ids"]
+        self.popularity_percentiles = arrays["popularity_percentiles"]
+        self.percentiles = [int(p) for p in arrays["percentiles"]]
+        self._genre_index = {genre: i for i, genre in enumerate(self.genres)}
+        self._genre_names = {genre.casefold(): genre for genre in self.genres}
+        # Ingest generation the arrays were written for (None if built on the fly)
+        self.generation = int(arrays["generation"]) if "generation" in arrays else None
+
+    @classmethod
+    def load(cls, path: Path = FACETS_FILE) -> "Facets":
+        with np.load(path) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def canonical_genre(self, genre: str) -> Optional[str]:
+        """The known genre matching `genre` regardless of case and surrounding spaces, or None."""
+        return self._genre_names.get(genre.strip().casefold())
+
+    def percentiles_for(self, genre: Optional[str] = None) -> dict[str, float]:
+        """Popularity percentiles of a genre (of all movies if None), over all years."""
+        row = self._genre_index[genre] if genre is not None else len(self.genres)
+        return {f"p{p}": float(value) for p, value in zip(self.percentiles, self.popularity_percentiles[row])}
+
+    def _selection(self, genres: Sequence[str]) -> Optional[np.ndarray]:
+        """Packed bitmap of the movies having all of `genres`."""
+        selection = None
+        for genre in genres:
+            if genre not in self._genre_index:
+                return np.zeros((len(self.movie_ids) + 7) // 8, dtype=np.uint8)
+            bits = self.bitmaps[self._genre_index[genre]]
+            selection = bits if selection is None else selection & bits
+        return selection
+
+    def counts(
+        self, year_min: Optional[int] = None, year_max: Optional[int] = None, genres: Sequence[str] = ()
+    ) -> dict:
+        """
+        Movie counts per genre and per year within [year_min, year_max], optionally only of
+        movies having all of `genres`. Without `genres` or with one, this is a constant number of
+        prefix sum lookups per genre and year; with more, a popcount over the window's rows.
+        """
+        year_min = self.first_year if year_min is None else max(year_min, self.first_year)
+        year_max = self.last_year if year_max is None else min(year_max, self.last_year)
+        if year_min > year_max:
+            return {"year_min": year_min, "year_max": year_max, "total": 0, "genres": {}, "years": {}}
+        a, b = year_min - self.first_year, year_max - self.first_year + 1
+        start, end = int(self.year_start[a]), int(self.year_start[b])
+
+        selection = None
+        if not genres:
+            genre_cumulative, year_cumulative = self.genre_cumulative, self.year_start
+        elif len(genres) == 1 and self.genre_pairs is not None and genres[0] in self._genre_index:
+            g = self._genre_index[genres[0]]
+            genre_cumulative, year_cumulative = self.genre_pairs[g], self.genre_pairs[g, g]
+        else:
+            selection = self._selection(genres)
+
+        if selection is None:
+            total = int(year_cumulative[b] - year_cumulative[a])
+            genre_counts = genre_cumulative[:, b] - genre_cumulative[:, a]
+            year_counts = np.diff(year_cumulative[a : b + 1])
+        else:
+            total = _popcount(selection, start, end)
+            genre_counts = [_popcount(selection & bits, start, end) for bits in self.bitmaps]
+            rows = np.unpackbits(selection[start // 8 : (end + 7) // 8])[start % 8 : start % 8 + end - start]
+            cumulative = np.concatenate([[0], np.cumsum(rows)])
+            year_counts = np.diff(cumulative[self.year_start[a : b + 1] - start])
+
+        return {
+            "year_min": year_min,
+            "year_max": year_max,
+            "total": total,
+            "genres": {genre: int(count) for genre, count in zip(self.genres, genre_counts) if count},
+            "years": {year_min + i: int(count) for i, count in enumerate(year_counts) if count},
+        }
@@ -0,0 +1,104 @@
+import threading
+import time
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+from helpers import get_ingest_generation
+
+
+T = TypeVar("T")
+
+
+class GenerationCache(Generic[T]):
+    """
+    Holds a value built by `loader`, and rebuilds it in a background thread.
+
+    The value is rebuilt when the ingest generation changes (checked every
+    `poll_interval` seconds), or once it is older than `max_age` seconds.
+    Reads never block on a rebuild once a value is available.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], T],
+        poll_interval: float = 5.0,
+        max_age: float = 300.0,
+        name: str = "cache",
+    ):
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.name = name
+        # The value and the ingest generation it was loaded at, replaced together
+        self._entry: Optional[Tuple[T, int]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def generation(self) -> Optional[int]:
+        """Ingest generation of the current value (None if nothing is loaded yet)."""
+        entry = self._entry
+        return entry[1] if entry is not None else None
+
+    def refresh(self) -> T:
+        """Rebuild the value now."""
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> T:
+        generation = get_ingest_generation()
+        value = self.loader()
+        self._entry, self._loaded_at = (value, generation), time.monotonic()
+        return value
+
+    def get(self) -> T:
+        """
+        Return the cached value, loading it synchronously if nothing is loaded yet.
+        Concurrent cold callers share one load: the first loads, the others wait for it.
+        """
+        return self.get_with_generation()[0]
+
+    def get_with_generation(self) -> Tuple[T, int]:
+        """Like `get`, along with the ingest generation the value was loaded at."""
+        entry = self._entry
+        if entry is None:
+            with self._lock:
+                entry = self._entry  # Loaded by another caller (or the refresh thread) meanwhile?
+                if entry is None:
+                    self._load()
+                    entry = self._entry
+        return entry
+
+    def is_stale(self) -> bool:
+        entry = self._entry
+        return (
+            entry is None
+            or entry[1] != get_ingest_generation()
+            or time.monotonic() - self._loaded_at > self.max_age
+        )
+
+    def start(self):
+        """Start the background refresh thread; the first load also happens in the background."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.is_stale():
+                try:
+                    with self._lock:
+                        if self.is_stale():  # Unless a cold get() just loaded it
+                            self._load()
+                except Exception as e:
+                    # Keep serving the previous value, and try again on the next poll
+                    print(f"Failed to refresh {self.name}: {e}")
+            self._stop.wait(self.poll_interval)
@@ -1,11 +1,11 @@
 import weaviate
 from weaviate import WeaviateClient
 import os
+from pathlib import Path
 from anthropic import Anthropic
 from enum import Enum
 from datetime import datetime, timezone
 from collections.abc import Iterator
-from datasets import load_dataset
 from typing import Dict, Union, Literal, Optional
 
 
@@ -15,6 +15,28 @@ class CollectionName(str, Enum):
     MOVIES = "Movies"
 
 
+# Written by the ingestion scripts, so readers can tell when the collection's data changed
+INGEST_GENERATION_FILE = Path(os.getenv("INGEST_GENERATION_FILE", "data/.ingest_generation"))
+
+
+def get_ingest_generation() -> int:
+    """Return the current ingest generation, or 0 if no ingest has been recorded."""
+    try:
+        return int(INGEST_GENERATION_FILE.read_text().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def mark_ingest_generation() -> int:
+    """Record a completed ingest by bumping the ingest generation. Returns the new generation."""
+    generation = get_ingest_generation() + 1
+    INGEST_GENERATION_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = INGEST_GENERATION_FILE.with_suffix(".tmp")
+    tmp_file.write_text(str(generation))
+    tmp_file.replace(INGEST_GENERATION_FILE)  # Atomic, so readers never see a partial write
+    return generation
+
+
 def connect_to_weaviate() -> WeaviateClient:
     anthropic_key = os.getenv("ANTHROPIC_API_KEY")
     if anthropic_key is None:
@@ -47,31 +69,175 @@ def process_int_categorical(raw_string: Union[str, None]) -> Union[list[int], No
     return processed_data
 
 
-def get_data_objects() -> Iterator[Dict[str, Union[datetime, str, int]]]:
-    ds = load_dataset("wykonos/movies", streaming=True)["train"]
-    for item in ds:
-        if item["release_date"] == None:
-            release_date = None
-        else:
-            release_date = datetime.strptime(item["release_date"], "%Y-%m-%d").replace(
-                tzinfo=timezone.utc
-            )
-
-        yield {
-            "title": item["title"],
-            "overview": item["overview"],
-            "genres": process_str_categorical(item["genres"]),
-            "keywords": process_str_categorical(item["keywords"]),
-            "credits": process_str_categorical(item["credits"]),
-            "movie_id": item["id"],
-            "budget": int(item["budget"]),
-            "revenue": int(item["revenue"]),
-            "vote_average": item["vote_average"],
-            "release_date": release_date,
+# Local, decoded copy of the source dataset: written on first use by `get_data_objects`, then
+# memory-mapped on later runs instead of re-streaming and re-parsing the dataset row by row.
+# DATASET_SOURCE may also be a local .parquet/.jsonl file with the same columns (e.g. the
+# fixture in `fixtures/`), to work fully offline. The snapshot records the source and its
+# revision, and is rebuilt when they no longer match (e.g. after switching DATASET_SOURCE).
+DATASET_SOURCE = os.getenv("DATASET_SOURCE", "wykonos/movies")
+DATASET_REVISION = os.getenv("DATASET_REVISION")  # Hub dataset revision (default: latest)
+DATASET_SNAPSHOT = os.getenv("DATASET_SNAPSHOT", "1") == "1"
+DATASET_SNAPSHOT_FILE = Path(os.getenv("DATASET_SNAPSHOT_FILE", "data/wykonos_movies.arrow"))
+
+
+def _decode_item(item: Dict) -> Dict[str, Union[datetime, str, int]]:
+    if item["release_date"] == None:
+        release_date = None
+    else:
+        release_date = datetime.strptime(item["release_date"], "%Y-%m-%d").replace(
+            tzinfo=timezone.utc
+        )
+
+    return {
+        "title": item["title"],
+        "overview": item["overview"],
+        "genres": process_str_categorical(item["genres"]),
+        "keywords": process_str_categorical(item["keywords"]),
+        "credits": process_str_categorical(item["credits"]),
+        "movie_id": item["id"],
+        "budget": int(item["budget"]),
+        "revenue": int(item["revenue"]),
+        "vote_average": item["vote_average"],
+        "release_date": release_date,
+    }
+
+
+def _read_raw_dataset(source: str):
+    """The raw dataset as a pyarrow Table, from a local file or the Hugging Face hub."""
+    import pyarrow.json
+    import pyarrow.parquet as pq
+
+    if source.endswith(".parquet"):
+        return pq.read_table(source)
+    if source.endswith(".jsonl"):
+        return pyarrow.json.read_json(source)
+
+    from datasets import load_dataset
+
+    return load_dataset(source, split="train", revision=DATASET_REVISION).data.table
+
+
+def dataset_revision(source: str = DATASET_SOURCE) -> Optional[str]:
+    """
+    A string identifying the current version of a dataset source: the modification time and
+    size of a local file, or the hub revision (commit). None if it cannot be determined, e.g.
+    offline, in which case a snapshot of the same source is trusted.
+    """
+    if source.endswith((".parquet", ".jsonl")):
+        stat = Path(source).stat()
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+    try:
+        from huggingface_hub import HfApi
+
+        return HfApi().dataset_info(source, revision=DATASET_REVISION).sha
+    except Exception:
+        return DATASET_REVISION
+
+
+def snapshot_is_current(path: Path = DATASET_SNAPSHOT_FILE, source: str = DATASET_SOURCE) -> bool:
+    """Whether the snapshot at `path` was built from the current version of `source`."""
+    import pyarrow as pa
+
+    if not path.exists():
+        return False
+    with pa.memory_map(str(path)) as snapshot:
+        metadata = pa.ipc.open_file(snapshot).schema.metadata or {}
+    if metadata.get(b"source", b"").decode() != source:
+        return False
+    revision = dataset_revision(source)
+    return revision is None or metadata.get(b"revision", b"").decode() == revision
+
+
+def decode_dataset(raw):
+    """Vectorized equivalent of `_decode_item`, over a whole pyarrow Table."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    release_date = raw["release_date"]
+    if not pa.types.is_timestamp(release_date.type):  # JSON sources are already parsed
+        release_date = pc.strptime(release_date, format="%Y-%m-%d", unit="s", error_is_null=True)
+    return pa.table(
+        {
+            "title": raw["title"],
+            "overview": raw["overview"],
+            "genres": pc.split_pattern(raw["genres"], "-"),
+            "keywords": pc.split_pattern(raw["keywords"], "-"),
+            "credits": pc.split_pattern(raw["credits"], "-"),
+            "movie_id": raw["id"],
+            "budget": pc.cast(raw["budget"], pa.int64()),
+            "revenue": pc.cast(raw["revenue"], pa.int64()),
+            "vote_average": raw["vote_average"],
+            "release_date": release_date.cast(pa.timestamp("s", tz="UTC")),
         }
+    )
+
+
+def build_dataset_snapshot(source: str = DATASET_SOURCE, path: Path = DATASET_SNAPSHOT_FILE) -> Path:
+    """Decode the dataset once, and save it as an (uncompressed, memory-mappable) Arrow IPC file."""
+    import pyarrow as pa
+
+    revision = dataset_revision(source)
+    table = decode_dataset(_read_raw_dataset(source))
+    table = table.replace_schema_metadata({"source": source, "revision": revision or ""})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=10_000)
+    tmp_path.replace(path)
+    return path
+
+
+def _column_to_pylist(column) -> list:
+    """
+    Convert an Arrow array to Python objects; for strings, lists and timestamps this is
+    several times faster than `to_pylist()`, which boxes every value as an Arrow scalar.
+    """
+    import pyarrow as pa
+
+    if pa.types.is_list(column.type):
+        values = _column_to_pylist(column.flatten())
+        offsets = column.offsets.to_numpy()
+        offsets = (offsets - offsets[0]).tolist()
+        valid = column.is_valid().to_numpy(zero_copy_only=False).tolist()
+        return [values[offsets[i] : offsets[i + 1]] if valid[i] else None for i in range(len(column))]
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        return column.to_numpy(zero_copy_only=False).tolist()
+    if pa.types.is_timestamp(column.type) and column.type.tz == "UTC":
+        naive = column.cast(pa.timestamp(column.type.unit)).to_pylist()
+        return [None if d is None else d.replace(tzinfo=timezone.utc) for d in naive]
+    return column.to_pylist()
+
+
+def get_data_objects() -> Iterator[Dict[str, Union[datetime, str, int]]]:
+    if not DATASET_SNAPSHOT:
+        # Imported here: `datasets` (and pandas/pyarrow with it) is only needed for ingestion,
+        # and would otherwise add ~1s to every API worker's startup
+        from datasets import load_dataset
+
+        ds = load_dataset(DATASET_SOURCE, streaming=True, revision=DATASET_REVISION)["train"]
+        for item in ds:
+            yield _decode_item(item)
+        return
 
+    import pyarrow as pa
 
-def call_claude(prompt: str) -> str:
+    if not snapshot_is_current(DATASET_SNAPSHOT_FILE, DATASET_SOURCE):
+        print(f"Building dataset snapshot {DATASET_SNAPSHOT_FILE} from {DATASET_SOURCE}...")
+        build_dataset_snapshot(DATASET_SOURCE, DATASET_SNAPSHOT_FILE)
+
+    # Memory-mapped: record batches reference the file's pages directly, without copies
+    with pa.memory_map(str(DATASET_SNAPSHOT_FILE)) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            columns = [_column_to_pylist(column) for column in batch.columns]
+            for values in zip(*columns):
+                yield dict(zip(batch.schema.names, values))
+
+
+def call_claude(prompt: str, usage: Optional[Dict[str, int]] = None) -> str:
+    """Send a single prompt to Claude. If given, `usage` accumulates the tokens used."""
 
     client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
 
@@ -85,10 +251,21 @@ def call_claude(prompt: str) -> str:
         ],
         model="claude-3-5-haiku-latest",
     )
+    if usage is not None:
+        usage["input_tokens"] = usage.get("input_tokens", 0) + message.usage.input_tokens
+        usage["output_tokens"] = usage.get("output_tokens", 0) + message.usage.output_tokens
     return message.content[0].text
 
 
-def movie_occasion_to_query(occasion: str) -> str:
+def generative_usage_tokens(generative) -> int:
+    """Total tokens reported in a Weaviate generative result's metadata (0 if not reported)."""
+    usage = getattr(getattr(generative, "metadata", None), "usage", None)
+    if usage is None:
+        return 0
+    return usage.input_tokens + usage.output_tokens
+
+
+def movie_occasion_to_query(occasion: str, usage: Optional[Dict[str, int]] = None) -> str:
 
     prompt = f"""
     I would like to perform a vector search to find movies best matching this occasion
@@ -101,4 +278,4 @@ def movie_occasion_to_query(occasion: str) -> str:
 
     IMPORTANT: Only include the search string text in your response and nothing else.
     """
-    return call_claude(prompt)
+    return call_claude(prompt, usage=usage)
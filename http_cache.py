@@ -0,0 +1,154 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode
+from helpers import get_ingest_generation
+
+
+# Cache-Control max-age (seconds) per endpoint; responses only change on ingest,
+# which changes their ETags, so clients can always revalidate cheaply
+CACHE_MAX_AGE = {
+    "/search": int(os.getenv("CACHE_MAX_AGE_SEARCH", "300")),
+    "/explore": int(os.getenv("CACHE_MAX_AGE_EXPLORE", "300")),
+    "/movie/{movie_id}": int(os.getenv("CACHE_MAX_AGE_MOVIE", "3600")),
+    "/info": int(os.getenv("CACHE_MAX_AGE_INFO", "60")),
+    "/suggest": int(os.getenv("CACHE_MAX_AGE_SUGGEST", "300")),
+    "/facets": int(os.getenv("CACHE_MAX_AGE_FACETS", "3600")),
+}
+GENERATION_CHECK_SECONDS = 1.0  # Re-read the ingest generation marker at most this often
+# Set by endpoints serving data loaded at a known ingest generation (see `data_generation_headers`);
+# used for the ETag instead of the marker, and removed from the response
+DATA_GENERATION_HEADER = b"x-data-generation"
+
+
+def code_version() -> str:
+    """
+    Identifies the deployed code, so a deploy changing response shapes invalidates ETags:
+    BUILD_ID if set (e.g. the git commit), else a hash of the API's Python sources.
+    """
+    build_id = os.getenv("BUILD_ID")
+    if build_id:
+        return build_id
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+CODE_VERSION = code_version()
+
+
+def data_generation_headers(generation: int) -> Dict[str, str]:
+    """Response headers recording the ingest generation of the data an endpoint served."""
+    return {DATA_GENERATION_HEADER.decode(): str(generation)}
+
+
+class HTTPCacheMiddleware:
+    """
+    ASGI middleware adding conditional request support to cacheable GET endpoints.
+
+    Responses get a weak ETag derived from the ingest generation, the API `version`, the
+    deployed code (`code_version`) and the request (path and sorted query parameters), plus
+    `Cache-Control: public, max-age=...`.
+    Requests whose `If-None-Match` matches are answered `304 Not Modified` without
+    reaching the endpoint.
+
+    Endpoints served from in-memory caches may lag the ingest generation marker, so for
+    them the generation comes from the data itself: `generations` gives the generation
+    each route's cache currently holds (for the 304 check; None until it is loaded), and
+    the response's DATA_GENERATION_HEADER the generation of the data actually sent.
+    """
+
+    def __init__(
+        self,
+        app,
+        version: str = "",
+        max_age: Optional[Dict[str, int]] = None,
+        generations: Optional[Dict[str, Callable[[], Optional[int]]]] = None,
+        code_version: str = CODE_VERSION,
+    ):
+        self.app = app
+        self.version = f"{version}+{code_version}"
+        self.generations = generations or {}
+        # Match on the static part of each path template, e.g. "/movie/" for "/movie/{movie_id}"
+        self.routes = [
+            (template, template.split("{")[0], "{" in template, seconds)
+            for template, seconds in (max_age or CACHE_MAX_AGE).items()
+        ]
+        self._generation = 0
+        self._generation_checked_at = float("-inf")
+
+    def _match(self, path: str) -> Optional[tuple[str, int]]:
+        for template, prefix, is_prefix, seconds in self.routes:
+            if path == prefix or (is_prefix and path.startswith(prefix) and "/" not in path[len(prefix) :]):
+                return template, seconds
+        return None
+
+    def generation(self) -> int:
+        now = time.monotonic()
+        if now - self._generation_checked_at > GENERATION_CHECK_SECONDS:
+            self._generation = get_ingest_generation()
+            self._generation_checked_at = now
+        return self._generation
+
+    def etag(self, path: str, query_string: bytes, generation: Optional[int] = None) -> str:
+        query = urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+        generation = self.generation() if generation is None else generation
+        key = f"{generation}|{self.version}|{path}?{query}"
+        return f'W/"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        match = self._match(scope["path"])
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+
+        template, max_age = match
+        cache_control = (b"cache-control", f"public, max-age={max_age}".encode())
+        if template in self.generations:
+            generation = self.generations[template]()
+            etag = None if generation is None else self.etag(scope["path"], scope["query_string"], generation)
+        else:
+            etag = self.etag(scope["path"], scope["query_string"])
+
+        if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode("latin-1")
+        if etag is not None and if_none_match and _etag_matches(etag, if_none_match):
+            scope["metrics_endpoint"] = template  # Routing is skipped, so label metrics here
+            headers = [(b"etag", etag.encode()), cache_control]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cache_headers(message):
+            nonlocal etag
+            if message["type"] == "http.response.start":
+                headers, data_generation = [], None
+                for name, value in message.get("headers", []):
+                    if name == DATA_GENERATION_HEADER:
+                        data_generation = value
+                    else:
+                        headers.append((name, value))
+                if data_generation is not None:
+                    etag = self.etag(scope["path"], scope["query_string"], int(data_generation))
+                elif etag is None:
+                    etag = self.etag(scope["path"], scope["query_string"])
+                if message["status"] == 200:
+                    headers += [(b"etag", etag.encode()), cache_control]
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_headers)
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header value."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
@@ -1,18 +1,174 @@
 from fastapi import FastAPI, HTTPException, Query
-from typing import Optional
+from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager
+import asyncio
+from typing import Optional, Literal
 from pydantic import BaseModel
-from weaviate.classes.query import Filter, GenerativeConfig
-from helpers import connect_to_weaviate, CollectionName, movie_occasion_to_query
+from weaviate.classes.query import Filter, GenerativeConfig, MetadataQuery, Sort
+from weaviate.classes.generate import GenerativeParameters
+from helpers import (
+    connect_to_weaviate,
+    CollectionName,
+    movie_occasion_to_query,
+    call_claude,
+    generative_usage_tokens,
+    get_ingest_generation,
+)
+from generation_cache import GenerationCache
+from query_filters import build_year_filter, fetch_year_filtered, year_range_filter
+from ranking import weighted_popularity_rerank
+from semantic_cache import SemanticCache
+from pipelined_recommend import pipelined_recommendation, rewrite_cache
+from query_embeddings import QueryEmbeddingCache, near_query
+from rag_context import build_context, context_prompt
+from recommendation_store import RecommendationStore
+from suggest import TitleIndex
+from facets import Facets, build_facets, read_facets
+from serialization import json_response
+from http_cache import HTTPCacheMiddleware, data_generation_headers
+from concurrency import ConcurrencyLimiter, SingleFlight
+from query_log import (
+    QUERY_LOG_ENABLED,
+    QUERY_LOG_SAMPLE_RATE,
+    QueryLogger,
+    QueryLogMiddleware,
+    log_files,
+    read_entries,
+    top_requests,
+    warm_up,
+)
+from embeddings import EMBEDDING_BACKEND, normalize_text
+import shared_state
+from metrics import (
+    REGISTRY,
+    InstrumentedClient,
+    MetricsMiddleware,
+    cache_stats_collector,
+    http_error,
+    report_error,
+    timed,
+)
 import uvicorn
+import json
+import os
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background caches on startup, and stop them on shutdown"""
+    info_cache.start()
+    suggest_index.start()
+    facets_cache.start()
+    if RECOMMEND_PRECOMPUTED_ENABLED:
+        precomputed_recommendations.start()
+    if QUERY_LOG_ENABLED:
+        query_logger.start()
+    verify_task = (
+        asyncio.create_task(asyncio.to_thread(verify_query_embeddings))
+        if query_embedding_cache is not None
+        else None
+    )
+    warm_up_task = (
+        asyncio.create_task(warm_up_from_query_log())
+        if QUERY_LOG_WARMUP_TOP_N and QUERY_LOG_WARMUP_ROUTES
+        else None
+    )
+    yield
+    for task in (verify_task, warm_up_task):
+        if task is not None:
+            task.cancel()
+    info_cache.stop()
+    suggest_index.stop()
+    facets_cache.stop()
+    precomputed_recommendations.stop()
+    query_logger.stop()
 
 
 app = FastAPI(
     title="MovieInsights API",
     description="A movie discovery and recommendation platform using Weaviate",
     version="0.1.0",
+    lifespan=lifespan,
+)
+# Sampled request capture (see query_log.py), behind the HTTP cache, so only requests that reach an endpoint
+query_logger = QueryLogger()
+if QUERY_LOG_ENABLED:
+    app.add_middleware(QueryLogMiddleware, logger=query_logger, sample_rate=QUERY_LOG_SAMPLE_RATE)
+# Conditional GETs (ETag / Cache-Control) are answered inside the metrics middleware, so 304s are counted
+app.add_middleware(
+    HTTPCacheMiddleware,
+    version=app.version,
+    # These endpoints serve in-memory caches, which can lag the ingest generation marker
+    generations={
+        "/info": lambda: info_cache.generation,
+        "/suggest": lambda: suggest_index.generation,
+        "/facets": lambda: facets_cache.generation,
+    },
 )
+app.add_middleware(MetricsMiddleware)
 
 PAGE_SIZE = 20
+EXPLORE_CANDIDATE_POOL = 100  # Candidates considered by the "weighted" explore ranking
+EXPLORE_POPULARITY_WEIGHT = 0.5  # 0 = pure relevance, 1 = pure popularity
+# /info is served from memory; check for new ingests this often, and refresh at least this often
+INFO_CACHE_POLL_SECONDS = float(os.getenv("INFO_CACHE_POLL_SECONDS", "5"))
+INFO_CACHE_MAX_AGE_SECONDS = float(os.getenv("INFO_CACHE_MAX_AGE_SECONDS", "300"))
+# /suggest is served from an in-memory title index, rebuilt on ingest (and at least this often)
+SUGGEST_INDEX_MAX_AGE_SECONDS = float(os.getenv("SUGGEST_INDEX_MAX_AGE_SECONDS", "3600"))
+SUGGEST_MAX_LIMIT = 20
+# /recommend responses are cached by occasion meaning; see embeddings.py for the embedding backend.
+# The "hashing" fallback measures word overlap, not meaning ("a movie for my 5 year old" matches
+# "... 15 year old"), so the cache is only on by default with the `semantic` extra installed.
+RECOMMEND_CACHE_ENABLED = (
+    os.getenv("RECOMMEND_CACHE_ENABLED", "0" if EMBEDDING_BACKEND == "hashing" else "1") == "1"
+)
+RECOMMEND_CACHE_THRESHOLD = float(os.getenv("RECOMMEND_CACHE_THRESHOLD", "0.9"))
+RECOMMEND_CACHE_TTL_SECONDS = float(os.getenv("RECOMMEND_CACHE_TTL_SECONDS", "3600"))
+RECOMMEND_CACHE_CAPACITY = int(os.getenv("RECOMMEND_CACHE_CAPACITY", "1000"))
+# Serve /recommend for common occasions from the store written by precompute_recommendations.py
+RECOMMEND_PRECOMPUTED_ENABLED = os.getenv("RECOMMEND_PRECOMPUTED_ENABLED", "1") == "1"
+# Send repeat query texts to Weaviate as vectors, skipping server-side vectorization (see query_embeddings.py).
+# Vectors are computed locally with the collection's vectorizer model (the `semantic` extra), and only used
+# once checked against Weaviate's own query vectors on startup.
+QUERY_EMBEDDING_CACHE_ENABLED = os.getenv("QUERY_EMBEDDING_CACHE_ENABLED", "0") == "1"
+QUERY_EMBEDDING_CACHE_FILE = os.getenv("QUERY_EMBEDDING_CACHE_FILE", "data/query_embeddings.sqlite")
+QUERY_EMBEDDING_CACHE_CAPACITY = int(os.getenv("QUERY_EMBEDDING_CACHE_CAPACITY", "10000"))
+# Overlap the /recommend query rewrite with a retrieval on the raw occasion, and merge both result
+# sets (see pipelined_recommend.py): the rewrite's LLM round trip is off the critical path
+RECOMMEND_PIPELINED = os.getenv("RECOMMEND_PIPELINED", "0") == "1"
+# Token budget for the movies in the /recommend prompt. When set, retrieved movies are deduplicated,
+# trimmed and cut to the budget locally, and the prompt is sent to Claude directly instead of as a
+# Weaviate grouped task (which sends every retrieved object in full). 0 disables it.
+RECOMMEND_CONTEXT_BUDGET_TOKENS = int(os.getenv("RECOMMEND_CONTEXT_BUDGET_TOKENS", "0"))
+RECOMMEND_CONTEXT_OVERVIEW_TOKENS = int(os.getenv("RECOMMEND_CONTEXT_OVERVIEW_TOKENS", "100"))
+# On startup, replay the N most frequent logged requests to these routes in-process, to warm the caches.
+# By default, only routes with a per-process cache enabled: /search fills the query embedding cache,
+# and /recommend the response and rewrite caches (at the cost of LLM calls in every worker).
+# /info, /suggest and /facets load their caches on startup anyway, and the other routes have none.
+QUERY_LOG_WARMUP_TOP_N = int(os.getenv("QUERY_LOG_WARMUP_TOP_N", "0"))
+QUERY_LOG_WARMUP_ROUTES = [
+    route
+    for route in os.getenv(
+        "QUERY_LOG_WARMUP_ROUTES",
+        ("/search," if QUERY_EMBEDDING_CACHE_ENABLED else "")
+        + ("/recommend" if RECOMMEND_CACHE_ENABLED or RECOMMEND_PIPELINED else ""),
+    ).split(",")
+    if route
+]
+QUERY_LOG_WARMUP_CONCURRENCY = int(os.getenv("QUERY_LOG_WARMUP_CONCURRENCY", "4"))
+# Upstream concurrency per endpoint: at most N calls in flight, up to M more queued for T seconds,
+# and the rest shed with 429. Identical concurrent requests are coalesced into one call first, with
+# at most W callers waiting on in-flight calls (for up to T seconds), and the rest shed with 503.
+# Queued and waiting requests hold a worker thread, so keep the totals below the threadpool size
+# (40 by default), leaving threads for the other endpoints.
+RECOMMEND_MAX_CONCURRENCY = int(os.getenv("RECOMMEND_MAX_CONCURRENCY", "6"))
+RECOMMEND_MAX_QUEUE = int(os.getenv("RECOMMEND_MAX_QUEUE", "4"))
+RECOMMEND_MAX_WAITERS = int(os.getenv("RECOMMEND_MAX_WAITERS", "4"))
+RECOMMEND_QUEUE_TIMEOUT_SECONDS = float(os.getenv("RECOMMEND_QUEUE_TIMEOUT_SECONDS", "10"))
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "10"))
+SEARCH_MAX_QUEUE = int(os.getenv("SEARCH_MAX_QUEUE", "4"))
+SEARCH_MAX_WAITERS = int(os.getenv("SEARCH_MAX_WAITERS", "4"))
+SEARCH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SEARCH_QUEUE_TIMEOUT_SECONDS", "2"))
 
 
 # Pydantic models for request/response
@@ -25,6 +181,10 @@ class Movie(BaseModel):
     year: int
 
 
+# Only fetch the properties the response models need, even if the collection has a wider schema
+MOVIE_PROPERTIES = list(Movie.model_fields)
+
+
 class SearchResponse(BaseModel):
     movies: list[Movie]
     current_page: int
@@ -40,6 +200,7 @@ class ExplorerResponse(BaseModel):
     genre: str
     year_min: Optional[int]
     year_max: Optional[int]
+    ranking: str
 
 
 class RecommendationResponse(BaseModel):
@@ -54,6 +215,89 @@ class InfoResponse(BaseModel):
     sample_movies: list[Movie]
 
 
+class Suggestion(BaseModel):
+    movie_id: int
+    title: str
+    year: int
+
+
+class SuggestResponse(BaseModel):
+    suggestions: list[Suggestion]
+    query: str
+
+
+# The title index also needs popularity, to rank suggestions
+SUGGEST_PROPERTIES = [*Suggestion.model_fields, "popularity"]
+FACET_PROPERTIES = ["movie_id", "genres", "year", "popularity"]
+
+
+class FacetsResponse(BaseModel):
+    year_min: int
+    year_max: int
+    total: int
+    genres: dict[str, int]
+    years: dict[int, int]
+    decades: dict[int, int]
+    popularity_percentiles: dict[str, float]
+
+
+recommendation_cache = SemanticCache(
+    threshold=RECOMMEND_CACHE_THRESHOLD,
+    ttl=RECOMMEND_CACHE_TTL_SECONDS,
+    capacity=RECOMMEND_CACHE_CAPACITY,
+    generation=get_ingest_generation,  # Recommendations describe the ingested data
+)
+query_embedding_cache = (
+    QueryEmbeddingCache(QUERY_EMBEDDING_CACHE_FILE, capacity=QUERY_EMBEDDING_CACHE_CAPACITY)
+    if QUERY_EMBEDDING_CACHE_ENABLED
+    else None
+)
+precomputed_recommendations = RecommendationStore(poll_interval=INFO_CACHE_POLL_SECONDS)
+cache_stats = {"recommendation": recommendation_cache.stats, "rewrite": rewrite_cache.stats}
+if RECOMMEND_PRECOMPUTED_ENABLED:
+    cache_stats["precomputed_recommendation"] = precomputed_recommendations.stats
+if query_embedding_cache is not None:
+    cache_stats["query_embedding"] = query_embedding_cache.stats
+REGISTRY.register_collector(cache_stats_collector(cache_stats))
+recommend_flight = SingleFlight(RECOMMEND_MAX_WAITERS, RECOMMEND_QUEUE_TIMEOUT_SECONDS)
+recommend_limiter = ConcurrencyLimiter(
+    RECOMMEND_MAX_CONCURRENCY, RECOMMEND_MAX_QUEUE, RECOMMEND_QUEUE_TIMEOUT_SECONDS
+)
+search_flight = SingleFlight(SEARCH_MAX_WAITERS, SEARCH_QUEUE_TIMEOUT_SECONDS)
+search_limiter = ConcurrencyLimiter(
+    SEARCH_MAX_CONCURRENCY, SEARCH_MAX_QUEUE, SEARCH_QUEUE_TIMEOUT_SECONDS
+)
+
+
+def connect() -> InstrumentedClient:
+    """Connect to Weaviate, timing the connection and the queries made with it"""
+    with timed("connect"):
+        return InstrumentedClient(connect_to_weaviate())
+
+
+async def warm_up_from_query_log():
+    requests = await asyncio.to_thread(
+        lambda: top_requests(read_entries(log_files()), QUERY_LOG_WARMUP_TOP_N, QUERY_LOG_WARMUP_ROUTES)
+    )
+    await warm_up(app, requests, concurrency=QUERY_LOG_WARMUP_CONCURRENCY)
+
+
+def verify_query_embeddings():
+    """Check local query vectors against the collection's vectorizer; none are served until this passes"""
+    try:
+        with connect() as client:
+            query_embedding_cache.verify(client.collections.use(CollectionName.MOVIES))
+    except Exception as e:
+        report_error(e, "Query embedding cache disabled")
+
+
+def cached_query_vector(text: str):
+    """The cached vector for a query text, or None (then computed in the background for next time)"""
+    if query_embedding_cache is None:
+        return None
+    return query_embedding_cache.get_or_schedule(text)
+
+
 @app.get("/")
 def root():
     """Root endpoint with API information"""
@@ -63,13 +307,112 @@ def root():
         "endpoints": [
             "/info - Get basic information about the dataset",
             "/search - Search movies by text",
+            "/suggest - Suggest movie titles as the user types",
             "/movie/{movie_id} - Get movie details and similar movies",
             "/explore - Explore movies by genre and year",
+            "/facets - Movie counts by genre and year",
             "/recommend - Get movie recommendations for occasions",
+            "/stats - Get cache statistics",
+            "/metrics - Prometheus metrics",
         ],
     }
 
 
+def load_dataset_info() -> InfoResponse:
+    """Fetch the dataset information served by /info from Weaviate"""
+    with connect() as client:
+        # Student TODO:
+        # - Get total count
+        # - Fetch some movies
+        # Write your code here according to the instructions
+        sample_movies = [o.properties for o in sample_movies_response]
+
+    with timed("validation"):
+        return InfoResponse(movies_count=movies_count, sample_movies=sample_movies)
+
+
+# The data only changes on ingest, so keep it in memory and refresh it in the background
+def load_shared_dataset_info() -> InfoResponse:
+    """Use the /info snapshot published for all workers by serve.py, falling back to Weaviate"""
+    data = shared_state.load_bytes(
+        "info", get_ingest_generation(), max_age=INFO_CACHE_MAX_AGE_SECONDS
+    )
+    if data is None:
+        return load_dataset_info()
+    with timed("validation"):
+        return InfoResponse.model_validate_json(data)
+
+
+def publish_shared_state(generation: int):
+    """Build read-only state once for all workers (see serve.py), instead of once per worker"""
+    shared_state.publish_bytes("info", generation, load_dataset_info().model_dump_json().encode())
+    # Titles only change on ingest, so unlike /info they are not republished as they age
+    if shared_state.snapshot_age("titles", generation) is None:
+        shared_state.publish_bytes(
+            "titles", generation, json.dumps(fetch_all_properties(SUGGEST_PROPERTIES)).encode()
+        )
+    if shared_state.snapshot_age("facets", generation) is None:
+        shared_state.publish_arrays("facets", generation, load_facet_arrays())
+
+
+def fetch_all_properties(properties: list[str]) -> list[dict]:
+    """Fetch some properties of every movie from Weaviate"""
+    with connect() as client:
+        movies = client.collections.use(CollectionName.MOVIES)
+        with timed("weaviate_query"):
+            return [
+                o.properties
+                for o in movies.iterator(return_properties=properties, cache_size=1000)
+            ]
+
+
+def load_title_index() -> TitleIndex:
+    """Build the /suggest index from the titles published by serve.py, falling back to Weaviate"""
+    data = shared_state.load_bytes("titles", get_ingest_generation())
+    if data is None:
+        return TitleIndex(fetch_all_properties(SUGGEST_PROPERTIES), top_k=SUGGEST_MAX_LIMIT)
+    return TitleIndex(json.loads(data), top_k=SUGGEST_MAX_LIMIT)
+
+
+suggest_index = GenerationCache(
+    load_title_index,
+    poll_interval=INFO_CACHE_POLL_SECONDS,
+    max_age=SUGGEST_INDEX_MAX_AGE_SECONDS,
+    name="suggest index",
+)
+
+
+def load_facet_arrays() -> dict:
+    """Read the /facets arrays written at ingest, or build them from Weaviate if they are for another generation"""
+    arrays = read_facets(get_ingest_generation())
+    if arrays is None:
+        arrays = build_facets(fetch_all_properties(FACET_PROPERTIES))
+    return arrays
+
+
+def load_facets() -> Facets:
+    """Memory-map the /facets arrays published for all workers by serve.py, falling back to loading them"""
+    arrays = shared_state.load_arrays("facets", get_ingest_generation())
+    if arrays is None:
+        arrays = load_facet_arrays()
+    return Facets(arrays)
+
+
+facets_cache = GenerationCache(
+    load_facets,
+    poll_interval=INFO_CACHE_POLL_SECONDS,
+    max_age=INFO_CACHE_MAX_AGE_SECONDS,
+    name="facets",
+)
+
+info_cache = GenerationCache(
+    load_shared_dataset_info,
+    poll_interval=INFO_CACHE_POLL_SECONDS,
+    max_age=INFO_CACHE_MAX_AGE_SECONDS,
+    name="info cache",
+)
+
+
 @app.get("/info", response_model=InfoResponse)
 def get_dataset_info():
     """
@@ -78,17 +421,11 @@ def get_dataset_info():
     - Some example movies
     """
     try:
-        with connect_to_weaviate() as client:
-            # Student TODO:
-            # - Get total count
-            # - Fetch some movies
-            # Write your code here according to the instructions
-            sample_movies = [o.properties for o in sample_movies_response]
-
-        return InfoResponse(movies_count=movies_count, sample_movies=sample_movies)
+        info, generation = info_cache.get_with_generation()
+        return json_response(InfoResponse, info, headers=data_generation_headers(generation))
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        raise http_error(e)
 
 
 @app.get("/search", response_model=SearchResponse)
@@ -124,18 +461,54 @@ def search_movies(
             # Student TODO: Build a filter (`filters`) where `year` is less than or equal to `year_max`
             # Write your code here according to the instructions
 
-        with connect_to_weaviate() as client:
-            # Student TODO: Perform a hybrid search, with:
-            # Query: q, offset: offset, limit: PAGE_SIZE, filters= filters, target "default" vector
-            # Write your code here according to the instructions
+        # Optionally widen the filter to whole decades, and cut the exact range locally
+        year_filter = build_year_filter(year_min, year_max, filters)
+        filters = year_filter.filters
+
+        def run_search():
+            # With a cached query vector, hybrid search skips vectorizing q on the server
+            query_vector = cached_query_vector(q)
+            with search_limiter.slot(), connect() as client:
+
+                def search(query_offset: int, query_limit: int):
+                    # Student TODO: Perform a hybrid search, with:
+                    # Query: q, offset: query_offset, limit: query_limit, filters= filters, target "default" vector
+                    # Write your code here according to the instructions
+                    return response.objects
+
+                return fetch_year_filtered(search, year_filter, offset, PAGE_SIZE)
+
+        page_objects = search_flight.do((q, offset, year_min, year_max), run_search)
 
-        return SearchResponse(
-            movies=[o.properties for o in response.objects],
-            current_page=page,
+        return json_response(
+            SearchResponse,
+            {"movies": [o.properties for o in page_objects], "current_page": page},
         )
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        raise http_error(e)
+
+
+@app.get("/suggest", response_model=SuggestResponse)
+def suggest_titles(
+    q: str = Query(..., min_length=1, description="The start of a movie title, or of any word in it"),
+    limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT, description="Suggestions to return"),
+):
+    """
+    Title typeahead, served from an in-memory prefix index without querying Weaviate
+    - Matches titles with a word starting with q (e.g. "kni" finds "The Dark Knight")
+    - Most popular movies first
+    """
+    try:
+        index, generation = suggest_index.get_with_generation()
+        return json_response(
+            SuggestResponse,
+            {"suggestions": index.suggest(q, limit), "query": q},
+            headers=data_generation_headers(generation),
+        )
+
+    except Exception as e:
+        raise http_error(e)
 
 
 @app.get("/movie/{movie_id}", response_model=MovieDetailResponse)
@@ -146,7 +519,10 @@ def get_movie_details(movie_id: str):
     - Returns top 15 most similar movies
     """
     try:
-        with connect_to_weaviate() as client:
+        if not movie_id.isdigit():
+            raise HTTPException(status_code=400, detail="movie_id must be an integer")
+
+        with connect() as client:
             # Student TODO:
             # - Fetch movie by ID from Weaviate (the `movie_id` property should be `int(movie_id)` exactly)
             # - Use the retuend object's UUID to find PAGE_SIZE number of similar movies
@@ -155,12 +531,13 @@ def get_movie_details(movie_id: str):
                 o.properties for o in response.objects[1:]  # Exclude itself
             ]
 
-        return MovieDetailResponse(
-            movie=movie.properties, similar_movies=similar_movies
+        return json_response(
+            MovieDetailResponse,
+            {"movie": movie.properties, "similar_movies": similar_movies},
         )
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        raise http_error(e)
 
 
 @app.get("/explore", response_model=ExplorerResponse)
@@ -172,6 +549,14 @@ def explore_movies(
     year_max: Optional[int] = Query(
         None, description="Filter by release year - to this year"
     ),
+    ranking: Literal["relevance", "weighted", "popularity"] = Query(
+        "relevance",
+        description=(
+            "relevance: best genre matches, sorted by popularity; "
+            "weighted: blend of genre relevance and popularity over a larger candidate pool; "
+            "popularity: most popular movies tagged with exactly this genre (server-side sort)"
+        ),
+    ),
 ):
     """
     Explore movies by genre(s) and optional year
@@ -180,32 +565,225 @@ def explore_movies(
     - Sorted by popularity/rating
     """
     try:
-        with connect_to_weaviate() as client:
+        if ranking == "popularity":
+            # This ranking filters on the genre exactly, so map it to a known (case-sensitive) genre
+            facets = facets_cache.get()
+            known_genre = facets.canonical_genre(genre)
+            if known_genre is None:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Unknown genre {genre!r}, expected one of: {', '.join(facets.genres)}",
+                )
+            genre = known_genre
+
+        with connect() as client:
             movies = client.collections.use(CollectionName.MOVIES)
 
             # Student TODO:
             # Build filters (`filters`) just like we did for `search_movies` above
             # Write your code here according to the instructions
 
-            # Student TODO:
-            # Perform a hybrid search for the given genres.
-            # Target `genres` vector, apply the filters, and limit to PAGE_SIZE results
-            # Write your code here according to the instructions
-            sorted_movies = sorted(
-                [o.properties for o in response.objects],
-                key=lambda x: x["popularity"],
-                reverse=True,
-            )
+            year_filter = build_year_filter(year_min, year_max, filters)
+            filters = year_filter.filters
+
+            if ranking == "popularity":
+                # Let Weaviate sort the exact genre matches, so only the final page is fetched
+                genre_filter = Filter.by_property("genres").contains_any([genre])
+                page_objects = fetch_year_filtered(
+                    lambda query_offset, query_limit: movies.query.fetch_objects(
+                        filters=genre_filter if filters is None else genre_filter & filters,
+                        sort=Sort.by_property("popularity", ascending=False),
+                        offset=query_offset,
+                        limit=query_limit,
+                        return_properties=MOVIE_PROPERTIES,
+                    ).objects,
+                    year_filter,
+                    0,
+                    PAGE_SIZE,
+                )
+                sorted_movies = [o.properties for o in page_objects]
+            elif ranking == "weighted":
+                # Rank a larger candidate pool using only scores and popularity,
+                # then fetch full objects for the final page
+                candidates = fetch_year_filtered(
+                    lambda query_offset, query_limit: movies.query.hybrid(
+                        query=genre,
+                        target_vector="genres",
+                        filters=filters,
+                        offset=query_offset,
+                        limit=query_limit,
+                        return_properties=["popularity", "year"],
+                        return_metadata=MetadataQuery(score=True),
+                    ).objects,
+                    year_filter,
+                    0,
+                    EXPLORE_CANDIDATE_POOL,
+                )
+                top_ids = [
+                    o.uuid
+                    for o in weighted_popularity_rerank(
+                        candidates, EXPLORE_POPULARITY_WEIGHT, PAGE_SIZE
+                    )
+                ]
+                if top_ids:
+                    response = movies.query.fetch_objects(
+                        filters=Filter.by_id().contains_any(top_ids),
+                        limit=len(top_ids),
+                        return_properties=MOVIE_PROPERTIES,
+                    )
+                    by_id = {o.uuid: o.properties for o in response.objects}
+                    sorted_movies = [by_id[i] for i in top_ids if i in by_id]
+                else:
+                    sorted_movies = []
+            else:
+
+                def explore(query_offset: int, query_limit: int):
+                    # Student TODO:
+                    # Perform a hybrid search for the given genres.
+                    # Target `genres` vector, apply the filters, and use `query_offset` and `query_limit`
+                    # Write your code here according to the instructions
+                    return response.objects
+
+                sorted_movies = sorted(
+                    [o.properties for o in fetch_year_filtered(explore, year_filter, 0, PAGE_SIZE)],
+                    key=lambda x: x["popularity"],
+                    reverse=True,
+                )
+
+        return json_response(
+            ExplorerResponse,
+            {
+                "movies": sorted_movies,
+                "genre": genre,
+                "year_min": year_min,
+                "year_max": year_max,
+                "ranking": ranking,
+            },
+        )
 
-        return ExplorerResponse(
-            movies=sorted_movies,
-            genre=genre,
-            year_min=year_min,
-            year_max=year_max,
+    except Exception as e:
+        raise http_error(e)
+
+
+@app.get("/facets", response_model=FacetsResponse)
+def get_facets(
+    year_min: Optional[int] = Query(None, description="Count movies from this year"),
+    year_max: Optional[int] = Query(None, description="Count movies up to this year"),
+    genre: Optional[list[str]] = Query(None, description="Only count movies with all of these genres"),
+):
+    """
+    Movie counts per genre, year and decade within a year window, precomputed at ingest
+    - Optional genre filter (movies with all of the given genres)
+    - Popularity percentiles of the genre (with a single genre), or of all movies, over all years
+    """
+    try:
+        facets, generation = facets_cache.get_with_generation()
+        counts = facets.counts(year_min, year_max, genre or ())
+        decades = {}
+        for year, count in counts["years"].items():
+            decades[year // 10 * 10] = decades.get(year // 10 * 10, 0) + count
+        single_genre = genre[0] if genre and len(genre) == 1 and genre[0] in facets.genres else None
+        return json_response(
+            FacetsResponse,
+            {
+                **counts,
+                "decades": decades,
+                "popularity_percentiles": facets.percentiles_for(single_genre),
+            },
+            headers=data_generation_headers(generation),
         )
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        raise http_error(e)
+
+
+def build_recommendation(occasion: str) -> tuple[dict, int]:
+    """Rewrite the occasion into a query, and run the RAG query. Returns the recommendation and the tokens used"""
+    full_task_prompt = f"""
+        The user is interested in movie recommendations for this occasion:
+        ========== OCCASION INPUT FROM USER ==========
+        {occasion}
+        ========== END INPUT ==========
+
+        Out of these movies, recommend 2-4 suitable movies, and describe why, so the user can choose for themselves.
+
+        IMPORTANT: Only include the recommendation text in your response and nothing else.
+        """
+    # Ask for generation metadata, to track the tokens used
+    grouped_task = GenerativeParameters.grouped_task(full_task_prompt, metadata=True)
+    usage = {}
+
+    if RECOMMEND_PIPELINED:
+        with connect() as client:
+            query_string, response = pipelined_recommendation(
+                client.collections.use(CollectionName.MOVIES),
+                occasion=occasion,
+                grouped_task=None if RECOMMEND_CONTEXT_BUDGET_TOKENS else grouped_task,
+                generative_provider=GenerativeConfig.anthropic(
+                    model="claude-3-5-haiku-latest"
+                ),
+                limit=PAGE_SIZE,
+                return_properties=MOVIE_PROPERTIES,
+                usage=usage,
+                query_vectors=query_embedding_cache,
+            )
+    else:
+        with timed("anthropic"):
+            query_string = movie_occasion_to_query(occasion=occasion, usage=usage)
+        with connect() as client:
+            movies = client.collections.use(CollectionName.MOVIES)
+            query_vector = None if RECOMMEND_CONTEXT_BUDGET_TOKENS else cached_query_vector(query_string)
+            if RECOMMEND_CONTEXT_BUDGET_TOKENS:
+                # Retrieval only; the prompt is built from the trimmed context below
+                response = near_query(
+                    movies.query,
+                    query_string,
+                    query_embedding_cache,
+                    target_vector="default",
+                    limit=PAGE_SIZE,
+                    return_properties=MOVIE_PROPERTIES,
+                )
+            elif query_vector is not None:
+                response = movies.generate.near_vector(
+                    near_vector=query_vector,
+                    target_vector="default",
+                    limit=PAGE_SIZE,
+                    grouped_task=grouped_task,
+                    generative_provider=GenerativeConfig.anthropic(
+                        model="claude-3-5-haiku-latest"
+                    ),
+                    return_properties=MOVIE_PROPERTIES,
+                )
+            else:
+                # Student TODO:
+                # Perform a RAG query (near_text) for the given query, using `grouped_task` constructed above.
+                # Target `default` vector, and limit to PAGE_SIZE results
+                # Specify `anthropic` as the generative provider, and `claude-3-5-haiku-latest` as the model
+                # Write your code here according to the instructions
+
+    if RECOMMEND_CONTEXT_BUDGET_TOKENS:
+        context = build_context(
+            [o.properties for o in response.objects],
+            RECOMMEND_CONTEXT_BUDGET_TOKENS,
+            max_overview_tokens=RECOMMEND_CONTEXT_OVERVIEW_TOKENS,
+        )
+        with timed("anthropic"):
+            text = call_claude(context_prompt(full_task_prompt, context), usage=usage)
+        movies_considered = context.movies
+        generative = None  # Generation tokens are in `usage`
+    else:
+        text = response.generative.text
+        movies_considered = [o.properties for o in response.objects]
+        generative = response.generative
+
+    recommendation = {
+        "recommendation": text,
+        "query_string": query_string,
+        "movies_considered": movies_considered,
+        "occasion": occasion,
+    }
+    tokens = sum(usage.values()) + generative_usage_tokens(generative)
+    return recommendation, tokens
 
 
 @app.get("/recommend", response_model=RecommendationResponse)
@@ -221,36 +799,51 @@ def recommend_movie(
     - Returns best match with reasoning
     """
     try:
-        query_string = movie_occasion_to_query(occasion=occasion)
-
-        full_task_prompt = f"""
-        The user is interested in movie recommendations for this occasion:
-        ========== OCCASION INPUT FROM USER ==========
-        {occasion}
-        ========== END INPUT ==========
+        cached = precomputed_recommendations.get(occasion) if RECOMMEND_PRECOMPUTED_ENABLED else None
+        if cached is None and RECOMMEND_CACHE_ENABLED:
+            cached = recommendation_cache.get(occasion)
+        if cached is not None:
+            return json_response(RecommendationResponse, {**cached, "occasion": occasion})
+
+        def generate_recommendation():
+            with recommend_limiter.slot():
+                recommendation, tokens = build_recommendation(occasion)
+                if RECOMMEND_CACHE_ENABLED:
+                    recommendation_cache.put(occasion, recommendation, tokens=tokens)
+            return recommendation
+
+        # Identical occasions in flight share one rewrite + RAG query
+        recommendation = recommend_flight.do(normalize_text(occasion), generate_recommendation)
+        return json_response(RecommendationResponse, {**recommendation, "occasion": occasion})
 
-        Out of these movies, recommend 2-4 suitable movies, and describe why, so the user can choose for themselves.
+    except Exception as e:
+        raise http_error(e)
 
-        IMPORTANT: Only include the recommendation text in your response and nothing else.
-        """
 
-        with connect_to_weaviate() as client:
-            movies = client.collections.use(CollectionName.MOVIES)
-            # Student TODO:
-            # Perform a RAG query (near_text) for the given query, using `full_task_prompt` constructed above.
-            # Target `default` vector, and limit to PAGE_SIZE results
-            # Specify `anthropic` as the generative provider, and `claude-3-5-haiku-latest` as the model
-            # Write your code here according to the instructions
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Request, stage, error and cache metrics in Prometheus text format"""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
-        return RecommendationResponse(
-            recommendation=response.generative.text,
-            query_string=query_string,
-            movies_considered=[o.properties for o in response.objects],
-            occasion=occasion
-        )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+@app.get("/stats")
+def get_cache_stats():
+    """Hit rates and savings of the API's in-memory caches, and upstream concurrency limits"""
+    stats = {
+        "recommendation_cache": recommendation_cache.stats(),
+        "rewrite_cache": rewrite_cache.stats(),
+        "recommend_limiter": recommend_limiter.stats(),
+        "search_limiter": search_limiter.stats(),
+        "recommend_coalescing": recommend_flight.stats(),
+        "search_coalescing": search_flight.stats(),
+    }
+    if RECOMMEND_PRECOMPUTED_ENABLED:
+        stats["precomputed_recommendations"] = precomputed_recommendations.stats()
+    if query_embedding_cache is not None:
+        stats["query_embedding_cache"] = query_embedding_cache.stats()
+    return stats
 
 
 if __name__ == "__main__":
@@ -0,0 +1,314 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Optional
+import anthropic
+import pydantic
+from fastapi import HTTPException
+from weaviate import exceptions as weaviate_exceptions
+
+
+logger = logging.getLogger("movieinsights")
+
+# Request/stage latency buckets, in seconds (LLM calls take seconds, cache hits microseconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ASGI scope of the request being handled, so stage timings can be labelled by endpoint
+_current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A Prometheus counter, with optional labels."""
+
+    def __init__(self, name: str, help: str, label_names: Iterable[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(label_names)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {total}")
+        return lines
+
+
+class Histogram:
+    """A Prometheus histogram with fixed buckets, with optional labels."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Iterable[str] = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        self.name, self.help, self.label_names = name, help, tuple(label_names)
+        self.buckets = buckets
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics, plus collectors that report gauges (e.g. cache stats) at scrape time."""
+
+    def __init__(self):
+        self.metrics: list = []
+        self.collectors: list[Callable[[], list[str]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], list[str]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_DURATION = REGISTRY.register(
+    Histogram("movieinsights_request_duration_seconds", "Request latency by endpoint", ["endpoint"])
+)
+REQUESTS = REGISTRY.register(
+    Counter("movieinsights_requests_total", "Requests by endpoint and status", ["endpoint", "status"])
+)
+STAGE_DURATION = REGISTRY.register(
+    Histogram(
+        "movieinsights_stage_duration_seconds",
+        "Latency of request stages (connect, Weaviate query, Anthropic call, validation)",
+        ["endpoint", "stage"],
+    )
+)
+ERRORS = REGISTRY.register(
+    Counter("movieinsights_errors_total", "Errors by endpoint and category", ["endpoint", "category"])
+)
+
+
+def current_endpoint() -> str:
+    scope = _current_scope.get()
+    if scope is None:
+        return "background"  # e.g. background cache refreshes
+    return _endpoint_label(scope)
+
+
+def _endpoint_label(scope) -> str:
+    """The route path template, or a label set by middleware answering before routing."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("metrics_endpoint", "unmatched")
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the duration of the enclosed block as a stage of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, current_endpoint(), stage)
+
+
+class _TimedProxy:
+    """Times every method call on the wrapped object as `stage`."""
+
+    def __init__(self, target, stage: str):
+        self._target, self._stage = target, stage
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def timed_call(*args, **kwargs):
+            with timed(self._stage):
+                return attribute(*args, **kwargs)
+
+        return timed_call
+
+
+class InstrumentedCollection:
+    """Wraps a Weaviate collection so its queries are timed as request stages."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.query = _TimedProxy(collection.query, "weaviate_query")
+        self.generate = _TimedProxy(collection.generate, "weaviate_generate")
+
+    def __len__(self):
+        with timed("weaviate_aggregate"):
+            return len(self._collection)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class _InstrumentedCollections:
+    def __init__(self, collections):
+        self._collections = collections
+
+    def use(self, name):
+        return InstrumentedCollection(self._collections.use(name))
+
+    def get(self, name):
+        return InstrumentedCollection(self._collections.get(name))
+
+    def __getattr__(self, name):
+        return getattr(self._collections, name)
+
+
+class InstrumentedClient:
+    """Wraps a Weaviate client so collections obtained from it are instrumented."""
+
+    def __init__(self, client):
+        self._client = client
+        self.collections = _InstrumentedCollections(client.collections)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        with timed("close"):
+            return self._client.__exit__(*exc_info)
+
+
+# Error taxonomy: (exception types, category, HTTP status), first match wins
+ERROR_TAXONOMY = [
+    ((weaviate_exceptions.WeaviateTimeoutError,), "weaviate_timeout", 504),
+    (
+        (
+            weaviate_exceptions.WeaviateConnectionError,
+            weaviate_exceptions.WeaviateStartUpError,
+            weaviate_exceptions.WeaviateGRPCUnavailableError,
+            weaviate_exceptions.WeaviateClosedClientError,
+        ),
+        "weaviate_unavailable",
+        503,
+    ),
+    ((weaviate_exceptions.WeaviateBaseError,), "weaviate_query", 502),
+    ((anthropic.APITimeoutError,), "anthropic_timeout", 504),
+    ((anthropic.RateLimitError,), "anthropic_rate_limited", 503),
+    ((anthropic.APIConnectionError,), "anthropic_unavailable", 503),
+    ((anthropic.AnthropicError,), "anthropic", 502),
+    ((pydantic.ValidationError,), "validation", 500),
+]
+
+
+def classify_error(error: Exception) -> tuple[str, int]:
+    """Return the (category, HTTP status) of an error raised while handling a request."""
+    for types, category, status in ERROR_TAXONOMY:
+        if isinstance(error, types):
+            return category, status
+    return "internal", 500
+
+
+def http_error(error: Exception) -> HTTPException:
+    """Count an error by category, and convert it to an HTTPException with a matching status."""
+    if isinstance(error, HTTPException):
+        ERRORS.inc(current_endpoint(), f"http_{error.status_code}")
+        return error
+    category, status = classify_error(error)
+    ERRORS.inc(current_endpoint(), category)
+    if status == 500:
+        return HTTPException(status_code=500, detail=f"Internal server error: {str(error)}")
+    return HTTPException(status_code=status, detail=f"Upstream error ({category}): {str(error)}")
+
+
+def report_error(error: Exception, context: str):
+    """Count and log an error raised off the request path (e.g. by background work), by category."""
+    category, _ = classify_error(error)
+    ERRORS.inc(current_endpoint(), category)
+    logger.warning("%s: %s (%s)", context, error, category)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status counts per endpoint."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_scope.reset(token)
+            endpoint = _endpoint_label(scope)
+            REQUEST_DURATION.observe(time.perf_counter() - start, endpoint)
+            REQUESTS.inc(endpoint, str(status))
+
+
+def cache_stats_collector(caches: Dict[str, Callable[[], dict]]) -> Callable[[], list[str]]:
+    """Build a collector reporting `stats()` of caches as gauges labelled by cache name."""
+
+    def collect() -> list[str]:
+        stats = {name: cache_stats() for name, cache_stats in caches.items()}
+        lines = []
+        for key in sorted({key for values in stats.values() for key in values}):
+            metric = f"movieinsights_cache_{key}"
+            lines.append(f"# TYPE {metric} gauge")
+            for name, values in stats.items():
+                if key in values:
+                    lines.append(f'{metric}{{cache="{name}"}} {values[key]}')
+        return lines
+
+    return collect
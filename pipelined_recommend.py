@@ -0,0 +1,216 @@
+import contextvars
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Dict, Hashable, Optional, Sequence
+from weaviate.classes.query import Filter
+from embeddings import normalize_text
+from helpers import movie_occasion_to_query
+from metrics import timed
+from query_embeddings import QueryEmbeddingCache, near_query
+
+
+# How long to wait for the query rewrite once the speculative retrieval is done. By default the
+# rewrite only counts if it finishes within the retrieval time; a late one is still cached for next time.
+REWRITE_WAIT_SECONDS = float(os.getenv("RECOMMEND_REWRITE_WAIT_SECONDS", "0"))
+REWRITE_CACHE_CAPACITY = int(os.getenv("RECOMMEND_REWRITE_CACHE_CAPACITY", "10000"))
+# Rewrites in flight at once; beyond this, misses run on the raw occasion alone
+REWRITE_MAX_PENDING = int(os.getenv("RECOMMEND_REWRITE_MAX_PENDING", "64"))
+RRF_K = 60  # Standard reciprocal rank fusion constant
+
+_rewrite_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="query-rewrite")
+
+
+class LRUCache:
+    """A small thread-safe LRU cache."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+rewrite_cache = LRUCache(REWRITE_CACHE_CAPACITY)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], limit: int) -> list:
+    """Merge ranked lists of IDs, scoring each ID by the sum of 1 / (RRF_K + rank)."""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+
+# Rewrites in flight by occasion, so concurrent misses for an occasion share one LLM call
+_pending_rewrites: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+
+def _rewrite(occasion: str, key: str, usage: Dict[str, int]) -> str:
+    try:
+        with timed("anthropic"):
+            query_string = movie_occasion_to_query(occasion=occasion, usage=usage)
+        rewrite_cache.put(key, query_string)
+        return query_string
+    except Exception as e:
+        print(f"Query rewrite failed for {occasion!r}: {e}")
+        raise
+    finally:
+        with _pending_lock:
+            _pending_rewrites.pop(key, None)
+
+
+def _start_rewrite(occasion: str, usage: Dict[str, int]) -> Optional[Future]:
+    """
+    Start rewriting `occasion` into the rewrite cache, or join the rewrite already in flight
+    for it (whose tokens are then counted by its own request). None if too many are in flight.
+    """
+    key = normalize_text(occasion)
+    with _pending_lock:
+        rewrite = _pending_rewrites.get(key)
+        if rewrite is None and len(_pending_rewrites) < REWRITE_MAX_PENDING:
+            # Run in a copy of the request context, so the rewrite is timed under this endpoint
+            rewrite = _pending_rewrites[key] = _rewrite_executor.submit(
+                contextvars.copy_context().run, _rewrite, occasion, key, usage
+            )
+    return rewrite
+
+
+def pipelined_recommendation(
+    collection,
+    occasion: str,
+    grouped_task,
+    generative_provider,
+    limit: int,
+    return_properties: list[str],
+    usage: Dict[str, int],
+    query_vectors: Optional[QueryEmbeddingCache] = None,
+):
+    """
+    Run the /recommend pipeline, overlapping the query rewrite (an LLM call) with retrieval.
+
+    - On a rewrite cache hit, a single RAG query runs on the cached query string.
+    - Otherwise the rewrite starts in the background, while a speculative retrieval runs on
+      the raw occasion. If the rewrite is done by the time the retrieval is (give or take
+      REWRITE_WAIT_SECONDS), the rewritten query's results are merged with the speculative
+      ones by reciprocal rank fusion; if not, the speculative results are used alone, and
+      the rewrite is cached for later requests. The grouped generation then runs once,
+      over the merged set.
+
+    Text queries are sent as vectors when `query_vectors` has them cached. With
+    `grouped_task=None`, nothing is generated (the caller builds its own prompt), and
+    the merged retrieval results are returned as they are.
+
+    Returns the query string used and the (generative) query response.
+    """
+    if grouped_task is None:
+        final_query = collection.query
+        generation = {}
+    else:
+        final_query = collection.generate
+        generation = {"grouped_task": grouped_task, "generative_provider": generative_provider}
+
+    cached_query = rewrite_cache.get(normalize_text(occasion))
+    if cached_query is not None:
+        response = near_query(
+            final_query,
+            cached_query,
+            query_vectors,
+            target_vector="default",
+            limit=limit,
+            return_properties=return_properties,
+            **generation,
+        )
+        return cached_query, response
+
+    rewrite_usage: Dict[str, int] = {}
+    rewrite = _start_rewrite(occasion, rewrite_usage)
+
+    speculative = near_query(
+        collection.query, occasion, query_vectors, target_vector="default", limit=limit, return_properties=return_properties
+    )
+    responses = [speculative]
+    query_string = occasion
+    try:
+        if rewrite is not None:
+            query_string = rewrite.result(timeout=REWRITE_WAIT_SECONDS)
+            for key, tokens in rewrite_usage.items():
+                usage[key] = usage.get(key, 0) + tokens
+            # The rewritten query is usually the better one, so it leads the fusion
+            responses.insert(
+                0,
+                near_query(
+                    collection.query,
+                    query_string,
+                    query_vectors,
+                    target_vector="default",
+                    limit=limit,
+                    return_properties=return_properties,
+                ),
+            )
+    except TimeoutError:
+        pass  # Too late for this request; the rewrite still fills the cache
+    except Exception:
+        pass  # Already reported by _rewrite; the speculative results are enough
+
+    objects = {o.uuid: o for response in responses for o in response.objects}
+    ids = reciprocal_rank_fusion([[o.uuid for o in response.objects] for response in responses], limit)
+    if grouped_task is None:
+        speculative.objects = [objects[i] for i in ids]
+        return query_string, speculative
+    if not ids:
+        # Nothing to generate over (e.g. an empty collection), so let the plain RAG query handle it
+        response = near_query(
+            final_query,
+            query_string,
+            query_vectors,
+            target_vector="default",
+            limit=limit,
+            return_properties=return_properties,
+            **generation,
+        )
+        return query_string, response
+
+    response = final_query.fetch_objects(
+        filters=Filter.by_id().contains_any(ids),
+        limit=len(ids),
+        return_properties=return_properties,
+        **generation,
+    )
+    # fetch_objects does not keep the fused order, so restore it
+    order = {uuid: i for i, uuid in enumerate(ids)}
+    response.objects.sort(key=lambda o: order.get(o.uuid, len(order)))
+    return query_string, response
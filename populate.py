@@ -6,7 +6,9 @@ from weaviate import WeaviateClient
 from weaviate.util import generate_uuid5
 from weaviate.classes.config import Property, DataType, Configure
 from tqdm import tqdm
-from helpers import CollectionName, connect_to_weaviate
+from helpers import CollectionName, connect_to_weaviate, get_ingest_generation, mark_ingest_generation
+from vector_store import read_vector_sidecars
+from facets import facets_from_parquet, write_facets
 
 
 def get_data_objects_from_parquet() -> Iterator[Dict[str, Union[datetime, str, int]]]:
@@ -34,9 +36,11 @@ def get_data_objects_from_parquet() -> Iterator[Dict[str, Union[datetime, str, i
     for parquet_file in parquet_files:
         print(f"Loading data from {parquet_file}...")
         df = pd.read_parquet(parquet_file)
+        # Vectors may be stored in compact, memory-mapped files next to the parquet file
+        sidecar_vectors = read_vector_sidecars(parquet_file)
 
         # Process each row in the dataframe
-        for _, row in df.iterrows():
+        for i, (_, row) in enumerate(df.iterrows()):
             # Process fields using helper functions - only extract what's needed for the simplified Movie model
             properties = row["properties"]
             processed_properties = {
@@ -47,13 +51,17 @@ def get_data_objects_from_parquet() -> Iterator[Dict[str, Union[datetime, str, i
                 "year": properties["year"],
                 "popularity": properties["popularity"]
             }
+            if sidecar_vectors is None:
+                vectors = row["vectors"]
+            else:
+                vectors = {name: v.row(i) for name, v in sidecar_vectors.items()}
             yield {
                 "properties": processed_properties,
-                "vectors": row["vectors"]
+                "vectors": vectors
             }
 
 
-def create_movies_collection(client: WeaviateClient):
+def create_movies_collection(client: WeaviateClient, collection_name: str = CollectionName.MOVIES):
     """
     TODO: Implement this function to create the Movies collection in Weaviate
 
@@ -82,13 +90,13 @@ def create_movies_collection(client: WeaviateClient):
     # Write your code here according to the instructions
     else:
         raise RuntimeError(
-            "Collection 'Movies' already exists! "
+            f"Collection '{collection_name}' already exists! "
             "If you like to re-build the collection, create and run a separate script to delete the existing collection. "
             "\n\nTo delete a collection, run: client.collections.delete(<collection_name>)"
         )
 
 
-def ingest_movies_data(client: WeaviateClient, max_objects=20000):
+def ingest_movies_data(client: WeaviateClient, max_objects=20000, collection_name: str = CollectionName.MOVIES):
     """
     TODO: Implement this function to ingest movie data into Weaviate
 
@@ -118,7 +126,8 @@ def ingest_movies_data(client: WeaviateClient, max_objects=20000):
             # - Properties `obj["properties"]`
             # - UUID `uuid`
             # - Vectors `obj["vectors"]`
-            uuid = generate_uuid5(obj)
+            # From the movie ID alone, so UUIDs don't change with the exported vector dtype
+            uuid = generate_uuid5(obj["properties"]["movie_id"])
             # Write your code here according to the instructions
 
     # TODO - Handle any failed objects
@@ -150,7 +159,13 @@ def main():
             # Ingest the data
             print("📥 Ingesting movie data...")
             ingest_movies_data(client)
-            print("✅ Data ingestion complete!")
+
+            # Precompute the /facets counts for the ingested data, before the API sees the new generation
+            write_facets(facets_from_parquet(), generation=get_ingest_generation() + 1)
+            print("✅ Facets written")
+
+            generation = mark_ingest_generation()
+            print(f"✅ Data ingestion complete! (ingest generation {generation})")
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
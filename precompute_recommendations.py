@@ -0,0 +1,120 @@
+"""
+Precompute /recommend responses for the most common occasions.
+
+Each occasion runs through the same pipeline as a live /recommend request (query rewrite,
+retrieval and generation), a few at a time, and the results are written to a store for the
+current ingest generation (see recommendation_store.py), which /recommend serves first.
+serve.py re-runs this after each ingest, since the recommendations describe the ingested data.
+
+Occasions come from the command line, a file (one per line), the most frequent /recommend
+requests of the query logs (see query_log.py), or else DEFAULT_OCCASIONS.
+
+Configuration (environment variables):
+- PRECOMPUTE_WORKERS: occasions processed concurrently (default: 4)
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from embeddings import normalize_text
+from helpers import get_ingest_generation
+from query_log import entry_params, log_files, read_entries
+from recommendation_store import write_recommendations
+
+
+PRECOMPUTE_WORKERS = int(os.getenv("PRECOMPUTE_WORKERS", "4"))
+
+DEFAULT_OCCASIONS = [
+    "date night",
+    "family movie night",
+    "rainy day",
+    "girls night in",
+    "movie marathon with friends",
+    "halloween",
+    "christmas",
+    "something to cry to",
+    "feel-good comfort movie",
+    "watching with kids",
+    "mind-bending thriller",
+    "lazy sunday afternoon",
+]
+
+
+def occasions_from_log(paths: list[Path], top: int) -> list[str]:
+    """The `top` most frequent occasions of /recommend requests in query log files."""
+    counts: Counter = Counter()
+    first_seen = {}  # Normalized occasion -> first wording seen, which is the one precomputed
+    for entry in read_entries(paths):
+        if entry.get("route") != "/recommend" or entry.get("status", 200) >= 400:
+            continue
+        occasion = dict(entry_params(entry)).get("occasion")
+        if occasion:
+            key = normalize_text(occasion)
+            counts[key] += 1
+            first_seen.setdefault(key, occasion)
+    return [first_seen[key] for key, _ in counts.most_common(top)]
+
+
+def precompute(occasions: list[str], workers: int = PRECOMPUTE_WORKERS) -> dict[str, dict]:
+    """Run the /recommend pipeline for each occasion; occasions that fail are left out."""
+    from main_complete import build_recommendation
+
+    recommendations, tokens_used = {}, 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="precompute") as executor:
+        futures = {executor.submit(build_recommendation, occasion): occasion for occasion in occasions}
+        for future in as_completed(futures):
+            occasion = futures[future]
+            try:
+                recommendation, tokens = future.result()
+            except Exception as e:
+                print(f"❌ {occasion!r}: {e}")
+                continue
+            recommendations[occasion] = recommendation
+            tokens_used += tokens
+            print(f"✅ {occasion!r} ({len(recommendation['movies_considered'])} movies, {tokens} tokens)")
+    print(f"🧮 {len(recommendations)}/{len(occasions)} occasions precomputed, {tokens_used} tokens used")
+    return recommendations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("occasions", nargs="*", help="Occasions to precompute")
+    parser.add_argument("--file", help="File with one occasion per line")
+    parser.add_argument(
+        "--log", nargs="*", type=Path, help="Query log files to mine /recommend occasions from (default: all)"
+    )
+    parser.add_argument("--top", type=int, default=100, help="Occasions to take from the query logs")
+    parser.add_argument("--workers", type=int, default=PRECOMPUTE_WORKERS)
+    args = parser.parse_args()
+
+    occasions = list(args.occasions)
+    if args.file:
+        occasions += [line.strip() for line in Path(args.file).read_text().splitlines() if line.strip()]
+    if args.log is not None:
+        occasions += occasions_from_log(args.log or log_files(), args.top)
+    if not occasions:
+        occasions = DEFAULT_OCCASIONS
+    # Wordings that normalize to the same occasion share one store entry, so compute it once
+    unique = {}
+    for occasion in occasions:
+        unique.setdefault(normalize_text(occasion), occasion)
+    occasions = list(unique.values())
+
+    # Recommendations are tied to the data they were built from, so record the generation first
+    generation = get_ingest_generation()
+    print(f"🎬 Precomputing {len(occasions)} recommendations for ingest generation {generation}")
+    recommendations = precompute(occasions, workers=args.workers)
+    if not recommendations:
+        sys.exit(1)
+    if get_ingest_generation() != generation:
+        print("⚠️  The data was re-ingested while precomputing, discarding the results")
+        sys.exit(1)
+    path = write_recommendations(generation, recommendations)
+    print(f"💾 Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Union
+import numpy as np
+from weaviate.classes.query import MetadataQuery
+from embeddings import EMBEDDING_MODEL, embed_text
+from metrics import report_error
+
+
+# arctic-embed v2 embeds queries (not documents) with this prefix. Whether it matches how the
+# collection's vectorizer embeds query text is checked against Weaviate by `verify`.
+QUERY_EMBEDDING_PREFIX = os.getenv("QUERY_EMBEDDING_PREFIX", "query: ")
+# Queries embedded both ways by `verify`; their results must be the same objects at the same distances
+VERIFY_PROBES = ("a heist that goes wrong", "feel-good family comedy", "space exploration")
+VERIFY_TOLERANCE = 1e-3  # Cosine distance
+TOUCH_BATCH_SIZE = 100  # Memory hits whose disk `used_at` is refreshed at once
+
+
+def _embed_query(text: str) -> np.ndarray:
+    # Requires the `semantic` extra (sentence-transformers), see embeddings.py
+    return embed_text(QUERY_EMBEDDING_PREFIX + text, backend="sentence-transformers")
+
+
+class QueryEmbeddingCache:
+    """
+    Cache query vectors by (model, query text), so repeat queries can be sent as
+    `near_vector` / hybrid-with-vector and skip server-side vectorization.
+
+    Texts are kept as sent (not normalized): Weaviate embeds the exact query text, so
+    the cached vector must come from that same text.
+
+    Vectors live in an in-memory LRU of `capacity` entries, backed by a SQLite file of up
+    to `disk_capacity` entries that survives restarts and is shared between workers.
+    On a miss, the vector is computed in the background (the request itself falls back
+    to server-side vectorization), so later requests for the same text hit. SQLite is
+    only accessed outside the cache lock, with one connection per thread.
+
+    `embed` must produce the same vectors as the collection's vectorizer, i.e. run the
+    same model with the same query prefix (see embeddings.py), or results would differ
+    from `near_text`. So no vector is served until `verify` has confirmed this against
+    the collection. Disk entries are evicted least recently used first.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        model: str = EMBEDDING_MODEL,
+        capacity: int = 10000,
+        disk_capacity: int = 200000,
+        embed: Callable[[str], np.ndarray] = _embed_query,
+    ):
+        self.path = Path(path)
+        self.model = model
+        self.capacity = capacity
+        self.disk_capacity = disk_capacity
+        self.embed = embed
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-embedding")
+        self._local = threading.local()
+        self._writes_since_prune = 0
+        self._touched: set[str] = set()  # Memory hits not yet recorded on disk
+        self.verified = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(model TEXT, text TEXT, vector BLOB, used_at REAL, PRIMARY KEY (model, text))"
+        )
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        """This thread's connection to the SQLite file."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, isolation_level=None)
+            # With WAL, commits no longer fsync; a crash can only lose the latest cache writes
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def verify(
+        self,
+        collection,
+        probes: Sequence[str] = VERIFY_PROBES,
+        target_vector: str = "default",
+        tolerance: float = VERIFY_TOLERANCE,
+    ) -> bool:
+        """
+        Check that `embed` matches the vectorizer of `collection` (a Weaviate collection): each
+        probe query must return the same top objects at the same distances, whether Weaviate
+        embeds it (`near_text`) or it is sent as a locally embedded vector (`near_vector`).
+        Cached vectors are only served once this passes.
+        """
+        try:
+            for probe in probes:
+                kwargs = dict(target_vector=target_vector, limit=3, return_metadata=MetadataQuery(distance=True))
+                expected = collection.query.near_text(query=probe, **kwargs).objects
+                actual = collection.query.near_vector(near_vector=self.embed(probe), **kwargs).objects
+                if [o.uuid for o in expected] != [o.uuid for o in actual] or any(
+                    abs(e.metadata.distance - a.metadata.distance) > tolerance for e, a in zip(expected, actual)
+                ):
+                    raise ValueError(f"local and Weaviate query vectors differ for {probe!r}")
+        except Exception as e:
+            report_error(e, "Query embedding cache disabled")
+            self.verified = False
+            return False
+        self.verified = True
+        return True
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached vector for `text`, or None."""
+        with self._lock:
+            vector = self._memory.get(text)
+            if vector is not None:
+                self._memory.move_to_end(text)
+                self.hits += 1
+                self._touched.add(text)
+                touched = self._take_touched() if len(self._touched) >= TOUCH_BATCH_SIZE else None
+        if vector is not None:
+            if touched:
+                self._touch(touched)
+            return vector
+
+        db = self._db()
+        row = db.execute(
+            "SELECT vector FROM query_embeddings WHERE model = ? AND text = ?", (self.model, text)
+        ).fetchone()
+        if row is not None:
+            self._touch([text])
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            vector = np.frombuffer(row[0], dtype=np.float32)
+            self._remember(text, vector)
+            self.hits += 1
+            self.disk_hits += 1
+            return vector
+
+    def _take_touched(self) -> list[str]:
+        touched, self._touched = list(self._touched), set()
+        return touched
+
+    def _touch(self, texts: Sequence[str]):
+        """Record that `texts` were used now, so pruning evicts the least recently used."""
+        now = time.time()
+        self._db().executemany(
+            "UPDATE query_embeddings SET used_at = ? WHERE model = ? AND text = ?",
+            [(now, self.model, text) for text in texts],
+        )
+
+    def get_or_schedule(self, text: str) -> Optional[np.ndarray]:
+        """
+        Return the cached vector for `text`; on a miss, compute it in the background.
+        Always None until `verify` has passed.
+        """
+        if not self.verified:
+            return None
+        vector = self.get(text)
+        if vector is None:
+            with self._lock:
+                if text in self._pending:
+                    return None
+                self._pending.add(text)
+            self._executor.submit(self._fill, text)
+        return vector
+
+    def put(self, text: str, vector: np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(text, vector)
+            self._writes_since_prune += 1
+            prune = self._writes_since_prune >= max(1, self.disk_capacity // 10)
+            if prune:
+                self._writes_since_prune = 0
+
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?)",
+            (self.model, text, vector.tobytes(), time.time()),
+        )
+        if prune:
+            with self._lock:
+                touched = self._take_touched()
+            self._touch(touched)  # Before evicting by `used_at`
+            # Counting is a table scan, so only check every tenth of the capacity in writes
+            (count,) = db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+            if count > self.disk_capacity:
+                db.execute(
+                    "DELETE FROM query_embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM query_embeddings ORDER BY used_at LIMIT ?)",
+                    (count - self.disk_capacity + self.disk_capacity // 10,),
+                )
+
+    def _remember(self, text: str, vector: np.ndarray):
+        self._memory[text] = vector
+        self._memory.move_to_end(text)
+        if len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _fill(self, text: str):
+        try:
+            self.put(text, self.embed(text))
+        except Exception as e:
+            report_error(e, f"Failed to embed query {text!r}")
+        finally:
+            with self._lock:
+                self._pending.discard(text)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self._db().execute("DELETE FROM query_embeddings WHERE model = ?", (self.model,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def near_query(query_api, query: str, cache: Optional[QueryEmbeddingCache], **kwargs):
+    """
+    `query_api.near_text(query=query, ...)`, sent as `near_vector` with the cached query
+    vector when there is one. `query_api` is a collection's `query` or `generate`.
+    """
+    vector = cache.get_or_schedule(query) if cache is not None else None
+    if vector is None:
+        return query_api.near_text(query=query, **kwargs)
+    return query_api.near_vector(near_vector=vector, **kwargs)
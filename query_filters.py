@@ -0,0 +1,122 @@
+import os
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple, Optional, Sequence
+from weaviate.classes.query import Filter
+from weaviate.collections.classes.filters import _Filters
+
+
+YEAR_BUCKET_SIZE = 10
+# Snap year ranges to decade boundaries and post-filter locally
+YEAR_FILTER_BUCKETING = os.getenv("YEAR_FILTER_BUCKETING", "0") == "1"
+# How many results to fetch per requested result at first, to make up for post-filtering;
+# more are fetched (in doubling batches) until the page is full or the results run out
+YEAR_BUCKET_OVERFETCH = int(os.getenv("YEAR_BUCKET_OVERFETCH", "2"))
+# Weaviate rejects queries reaching past this many results (its QUERY_MAXIMUM_RESULTS setting)
+QUERY_MAXIMUM_RESULTS = int(os.getenv("WEAVIATE_QUERY_MAXIMUM_RESULTS", "10000"))
+
+
+class YearFilter(NamedTuple):
+    """A year filter to send to Weaviate, plus an optional local post-filter."""
+
+    filters: Optional[_Filters]
+    post_filter: Optional[Callable[[dict], bool]] = None
+
+    def apply(self, objects: Sequence[Any]) -> list[Any]:
+        """Drop objects outside the requested year range (a no-op without a post-filter)."""
+        if self.post_filter is None:
+            return list(objects)
+        return [o for o in objects if self.post_filter(o.properties)]
+
+
+@lru_cache(maxsize=1024)
+def year_range_filter(
+    year_min: Optional[int], year_max: Optional[int]
+) -> Optional[_Filters]:
+    """
+    Build a filter on `year` for an inclusive range; either bound may be None.
+    Filters are interned, so repeated ranges reuse the same filter object.
+    """
+    if year_min is not None and year_max is not None:
+        return Filter.by_property("year").greater_or_equal(year_min) & Filter.by_property(
+            "year"
+        ).less_or_equal(year_max)
+    elif year_min is not None:
+        return Filter.by_property("year").greater_or_equal(year_min)
+    elif year_max is not None:
+        return Filter.by_property("year").less_or_equal(year_max)
+    return None
+
+
+def bucket_year_range(
+    year_min: Optional[int], year_max: Optional[int], bucket_size: int = YEAR_BUCKET_SIZE
+) -> tuple[Optional[int], Optional[int]]:
+    """Widen a year range outwards to bucket (decade) boundaries, e.g. 1994-2003 -> 1990-2009."""
+    low = None if year_min is None else year_min - year_min % bucket_size
+    high = None if year_max is None else year_max - year_max % bucket_size + bucket_size - 1
+    return low, high
+
+
+@lru_cache(maxsize=1024)
+def _year_post_filter(year_min: Optional[int], year_max: Optional[int]) -> Callable[[dict], bool]:
+    low = float("-inf") if year_min is None else year_min
+    high = float("inf") if year_max is None else year_max
+    return lambda properties: low <= properties["year"] <= high
+
+
+def build_year_filter(
+    year_min: Optional[int],
+    year_max: Optional[int],
+    filters: Optional[_Filters],
+    bucketed: bool = YEAR_FILTER_BUCKETING,
+) -> YearFilter:
+    """
+    Build the year filter for a query, from the exact filter `filters` on [year_min, year_max].
+
+    With `bucketed`, the server-side filter covers whole decades instead, so queries with
+    nearby ranges share filter shapes (and cached results), and the exact range is applied
+    locally: fetch results with `fetch_year_filtered`, which over-fetches to fill the page.
+    """
+    if not bucketed or (year_min is None and year_max is None):
+        return YearFilter(filters)
+
+    bucket_min, bucket_max = bucket_year_range(year_min, year_max)
+    if (bucket_min, bucket_max) == (year_min, year_max):
+        return YearFilter(filters)
+    return YearFilter(
+        year_range_filter(bucket_min, bucket_max), _year_post_filter(year_min, year_max)
+    )
+
+
+def fetch_year_filtered(
+    fetch: Callable[[int, int], Sequence[Any]],
+    year_filter: YearFilter,
+    offset: int,
+    limit: int,
+    max_results: int = QUERY_MAXIMUM_RESULTS,
+) -> list[Any]:
+    """
+    Return objects [offset, offset + limit) of a query within the requested year range.
+
+    `fetch(query_offset, query_limit)` runs the query with `year_filter.filters` and returns
+    its objects. Without a post-filter, that is a single query for exactly the page. With one,
+    batches are fetched from the start and post-filtered until `offset + limit` objects match
+    or the results run out, so pages are full and offsets count matching objects only.
+
+    Queries never reach past the first `max_results` results, which Weaviate would reject:
+    pages beyond them are short (or empty) instead.
+    """
+    if year_filter.post_filter is None:
+        limit = min(limit, max_results - offset)
+        return list(fetch(offset, limit)) if limit > 0 else []
+
+    matched: list[Any] = []
+    query_offset, batch = 0, (offset + limit) * YEAR_BUCKET_OVERFETCH
+    while len(matched) < offset + limit and query_offset < max_results:
+        batch = min(batch, max_results - query_offset)
+        objects = fetch(query_offset, batch)
+        matched.extend(year_filter.apply(objects))
+        if len(objects) < batch:
+            break  # No more results
+        query_offset += batch
+        batch *= 2
+    return matched[offset : offset + limit]
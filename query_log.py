@@ -0,0 +1,228 @@
+"""
+Request capture for the API: a sample of requests to the data endpoints is appended as JSON
+lines to rotating files, one per worker process, so cold caches can be warmed from real
+traffic and captured traffic can be replayed (see benchmarks/replay.py).
+
+A logged entry looks like:
+    {"ts": 1760000000.0, "method": "GET", "path": "/search", "route": "/search",
+     "params": [["q", "heist"], ["page", "2"]], "status": 200, "duration_ms": 41.7}
+
+Params are a list of pairs, so repeated parameters (`/facets?genre=A&genre=B`) are kept.
+Only the method, path, query parameters, status and timing are recorded: no headers, cookies,
+client addresses or bodies. Values of QUERY_LOG_REDACTED_PARAMS (e.g. the free-text /recommend
+`occasion`) are replaced by "[redacted]", and such entries are not warmed up from or replayed.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import time
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence, Union
+from urllib.parse import parse_qsl
+
+
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "0") == "1"
+QUERY_LOG_DIR = Path(os.getenv("QUERY_LOG_DIR", "data/query_logs"))
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", "0.1"))  # Fraction of requests logged
+QUERY_LOG_MAX_BYTES = int(os.getenv("QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # Per file, before rotating
+QUERY_LOG_BACKUPS = int(os.getenv("QUERY_LOG_BACKUPS", "5"))  # Rotated files kept per worker
+# Routes worth logging; /metrics, /stats and the like are not data traffic
+LOGGED_ROUTES = ("/search", "/suggest", "/movie/{movie_id}", "/explore", "/facets", "/recommend", "/info")
+# Query parameters whose values are not logged, e.g. "occasion" (comma-separated)
+QUERY_LOG_REDACTED_PARAMS = [name for name in os.getenv("QUERY_LOG_REDACTED_PARAMS", "").split(",") if name]
+REDACTED = "[redacted]"
+# Requests sent by the warm-up (or a replay) carry this header, and are not logged again
+REPLAY_HEADER = b"x-query-replay"
+
+
+class QueryLogger:
+    """
+    Appends log entries to `<directory>/queries.<pid>.jsonl`, rotated every `max_bytes`
+    and keeping `backups` old files. Entries are queued and written by a background
+    thread, so requests never wait on the disk. Files untouched for `retention_days`
+    (e.g. from workers that have since been restarted) are removed on start.
+    """
+
+    def __init__(
+        self,
+        directory: Path = QUERY_LOG_DIR,
+        max_bytes: int = QUERY_LOG_MAX_BYTES,
+        backups: int = QUERY_LOG_BACKUPS,
+        retention_days: float = 7.0,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.retention_days = retention_days
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._logger = logging.getLogger(f"movieinsights.query_log.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(QueueHandler(self._queue))
+        self._listener: Optional[QueueListener] = None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        cutoff = time.time() - self.retention_days * 86400
+        for path in log_files(self.directory):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+        handler = RotatingFileHandler(
+            self.directory / f"queries.{os.getpid()}.jsonl",
+            maxBytes=self.max_bytes,
+            backupCount=self.backups,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._listener = QueueListener(self._queue, handler)
+        self._listener.start()
+
+    def stop(self):
+        """Flush queued entries, and close the file."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
+    def log(self, entry: dict):
+        self._logger.info(json.dumps(entry, separators=(",", ":")))
+
+
+class QueryLogMiddleware:
+    """ASGI middleware logging a `sample_rate` fraction of requests to the data endpoints."""
+
+    def __init__(
+        self,
+        app,
+        logger: QueryLogger,
+        sample_rate: float = QUERY_LOG_SAMPLE_RATE,
+        redacted_params: Sequence[str] = QUERY_LOG_REDACTED_PARAMS,
+    ):
+        self.app = app
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.redacted_params = frozenset(redacted_params)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or random.random() >= self.sample_rate
+            or any(name == REPLAY_HEADER for name, _ in scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        timestamp = time.time()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None)
+            if route_path in LOGGED_ROUTES:
+                self.logger.log(
+                    {
+                        "ts": round(timestamp, 3),
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route_path,
+                        "params": [
+                            (name, REDACTED if name in self.redacted_params else value)
+                            for name, value in parse_qsl(scope["query_string"].decode("latin-1"))
+                        ],
+                        "status": status,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    }
+                )
+
+
+def log_files(directory: Path = QUERY_LOG_DIR) -> list[Path]:
+    """All query log files in `directory`, including rotated ones."""
+    return sorted(Path(directory).glob("queries.*.jsonl*"))
+
+
+def read_entries(paths: Iterable[Path]) -> Iterator[dict]:
+    """Log entries from `paths`, in file order, skipping lines that are not valid JSON."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # e.g. a line cut short by a crash
+
+
+def entry_params(entry: dict) -> list[tuple[str, str]]:
+    """A log entry's query parameters, as (name, value) pairs (older logs stored a dict)."""
+    params: Union[dict, list, None] = entry.get("params")
+    if isinstance(params, dict):
+        return list(params.items())
+    return [(name, value) for name, value in params or ()]
+
+
+def is_redacted(entry: dict) -> bool:
+    """Whether some parameter values of a log entry were not logged (so it can't be sent again)."""
+    return any(value == REDACTED for _, value in entry_params(entry))
+
+
+def top_requests(
+    entries: Iterable[dict], n: int, routes: Sequence[str] = LOGGED_ROUTES
+) -> list[tuple[str, list[tuple[str, str]]]]:
+    """The `n` most frequent successful (path, params) GET requests to `routes`, that were logged in full."""
+    counts: Counter = Counter()
+    for entry in entries:
+        if (
+            entry.get("method", "GET") == "GET"
+            and entry.get("route") in routes
+            and entry.get("status", 200) < 400
+            and not is_redacted(entry)
+        ):
+            counts[(entry["path"], tuple(sorted(entry_params(entry))))] += 1
+    return [(path, list(params)) for (path, params), _ in counts.most_common(n)]
+
+
+async def warm_up(app, requests: Sequence[tuple[str, list[tuple[str, str]]]], concurrency: int = 4):
+    """
+    Send `requests` to the app in-process (through its middleware, but not the network), to
+    fill this process's caches. Failures are counted, not raised: warm-up is best effort.
+    """
+    import httpx  # Only needed when warming up, so not imported with the API
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+    start = time.perf_counter()
+
+    async def send(client: httpx.AsyncClient, path: str, params: list[tuple[str, str]]):
+        nonlocal failures
+        async with semaphore:
+            try:
+                response = await client.get(path, params=params)
+                failures += response.status_code >= 400
+            except Exception:
+                failures += 1
+
+    transport = httpx.ASGITransport(app=app)
+    headers = {REPLAY_HEADER.decode(): "warm-up"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://warm-up", headers=headers, timeout=60) as client:
+        await asyncio.gather(*(send(client, path, params) for path, params in requests))
+    print(
+        f"Warmed up with {len(requests)} logged requests in {time.perf_counter() - start:.1f}s "
+        f"({failures} failed)"
+    )
@@ -0,0 +1,131 @@
+import json
+import math
+import re
+from typing import NamedTuple, Sequence
+from metrics import REGISTRY, Counter, Histogram
+
+
+# Rough size of a Claude token in English text; only used to budget, not to bill
+CHARS_PER_TOKEN = 4
+# Properties the recommendation needs; the rest of the object is left out of the prompt
+CONTEXT_PROPERTIES = ("title", "year", "genres", "overview")
+DUPLICATE_THRESHOLD = 0.8  # Jaccard similarity of overview shingles above which a movie is dropped
+SHINGLE_SIZE = 3
+
+CONTEXT_TOKENS = REGISTRY.register(
+    Counter(
+        "movieinsights_rag_context_tokens_total",
+        "Estimated prompt tokens of retrieved movies, sent to the LLM or saved by the context builder",
+        ["kind"],
+    )
+)
+CONTEXT_TOKENS_SAVED = REGISTRY.register(
+    Histogram(
+        "movieinsights_rag_context_tokens_saved",
+        "Estimated prompt tokens saved per generation by the context builder",
+        buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000, 16000),
+    )
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to about `max_tokens`, at the last sentence end if there is one, else a word."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end > max_chars // 2:
+        return cut[: sentence_end + 1]
+    return cut.rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def render_movie(movie: dict) -> str:
+    """One movie as a compact context line, e.g. `- Alien (1979) [Horror, Science Fiction]: ...`"""
+    line = f"- {movie.get('title')}"
+    if movie.get("year"):
+        line += f" ({movie['year']})"
+    if movie.get("genres"):
+        line += f" [{', '.join(movie['genres'])}]"
+    if movie.get("overview"):
+        line += f": {movie['overview']}"
+    return line
+
+
+class RagContext(NamedTuple):
+    text: str
+    movies: list[dict]  # The retrieved movies that made it into the context (untrimmed), in rank order
+    tokens: int  # Estimated tokens of `text`
+    full_tokens: int  # Estimated tokens of all retrieved objects, as a grouped task would send them
+    duplicates: int
+    truncated: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.full_tokens - self.tokens)
+
+
+def build_context(
+    movies: Sequence[dict],
+    budget_tokens: int,
+    max_overview_tokens: int = 100,
+    properties: Sequence[str] = CONTEXT_PROPERTIES,
+    duplicate_threshold: float = DUPLICATE_THRESHOLD,
+) -> RagContext:
+    """
+    Build the movie list for a RAG prompt from retrieved movies (best first), within
+    `budget_tokens`: only `properties` are kept, near-duplicate overviews of a better ranked
+    movie are dropped, overviews are cut to `max_overview_tokens`, and movies are added in rank
+    order until the budget is spent (the best one is always included).
+    """
+    full_tokens = sum(estimate_tokens(json.dumps(movie, default=str)) for movie in movies)
+
+    kept, lines, seen = [], [], []
+    tokens = duplicates = truncated = 0
+    for retrieved in movies:
+        movie = {key: retrieved[key] for key in properties if retrieved.get(key) is not None}
+        overview = movie.get("overview")
+        if overview:
+            shingles = _shingles(overview)
+            if any(_jaccard(shingles, other) >= duplicate_threshold for other in seen):
+                duplicates += 1
+                continue
+            seen.append(shingles)
+            short = truncate_to_tokens(overview, max_overview_tokens)
+            if short != overview:
+                movie["overview"] = short
+                truncated += 1
+
+        line = render_movie(movie)
+        line_tokens = estimate_tokens(line) + 1  # + newline
+        if kept and tokens + line_tokens > budget_tokens:
+            break
+        kept.append(retrieved)
+        lines.append(line)
+        tokens += line_tokens
+
+    context = RagContext("\n".join(lines), kept, tokens, full_tokens, duplicates, truncated)
+    CONTEXT_TOKENS.inc("sent", amount=context.tokens)
+    CONTEXT_TOKENS.inc("saved", amount=context.tokens_saved)
+    CONTEXT_TOKENS_SAVED.observe(context.tokens_saved)
+    return context
+
+
+def context_prompt(task: str, context: RagContext) -> str:
+    """The grouped task prompt, followed by the movie list it refers to."""
+    return f"{task}\n========== MOVIES ==========\n{context.text}\n========== END MOVIES ==========\n"
@@ -0,0 +1,36 @@
+import math
+from typing import Any, Sequence
+
+
+def weighted_popularity_rerank(
+    candidates: Sequence[Any], popularity_weight: float, limit: int
+) -> list[Any]:
+    """
+    Rerank search results by blending relevance with popularity.
+
+    Each candidate needs `metadata.score` (hybrid score) and a `popularity` property.
+    Both signals are min-max normalized over the candidate pool (popularity on a
+    log scale, as it is heavily skewed), then combined as:
+
+        (1 - popularity_weight) * relevance + popularity_weight * popularity
+
+    Returns the top `limit` candidates, best first.
+    """
+    if not candidates:
+        return []
+
+    scores = [o.metadata.score or 0.0 for o in candidates]
+    popularities = [math.log1p(max(o.properties["popularity"] or 0.0, 0.0)) for o in candidates]
+
+    def normalize(values: list[float]) -> list[float]:
+        low, high = min(values), max(values)
+        if high == low:
+            return [1.0] * len(values)
+        return [(v - low) / (high - low) for v in values]
+
+    combined = [
+        (1 - popularity_weight) * s + popularity_weight * p
+        for s, p in zip(normalize(scores), normalize(popularities))
+    ]
+    ranked = sorted(range(len(candidates)), key=lambda i: combined[i], reverse=True)
+    return [candidates[i] for i in ranked[:limit]]
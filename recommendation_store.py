@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from embeddings import normalize_text
+from generation_cache import GenerationCache
+from helpers import get_ingest_generation
+
+
+# Recommendations precomputed by precompute_recommendations.py, one file per ingest generation
+RECOMMENDATION_STORE_DIR = Path(os.getenv("RECOMMENDATION_STORE_DIR", "data/recommendations"))
+
+
+def store_path(generation: int, directory: Path = RECOMMENDATION_STORE_DIR) -> Path:
+    return directory / f"recommendations.g{generation}.json"
+
+
+def write_recommendations(
+    generation: int, recommendations: Dict[str, dict], directory: Path = RECOMMENDATION_STORE_DIR
+) -> Path:
+    """
+    Atomically write the recommendations (by occasion) for `generation`, and remove the
+    files of other generations, which describe data that is no longer served.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = store_path(generation, directory)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    payload = {
+        "generation": generation,
+        "created_at": time.time(),
+        "recommendations": {normalize_text(occasion): value for occasion, value in recommendations.items()},
+    }
+    tmp_path.write_text(json.dumps(payload))
+    tmp_path.replace(path)
+    for other in directory.glob("recommendations.g*.json"):
+        if other != path:
+            other.unlink(missing_ok=True)
+    return path
+
+
+def read_recommendations(generation: int, directory: Path = RECOMMENDATION_STORE_DIR) -> Dict[str, dict]:
+    """Recommendations by normalized occasion for `generation` (empty if none were precomputed)."""
+    try:
+        return json.loads(store_path(generation, directory).read_text())["recommendations"]
+    except FileNotFoundError:
+        return {}
+
+
+class RecommendationStore:
+    """
+    Serves precomputed recommendations for the current ingest generation, by exact
+    (normalized) occasion. The store is re-read when the generation changes, and every
+    `max_age` seconds, to pick up a precompute run that finished after the ingest.
+    """
+
+    def __init__(
+        self,
+        directory: Path = RECOMMENDATION_STORE_DIR,
+        poll_interval: float = 5.0,
+        max_age: float = 60.0,
+    ):
+        self.directory = Path(directory)
+        self._cache = GenerationCache(
+            lambda: read_recommendations(get_ingest_generation(), self.directory),
+            poll_interval=poll_interval,
+            max_age=max_age,
+            name="recommendation store",
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        self._cache.start()
+
+    def stop(self):
+        self._cache.stop()
+
+    def get(self, occasion: str) -> Optional[dict]:
+        recommendation = self._cache.get().get(normalize_text(occasion))
+        with self._lock:
+            if recommendation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return recommendation
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache.get()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
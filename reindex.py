@@ -0,0 +1,135 @@
+"""
+Blue/green reindex: rebuild the Movies collection without taking it offline.
+
+`Movies` is served through a collection alias. Each reindex ingests into a new versioned
+collection (`Movies_v1`, `Movies_v2`, ...) while the current one keeps serving, validates
+the new version, then atomically points the alias at it and deletes old versions.
+
+Configuration (environment variables):
+- REINDEX_KEEP_VERSIONS: previous versions to keep for rollback (default: 1)
+- REINDEX_MIN_COUNT_RATIO: refuse to swap if the new version has fewer objects than this
+  fraction of the live one (default: 0.9)
+- REINDEX_MIGRATE: "1" to replace an existing, non-aliased `Movies` collection by the alias.
+  `Movies` is briefly unavailable while the alias replaces it, on this first run only.
+"""
+
+import glob
+import os
+import re
+from typing import Dict, Optional
+import pyarrow.parquet as pq
+from weaviate import WeaviateClient
+from helpers import CollectionName, connect_to_weaviate, get_ingest_generation, mark_ingest_generation
+from populate_complete import create_movies_collection, ingest_movies_data
+from facets import facets_from_parquet, write_facets
+
+
+REINDEX_KEEP_VERSIONS = int(os.getenv("REINDEX_KEEP_VERSIONS", "1"))
+REINDEX_MIN_COUNT_RATIO = float(os.getenv("REINDEX_MIN_COUNT_RATIO", "0.9"))
+REINDEX_MIGRATE = os.getenv("REINDEX_MIGRATE", "0") == "1"
+
+ALIAS = CollectionName.MOVIES.value
+VERSION_PATTERN = re.compile(rf"^{ALIAS}_v(\d+)$")
+
+
+def collection_versions(client: WeaviateClient) -> Dict[int, str]:
+    """Versioned collections behind the alias, by version number."""
+    versions = {}
+    for name in client.collections.list_all(simple=True):
+        match = VERSION_PATTERN.match(name)
+        if match:
+            versions[int(match.group(1))] = name
+    return versions
+
+
+def live_collection(client: WeaviateClient) -> Optional[str]:
+    """The collection the alias currently points to (None if there is no alias)."""
+    alias = client.alias.get(alias_name=ALIAS)
+    return alias.collection if alias is not None else None
+
+
+def expected_object_count() -> int:
+    """Rows in the exported data files, read from parquet metadata (without loading the data)."""
+    return sum(
+        pq.ParquetFile(path).metadata.num_rows
+        for path in glob.glob("data/movies_popular_w_vectors_*.parquet")
+    )
+
+
+def validate(client: WeaviateClient, collection_name: str, expected: int, live: Optional[str]):
+    """Raise if the new version is incomplete, or much smaller than the live one."""
+    collection = client.collections.get(collection_name)
+    count = len(collection)
+    if count != expected:
+        raise RuntimeError(f"{collection_name} has {count} objects, expected {expected}")
+    if not collection.query.fetch_objects(limit=1).objects:
+        raise RuntimeError(f"{collection_name} returned no objects")
+    if live is not None:
+        live_count = len(client.collections.get(live))
+        if count < live_count * REINDEX_MIN_COUNT_RATIO:
+            raise RuntimeError(
+                f"{collection_name} has {count} objects, fewer than "
+                f"{REINDEX_MIN_COUNT_RATIO:.0%} of {live} ({live_count})"
+            )
+    print(f"✅ {collection_name} validated: {count} objects")
+
+
+def swap_alias(client: WeaviateClient, collection_name: str, live: Optional[str]):
+    """Point the alias at `collection_name`; queries switch over atomically."""
+    if live is not None:
+        client.alias.update(alias_name=ALIAS, new_target_collection=collection_name)
+        return
+
+    if client.collections.exists(ALIAS):
+        # A plain `Movies` collection from populate_complete.py; the alias must replace it
+        print(f"🗑️  Replacing collection '{ALIAS}' by an alias...")
+        client.collections.delete(ALIAS)
+    client.alias.create(alias_name=ALIAS, target_collection=collection_name)
+
+
+def garbage_collect(client: WeaviateClient, live: str):
+    """Delete old versions, keeping the newest REINDEX_KEEP_VERSIONS besides the live one."""
+    versions = collection_versions(client)
+    previous = sorted((version for version, name in versions.items() if name != live), reverse=True)
+    for version in previous[REINDEX_KEEP_VERSIONS:]:
+        print(f"🗑️  Deleting old version {versions[version]}")
+        client.collections.delete(versions[version])
+
+
+def main():
+    print("🔁 Starting blue/green reindex")
+    print("=" * 50)
+
+    with connect_to_weaviate() as client:
+        live = live_collection(client)
+        versions = collection_versions(client)
+        new_collection = f"{ALIAS}_v{max(versions, default=0) + 1}"
+        print(f"📚 Live collection: {live or '(no alias yet)'}, building {new_collection}")
+        if live is None and client.collections.exists(ALIAS) and not REINDEX_MIGRATE:
+            raise RuntimeError(
+                f"A collection named '{ALIAS}' exists, so the alias can't be created. "
+                f"Re-run with REINDEX_MIGRATE=1 to replace it ('{ALIAS}' is briefly unavailable)."
+            )
+
+        expected = expected_object_count()
+        create_movies_collection(client, collection_name=new_collection)
+        try:
+            ingest_movies_data(client, collection_name=new_collection)
+            validate(client, new_collection, expected, live)
+        except Exception:
+            # Leave the live collection untouched, and don't keep a partial version around
+            print(f"❌ Reindex failed, deleting {new_collection}; {live or ALIAS} is unchanged")
+            client.collections.delete(new_collection)
+            raise
+
+        swap_alias(client, new_collection, live)
+        # Facets first, so the API never sees the new generation without them
+        write_facets(facets_from_parquet(), generation=get_ingest_generation() + 1)
+        generation = mark_ingest_generation()
+        print(f"✅ '{ALIAS}' now points to {new_collection} (ingest generation {generation})")
+
+        garbage_collect(client, live=new_collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import numpy as np
+from embeddings import embed_text, normalize_text
+
+
+class SemanticCache:
+    """
+    Cache values by the meaning of a text key, rather than its exact wording.
+
+    Keys are normalized and embedded; a lookup returns the value of the most
+    similar stored key, if its cosine similarity is at least `threshold`.
+    Entries expire after `ttl` seconds, and the least recently used entry is
+    evicted once `capacity` entries are stored. If `generation` is given, all
+    entries are dropped when the value it returns changes (e.g. on re-ingest);
+    it is called at most every `generation_check_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        ttl: float = 3600.0,
+        capacity: int = 1000,
+        embed: Callable[[str], np.ndarray] = embed_text,
+        generation: Optional[Callable[[], int]] = None,
+        generation_check_interval: float = 1.0,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.capacity = capacity
+        self.embed = embed
+        self.generation = generation
+        self.generation_check_interval = generation_check_interval
+        self._generation = generation() if generation is not None else None
+        self._generation_checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # Allocated on first insert
+        self._keys: list[Optional[str]] = [None] * capacity
+        self._values: list[Any] = [None] * capacity
+        self._tokens = np.zeros(capacity, dtype=np.int64)
+        self._expires_at = np.zeros(capacity, dtype=np.float64)  # 0 = empty slot
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    def get(self, text: str) -> Optional[Any]:
+        """Return the cached value for the closest matching key, or None."""
+        self._check_generation()
+        vector = self.embed(normalize_text(text)) if self._vectors is not None else None
+        with self._lock:
+            slot = self._find(vector)
+            if slot is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_tokens += int(self._tokens[slot])
+            self._last_used[slot] = time.monotonic()
+            return self._values[slot]
+
+    def put(self, text: str, value: Any, tokens: int = 0):
+        """Store `value` for `text`. `tokens` is the LLM token cost a future hit saves."""
+        self._check_generation()
+        key = normalize_text(text)
+        vector = self.embed(key)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+            if key in self._keys:
+                slot = self._keys.index(key)
+            else:
+                # Reuse an empty or expired slot, otherwise evict the least recently used entry
+                expired = np.flatnonzero(self._expires_at <= now)
+                slot = int(expired[0]) if len(expired) else int(np.argmin(self._last_used))
+            self._vectors[slot] = vector
+            self._keys[slot] = key
+            self._values[slot] = value
+            self._tokens[slot] = tokens
+            self._expires_at[slot] = now + self.ttl
+            self._last_used[slot] = now
+
+    def _find(self, vector: Optional[np.ndarray]) -> Optional[int]:
+        if vector is None:
+            return None
+        live = self._expires_at > time.monotonic()
+        if not live.any():
+            return None
+        similarities = np.where(live, self._vectors @ vector, -np.inf)
+        slot = int(np.argmax(similarities))
+        return slot if similarities[slot] >= self.threshold else None
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if self.generation is None or now - self._generation_checked_at < self.generation_check_interval:
+            return
+        self._generation_checked_at = now
+        generation = self.generation()
+        if generation != self._generation:
+            self.clear()
+            self._generation = generation
+
+    def clear(self):
+        with self._lock:
+            self._expires_at[:] = 0
+            self._keys = [None] * self.capacity
+            self._values = [None] * self.capacity
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": int((self._expires_at > time.monotonic()).sum()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_llm_tokens": self.saved_tokens,
+        }
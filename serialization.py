@@ -0,0 +1,44 @@
+import os
+from typing import Any, Dict, Optional, Union
+import pydantic_core
+from fastapi import Response
+from pydantic import BaseModel
+from metrics import timed
+
+
+# Validate response data against the response models (once). Set to "0" to trust data
+# from Weaviate and serialize it directly, skipping validation.
+RESPONSE_VALIDATION = os.getenv("RESPONSE_VALIDATION", "1") == "1"
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize plain data (dicts with any keys, lists, datetimes ...) to JSON bytes."""
+    return pydantic_core.to_json(data)
+
+
+def json_response(
+    model_type: type[BaseModel],
+    data: Union[BaseModel, dict],
+    validate: bool = RESPONSE_VALIDATION,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Build a JSON response for an endpoint declared with `response_model=model_type`.
+
+    Returning a `Response` skips FastAPI's own response handling, which would validate
+    the data a second time (in a threadpool, for sync endpoints) and encode it through
+    Python's `json`. Instead, `data` is validated once with `model_type` (unless it is
+    already a model instance, or `validate` is off) and serialized straight to bytes.
+    """
+    if isinstance(data, BaseModel):
+        with timed("serialization"):
+            content = pydantic_core.to_json(data)
+    elif validate:
+        with timed("validation"):
+            model = model_type.model_validate(data)
+        with timed("serialization"):
+            content = pydantic_core.to_json(model)
+    else:
+        with timed("serialization"):
+            content = dumps(data)
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,103 @@
+"""
+Production entry point: serve the API with multiple worker processes.
+
+Read-only state (the /info snapshot, /suggest titles and /facets arrays) is built once here
+and published to shared memory (see shared_state.py), so workers don't each rebuild it
+from Weaviate. When an ingest bumps the ingest generation, the state is republished and
+workers are restarted one at a time (each finishing its in-flight requests first),
+dropping their per-process caches.
+Recommendations for common occasions are then precomputed again in the background
+(precompute_recommendations.py), as they describe the previous data.
+
+Configuration (environment variables):
+- WEB_WORKERS: worker processes (default: number of CPUs)
+- WEB_HOST / WEB_PORT: bind address (default: 0.0.0.0:8000)
+- RELOAD_ON_INGEST: restart workers after a re-ingest, "1" (default) or "0"
+- PRECOMPUTE_ON_INGEST: precompute recommendations for each ingest generation, "1" (default) or "0"
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import uvicorn
+from helpers import get_ingest_generation
+import shared_state
+from main_complete import INFO_CACHE_MAX_AGE_SECONDS, INFO_CACHE_POLL_SECONDS, publish_shared_state
+from query_log import log_files
+from recommendation_store import store_path
+
+
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "8000"))
+RELOAD_ON_INGEST = os.getenv("RELOAD_ON_INGEST", "1") == "1"
+PRECOMPUTE_ON_INGEST = os.getenv("PRECOMPUTE_ON_INGEST", "1") == "1"
+
+
+def publish(generation: int) -> bool:
+    try:
+        publish_shared_state(generation)
+        return True
+    except Exception as e:
+        # Workers fall back to building the state themselves
+        print(f"Failed to publish shared state for generation {generation}: {e}")
+        return False
+
+
+def precompute(generation: int, state: dict):
+    """Start precompute_recommendations.py once per generation, unless its store already exists."""
+    process = state.get("process")
+    if process is not None and process.poll() is None:
+        return  # Still running; a run for an outdated generation discards its results
+    if state.get("generation") == generation or store_path(generation).exists():
+        return
+    print(f"Precomputing recommendations for ingest generation {generation}")
+    state["generation"] = generation
+    # Occasions come from the query logs when there are any, else the script's defaults
+    command = [sys.executable, "precompute_recommendations.py"] + (["--log"] if log_files() else [])
+    state["process"] = subprocess.Popen(command)
+
+
+def watch_ingest_generation(generation: int, stop: threading.Event):
+    """Republish shared state when it ages or the data changes, and reload workers on re-ingest."""
+    precompute_state = {}
+    if PRECOMPUTE_ON_INGEST:
+        precompute(generation, precompute_state)
+    while not stop.wait(INFO_CACHE_POLL_SECONDS):
+        current = get_ingest_generation()
+        if current != generation:
+            print(f"Ingest generation changed ({generation} -> {current}), reloading workers")
+            publish(current)
+            generation = current
+            if RELOAD_ON_INGEST and WEB_WORKERS > 1:
+                # With a single worker, uvicorn runs in this process, and SIGHUP would stop it
+                os.kill(os.getpid(), signal.SIGHUP)  # uvicorn restarts workers one by one
+        else:
+            age = shared_state.snapshot_age("info", generation)
+            if age is None or age > INFO_CACHE_MAX_AGE_SECONDS / 2:
+                publish(generation)
+        if PRECOMPUTE_ON_INGEST:
+            precompute(generation, precompute_state)
+
+
+def main():
+    generation = get_ingest_generation()
+    publish(generation)
+
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=watch_ingest_generation, args=(generation, stop), name="ingest watcher", daemon=True
+    )
+    watcher.start()
+
+    print(f"Serving on {WEB_HOST}:{WEB_PORT} with {WEB_WORKERS} workers (ingest generation {generation})")
+    try:
+        uvicorn.run("main_complete:app", host=WEB_HOST, port=WEB_PORT, workers=WEB_WORKERS)
+    finally:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+from helpers import CollectionName, INGEST_GENERATION_FILE
+
+
+# Read-only state shared between API worker processes, published once per ingest generation.
+# /dev/shm is memory-backed, so workers reading (or memory-mapping) it share the page cache.
+SHARED_STATE_DIR = Path(
+    os.getenv(
+        "SHARED_STATE_DIR",
+        "/dev/shm/movieinsights" if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir()) / "movieinsights",
+    )
+)
+
+# Generations are only unique per data directory, so another checkout (or collection) on the same
+# host gets its own namespace, recorded in an owner file that is checked before attaching
+OWNER = {
+    "collection": CollectionName.MOVIES.value,
+    "data_dir": str(INGEST_GENERATION_FILE.resolve().parent),
+}
+OWNER_FILE = "owner.json"
+
+
+def _state_dir() -> Path:
+    digest = hashlib.blake2b(json.dumps(OWNER, sort_keys=True).encode(), digest_size=8).hexdigest()
+    return SHARED_STATE_DIR / f"{OWNER['collection']}-{digest}"
+
+
+def _owned(state_dir: Path) -> bool:
+    """Whether `state_dir` was published for this collection and data directory"""
+    try:
+        return json.loads((state_dir / OWNER_FILE).read_text()) == OWNER
+    except (FileNotFoundError, ValueError):
+        return False
+
+
+def _create_state_dir() -> Path:
+    state_dir = _state_dir()
+    state_dir.mkdir(parents=True, exist_ok=True)
+    if not _owned(state_dir):
+        tmp_path = state_dir / f"{OWNER_FILE}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(OWNER, sort_keys=True))
+        tmp_path.replace(state_dir / OWNER_FILE)
+    return state_dir
+
+
+def _ingest_stamp() -> int:
+    """When the generation file was last written, so a reset data directory never reuses old snapshots"""
+    try:
+        return INGEST_GENERATION_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _path(name: str, generation: int, suffix: str = "") -> Path:
+    return _state_dir() / f"{name}.g{generation}-{_ingest_stamp()}{suffix}"
+
+
+def _prune(name: str, keep: Path):
+    """Remove snapshots of `name` from other generations."""
+    for path in keep.parent.glob(f"{name}.g*"):
+        if path != keep and not path.name.endswith(".tmp"):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+
+def snapshot_age(name: str, generation: int) -> Optional[float]:
+    """Seconds since the snapshot was published, or None if there is none."""
+    if not _owned(_state_dir()):
+        return None
+    for path in (_path(name, generation, ".bin"), _path(name, generation)):
+        if path.exists():
+            return time.time() - path.stat().st_mtime
+    return None
+
+
+def publish_bytes(name: str, generation: int, data: bytes) -> Path:
+    """Atomically publish a bytes snapshot (e.g. serialized JSON) for `generation`."""
+    _create_state_dir()
+    path = _path(name, generation, ".bin")
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    _prune(name, keep=path)
+    return path
+
+
+def load_bytes(name: str, generation: int, max_age: Optional[float] = None) -> Optional[bytes]:
+    """Read a bytes snapshot, or None if there is none for `generation` (or it is older than `max_age`)."""
+    if not _owned(_state_dir()):
+        return None
+    path = _path(name, generation, ".bin")
+    try:
+        if max_age is not None and time.time() - path.stat().st_mtime > max_age:
+            return None
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def publish_arrays(name: str, generation: int, arrays: Dict[str, np.ndarray]) -> Path:
+    """
+    Atomically publish a set of arrays for `generation`, as one `.npy` file per array.
+
+    The files are written to a temporary directory that is then renamed into place, so readers
+    never map a half-written file. A generation's arrays never change, so an existing snapshot is kept.
+    """
+    state_dir = _create_state_dir()
+    path = _path(name, generation)
+    tmp_path = Path(tempfile.mkdtemp(prefix=f"{path.name}.", suffix=".tmp", dir=state_dir))
+    for key, array in arrays.items():
+        np.save(tmp_path / f"{key}.npy", array)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another process published this generation first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not path.is_dir():
+            raise
+    _prune(name, keep=path)
+    return path
+
+
+def load_arrays(name: str, generation: int) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Memory-map a published set of arrays (read-only), or None if there is none for `generation`.
+
+    Every worker mapping the same files shares one copy of the data in memory.
+    """
+    if not _owned(_state_dir()):
+        return None
+    path = _path(name, generation)
+    if not path.is_dir():
+        return None
+    return {file.stem: np.load(file, mmap_mode="r") for file in sorted(path.glob("*.npy"))}
@@ -0,0 +1,70 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Sequence
+import numpy as np
+
+
+# Prefixes up to this length match thousands of keys, so their top results are precomputed
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+
+def normalize_title(text: str) -> str:
+    """Lowercase, without accents or punctuation, and with single spaces: "Amélie!" -> "amelie"."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+class TitleIndex:
+    """
+    Prefix index over movie titles, for typeahead.
+
+    Every title is indexed from the start of each of its words ("the dark knight", "dark
+    knight", "knight"), so "kni" and "dark k" both find it. Keys are kept in one sorted list,
+    so the keys starting with a prefix are a contiguous range found by binary search.
+    Movies are numbered by descending popularity, so the best matches in a range are simply
+    its smallest movie numbers; for short prefixes, they are precomputed.
+    """
+
+    def __init__(self, movies: Sequence[dict], top_k: int = 20):
+        # Most popular first, so a movie's position is also its popularity rank
+        self.movies = sorted(movies, key=lambda movie: movie.get("popularity") or 0.0, reverse=True)
+        self.top_k = top_k
+
+        entries = []
+        for rank, movie in enumerate(self.movies):
+            words = normalize_title(movie.get("title") or "").split()
+            # A title like "Up Up" has repeated suffixes; one entry each is enough
+            for key in {" ".join(words[i:]) for i in range(len(words))}:
+                entries.append((key, rank))
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._ranks = np.array([rank for _, rank in entries], dtype=np.int32)
+
+        self._precomputed = {}
+        for key in self._keys:
+            for length in range(1, min(len(key), PRECOMPUTED_PREFIX_LENGTH) + 1):
+                prefix = key[:length]
+                if prefix not in self._precomputed:
+                    self._precomputed[prefix] = self._search(prefix, top_k)
+
+    def __len__(self) -> int:
+        return len(self.movies)
+
+    def _search(self, prefix: str, limit: int) -> np.ndarray:
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + "\U0010ffff", lo=start)
+        # Sorted unique ranks: the most popular distinct movies first
+        return np.unique(self._ranks[start:end])[:limit]
+
+    def suggest(self, text: str, limit: int = 10) -> list[dict]:
+        """Up to `limit` movies with a title word starting with `text`, most popular first."""
+        prefix = normalize_title(text)
+        if not prefix:
+            return []
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH and limit <= self.top_k:
+            ranks = self._precomputed.get(prefix, ())[:limit]
+        else:
+            ranks = self._search(prefix, limit)
+        return [self.movies[rank] for rank in ranks]
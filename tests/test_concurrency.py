@@ -0,0 +1,110 @@
+import threading
+import time
+import pytest
+from fastapi import HTTPException
+from concurrency import ConcurrencyLimiter, SingleFlight
+
+
+def run_concurrently(fn, n: int) -> list:
+    """Call `fn` from `n` threads at once; returns each call's result or exception."""
+    results = [None] * n
+    barrier = threading.Barrier(n)
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow(value, seconds: float = 0.2, calls: list = None):
+    def fn():
+        if calls is not None:
+            calls.append(1)
+        time.sleep(seconds)
+        return value
+
+    return fn
+
+
+def test_identical_calls_share_one_execution():
+    flight, calls = SingleFlight(), []
+    results = run_concurrently(lambda: flight.do("key", slow("result", calls=calls)), 5)
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_run_separately():
+    flight, calls = SingleFlight(), []
+    keys = iter(range(3))
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            key = next(keys)
+        return flight.do(key, slow(key, calls=calls))
+
+    assert sorted(run_concurrently(call, 3)) == [0, 1, 2]
+    assert len(calls) == 3
+
+
+def test_errors_are_shared_with_waiters():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("upstream failed")
+
+    results = run_concurrently(lambda: flight.do("key", fail), 3)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_waiters_beyond_the_cap_are_rejected():
+    flight = SingleFlight(max_waiters=2)
+    results = run_concurrently(lambda: flight.do("key", slow("result", 0.3)), 5)
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert results.count("result") == 3  # The leader and two waiters
+    assert len(rejected) == 2
+    assert {r.status_code for r in rejected} == {503}
+    assert all("Retry-After" in r.headers for r in rejected)
+    assert flight.stats()["shed"] == 2
+
+
+def test_waiters_give_up_after_the_timeout():
+    flight = SingleFlight(wait_timeout=0.05)
+    results = run_concurrently(lambda: flight.do("key", slow("result", 0.3)), 3)
+    assert results.count("result") == 1
+    assert [r.status_code for r in results if isinstance(r, HTTPException)] == [503, 503]
+    assert flight.stats()["waiting"] == 0
+
+
+def test_limiter_sheds_callers_beyond_the_queue():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1, queue_timeout=5)
+
+    def call():
+        with limiter.slot():
+            time.sleep(0.2)
+            return "ok"
+
+    results = run_concurrently(call, 3)
+    assert results.count("ok") == 2  # One running, one queued
+    assert [r.status_code for r in results if isinstance(r, HTTPException)] == [429]
+
+
+def test_limiter_queue_timeout():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=5, queue_timeout=0.05)
+    with limiter.slot():
+        with pytest.raises(HTTPException) as error:
+            with limiter.slot():
+                pass
+    assert error.value.status_code == 429
+    assert limiter.stats() == {"active": 0, "waiting": 0, "max_concurrency": 1, "max_queue": 5, "shed": 1}
@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+from pathlib import Path
+import pytest
+import helpers
+from helpers import _decode_item, get_data_objects, snapshot_is_current
+
+
+FIXTURE = Path(__file__).parent.parent / "fixtures" / "wykonos_movies_sample.jsonl"
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch) -> Path:
+    """A copy of the fixture as DATASET_SOURCE, with the snapshot written under tmp_path."""
+    source = tmp_path / "movies.jsonl"
+    shutil.copy(FIXTURE, source)
+    monkeypatch.setattr(helpers, "DATASET_SOURCE", str(source))
+    monkeypatch.setattr(helpers, "DATASET_SNAPSHOT", True)
+    monkeypatch.setattr(helpers, "DATASET_SNAPSHOT_FILE", tmp_path / "movies.arrow")
+    return source
+
+
+def expected_objects(source: Path) -> list[dict]:
+    with open(source) as f:
+        return [_decode_item(json.loads(line)) for line in f]
+
+
+def test_snapshot_objects_match_decoding_items_one_by_one(source):
+    objects = list(get_data_objects())
+    assert objects == expected_objects(source)
+    assert any(o["release_date"] is None and o["genres"] is None for o in objects)
+
+
+def test_snapshot_is_reused_while_the_source_is_unchanged(source):
+    list(get_data_objects())
+    snapshot = helpers.DATASET_SNAPSHOT_FILE
+    built_at = snapshot.stat().st_mtime_ns
+    assert snapshot_is_current(snapshot, str(source))
+
+    list(get_data_objects())
+    assert snapshot.stat().st_mtime_ns == built_at
+
+
+def test_snapshot_is_rebuilt_when_the_source_changes(source):
+    list(get_data_objects())
+    lines = source.read_text().splitlines()
+    source.write_text("\n".join(lines[:3]) + "\n")
+    os.utime(source, ns=(0, 0))  # A different revision even if the mtime resolution is coarse
+
+    assert not snapshot_is_current(helpers.DATASET_SNAPSHOT_FILE, str(source))
+    assert list(get_data_objects()) == expected_objects(source)
+
+
+def test_snapshot_of_another_source_is_not_current(source, tmp_path):
+    list(get_data_objects())
+    other = tmp_path / "other.jsonl"
+    shutil.copy(source, other)
+    assert not snapshot_is_current(helpers.DATASET_SNAPSHOT_FILE, str(other))
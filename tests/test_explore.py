@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+import main_complete
+from benchmarks.fakes import GENRES, FakeWeaviateClient, make_corpus
+from facets import Facets, build_facets
+from generation_cache import GenerationCache
+
+
+CORPUS = make_corpus(200)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The API over a fake Weaviate, recording the filters of every fetch_objects query."""
+    weaviate = FakeWeaviateClient(CORPUS, latency=0)
+    movies = weaviate.collections.use("Movies")
+    fetch_objects, filters = movies.query.fetch_objects, []
+
+    def recording_fetch_objects(**kwargs):
+        filters.append(kwargs.get("filters"))
+        return fetch_objects(**kwargs)
+
+    monkeypatch.setattr(movies.query, "fetch_objects", recording_fetch_objects)
+    monkeypatch.setattr(main_complete, "connect", lambda: weaviate)
+    monkeypatch.setattr(
+        main_complete, "facets_cache", GenerationCache(lambda: Facets(build_facets(CORPUS)), name="facets")
+    )
+    client = TestClient(main_complete.app)
+    client.filters = filters
+    return client
+
+
+@pytest.mark.parametrize("genre", ["comedy", " Comedy ", "COMEDY"])
+def test_popularity_ranking_normalizes_the_genre(client, genre):
+    response = client.get("/explore", params={"genre": genre, "ranking": "popularity"})
+    assert response.status_code == 200
+    assert response.json()["genre"] == "Comedy"
+    assert "Comedy" in repr(client.filters[-1])
+
+
+def test_popularity_ranking_rejects_unknown_genres(client):
+    response = client.get("/explore", params={"genre": "Westerns", "ranking": "popularity"})
+    assert response.status_code == 422
+    assert "Westerns" in response.json()["detail"]
+    assert all(genre in response.json()["detail"] for genre in GENRES)
+    assert client.filters == []
+
+
+def test_other_rankings_search_the_genre_as_given(client):
+    response = client.get("/explore", params={"genre": "feel-good comedy"})
+    assert response.status_code == 200
+    assert response.json()["genre"] == "feel-good comedy"
@@ -0,0 +1,109 @@
+import random
+import numpy as np
+import pytest
+from facets import Facets, _popcount, build_facets, read_facets, write_facets
+
+
+GENRES = ["Action", "Comedy", "Drama", "Horror"]
+
+
+def make_movies(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "movie_id": i,
+            "year": rng.randint(1990, 2010),
+            "genres": rng.sample(GENRES, rng.randint(0, 3)) or None,
+            "popularity": rng.uniform(0, 100),
+        }
+        for i in range(n)
+    ]
+
+
+def brute_force_counts(movies: list[dict], year_min: int, year_max: int, genres=()) -> dict:
+    selected = [
+        movie
+        for movie in movies
+        if year_min <= movie["year"] <= year_max and set(genres) <= set(movie["genres"] or ())
+    ]
+    genre_counts, year_counts = {}, {}
+    for movie in selected:
+        for genre in movie["genres"] or ():
+            genre_counts[genre] = genre_counts.get(genre, 0) + 1
+        year_counts[movie["year"]] = year_counts.get(movie["year"], 0) + 1
+    return {"total": len(selected), "genres": genre_counts, "years": year_counts}
+
+
+@pytest.mark.parametrize("length", [1, 7, 8, 9, 64, 130])
+def test_popcount_matches_counting_rows(length):
+    rng = np.random.default_rng(length)
+    rows = rng.random(length) < 0.5
+    bits = np.packbits(rows)
+    for start in range(length + 1):
+        for end in range(start, length + 1):
+            assert _popcount(bits, start, end) == rows[start:end].sum()
+
+
+MOVIES = make_movies(500)
+
+
+@pytest.mark.parametrize(
+    "year_min, year_max, genres",
+    [
+        (1990, 2010, ()),
+        (1995, 1995, ()),
+        (1993, 2004, ()),
+        (1993, 2004, ("Drama",)),
+        (1990, 2010, ("Action", "Comedy")),
+        (2001, 2003, ("Horror", "Drama")),
+    ],
+)
+def test_counts_match_brute_force(year_min, year_max, genres):
+    counts = Facets(build_facets(MOVIES)).counts(year_min, year_max, genres)
+    expected = brute_force_counts(MOVIES, year_min, year_max, genres)
+    assert {key: counts[key] for key in expected} == expected
+    assert (counts["year_min"], counts["year_max"]) == (year_min, year_max)
+
+
+def test_counts_clamp_the_year_range():
+    facets = Facets(build_facets(MOVIES))
+    counts = facets.counts(1800, 2100)
+    assert (counts["year_min"], counts["year_max"]) == (facets.first_year, facets.last_year)
+    assert counts["total"] == len(MOVIES)
+    assert facets.counts(2050, 2060)["total"] == 0
+
+
+def test_unknown_genre_matches_nothing():
+    assert Facets(build_facets(MOVIES)).counts(genres=["Western"])["total"] == 0
+
+
+def test_percentiles():
+    facets = Facets(build_facets(MOVIES))
+    drama = [m["popularity"] for m in MOVIES if "Drama" in (m["genres"] or ())]
+    assert facets.percentiles_for("Drama")["p50"] == pytest.approx(np.percentile(drama, 50), rel=1e-5)
+    assert list(facets.percentiles_for()) == ["p50", "p75", "p90", "p99"]
+
+
+def test_facets_are_written_for_an_ingest_generation(tmp_path):
+    path = tmp_path / "facets.npz"
+    write_facets(build_facets(MOVIES), generation=3, path=path)
+    assert read_facets(2, path) is None
+    facets = Facets(read_facets(3, path))
+    assert facets.generation == 3
+    assert facets.counts() == Facets(build_facets(MOVIES)).counts()
+    assert read_facets(3, tmp_path / "missing.npz") is None
+
+
+def test_canonical_genre():
+    facets = Facets(build_facets(MOVIES))
+    assert facets.canonical_genre(" drama ") == "Drama"
+    assert facets.canonical_genre("HORROR") == "Horror"
+    assert facets.canonical_genre("Western") is None
+
+
+@pytest.mark.parametrize("genres", [(), ("Drama",), ("Comedy", "Horror")])
+def test_facets_without_genre_pairs_count_from_bitmaps(genres):
+    arrays = build_facets(MOVIES)
+    assert (arrays["genre_pairs"].diagonal().T == arrays["genre_cumulative"]).all()
+    older = Facets({name: array for name, array in arrays.items() if name != "genre_pairs"})
+    assert older.counts(1995, 2005, genres) == Facets(arrays).counts(1995, 2005, genres)
@@ -0,0 +1,89 @@
+import threading
+import time
+import pytest
+import generation_cache
+from generation_cache import GenerationCache
+
+
+@pytest.fixture
+def generation(monkeypatch):
+    """The ingest generation seen by the cache, as a settable one-item list."""
+    current = [1]
+    monkeypatch.setattr(generation_cache, "get_ingest_generation", lambda: current[0])
+    return current
+
+
+def test_cold_callers_share_one_load(generation):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    cache = GenerationCache(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 8
+    assert len(loads) == 1
+
+
+def test_value_is_returned_with_its_generation(generation):
+    values = iter(["first", "second"])
+    cache = GenerationCache(lambda: next(values))
+    assert cache.generation is None
+    assert cache.get_with_generation() == ("first", 1)
+
+    # A new ingest makes the value stale, but reads keep the old one until it is refreshed
+    generation[0] = 2
+    assert cache.is_stale()
+    assert cache.get_with_generation() == ("first", 1)
+    assert cache.refresh() == "second"
+    assert cache.get_with_generation() == ("second", 2)
+    assert not cache.is_stale()
+
+
+def test_value_expires_after_max_age(generation):
+    cache = GenerationCache(lambda: "value", max_age=0.0)
+    cache.get()
+    time.sleep(0.01)
+    assert cache.is_stale()
+
+
+def test_refresh_thread_reloads_on_new_generation(generation):
+    values = iter(range(100))
+    cache = GenerationCache(lambda: next(values), poll_interval=0.01)
+    cache.start()
+    try:
+        deadline = time.monotonic() + 2
+        while cache.generation is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get_with_generation() == (0, 1)
+
+        generation[0] = 2
+        while cache.generation != 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get_with_generation() == (1, 2)
+    finally:
+        cache.stop()
+
+
+def test_failed_refresh_keeps_serving_the_previous_value(generation):
+    def loader():
+        if generation[0] > 1:
+            raise RuntimeError("Weaviate is down")
+        return "value"
+
+    cache = GenerationCache(loader, poll_interval=0.01)
+    cache.get()
+    generation[0] = 2
+    cache.start()
+    try:
+        time.sleep(0.05)
+        assert cache.get_with_generation() == ("value", 1)
+    finally:
+        cache.stop()
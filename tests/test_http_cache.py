@@ -0,0 +1,116 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+import http_cache
+from http_cache import HTTPCacheMiddleware, _etag_matches, data_generation_headers
+
+
+@pytest.fixture
+def state(monkeypatch):
+    """The ingest generation marker, and the generation of the data a cached route serves."""
+    state = {"marker": 1, "served": 1, "calls": 0}
+    monkeypatch.setattr(http_cache, "get_ingest_generation", lambda: state["marker"])
+    monkeypatch.setattr(http_cache, "GENERATION_CHECK_SECONDS", -1.0)
+    return state
+
+
+def make_app(state, code_version: str = "build-1") -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/search")
+    def search(q: str = ""):
+        state["calls"] += 1
+        return {"q": q}
+
+    @app.get("/info")
+    def info():
+        state["calls"] += 1
+        return JSONResponse({"count": 1}, headers=data_generation_headers(state["served"]))
+
+    @app.get("/other")
+    def other():
+        return {}
+
+    app.add_middleware(
+        HTTPCacheMiddleware,
+        version="0.1.0",
+        max_age={"/search": 300, "/info": 60},
+        generations={"/info": lambda: state["served"]},
+        code_version=code_version,
+    )
+    return app
+
+
+@pytest.fixture
+def client(state):
+    return TestClient(make_app(state))
+
+
+def test_etag_ignores_query_parameter_order(client):
+    first = client.get("/search?q=space&year_min=1990").headers["etag"]
+    assert client.get("/search?year_min=1990&q=space").headers["etag"] == first
+    assert client.get("/search?q=sea").headers["etag"] != first
+
+
+def test_matching_etag_is_answered_without_the_endpoint(client, state):
+    response = client.get("/search?q=space")
+    assert response.headers["cache-control"] == "public, max-age=300"
+    assert state["calls"] == 1
+
+    revalidated = client.get("/search?q=space", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == response.headers["etag"]
+    assert state["calls"] == 1
+
+
+def test_new_ingest_generation_changes_the_etag(client, state):
+    etag = client.get("/search?q=space").headers["etag"]
+    state["marker"] = 2
+    response = client.get("/search?q=space", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_new_code_version_changes_the_etag(client, state):
+    etag = client.get("/search?q=space").headers["etag"]
+    deployed = TestClient(make_app(state, code_version="build-2"))
+    response = deployed.get("/search?q=space", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_code_version(monkeypatch):
+    monkeypatch.setenv("BUILD_ID", "abc123")
+    assert http_cache.code_version() == "abc123"
+    monkeypatch.delenv("BUILD_ID")
+    assert http_cache.code_version() == http_cache.code_version() != "abc123"
+
+
+def test_cached_routes_use_the_generation_of_the_data_served(client, state):
+    response = client.get("/info")
+    assert "x-data-generation" not in response.headers
+    etag = response.headers["etag"]
+
+    # The marker moves on, but the route's cache still holds (and serves) generation 1
+    state["marker"] = 2
+    assert client.get("/info", headers={"If-None-Match": etag}).status_code == 304
+
+    state["served"] = 2
+    refreshed = client.get("/info", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+
+
+def test_uncached_routes_are_left_alone(client):
+    response = client.get("/other")
+    assert "etag" not in response.headers
+    assert "cache-control" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    [('W/"abc"', True), ('"abc"', True), ('"x", W/"abc"', True), ("*", True), ('W/"abcd"', False)],
+)
+def test_etag_matches(if_none_match, matches):
+    assert _etag_matches('W/"abc"', if_none_match) is matches
@@ -0,0 +1,150 @@
+import anthropic
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from weaviate.exceptions import WeaviateConnectionError, WeaviateTimeoutError
+from concurrency import ConcurrencyLimiter
+from metrics import (
+    ERRORS,
+    REGISTRY,
+    REQUESTS,
+    STAGE_DURATION,
+    MetricsMiddleware,
+    classify_error,
+    http_error,
+    report_error,
+    timed,
+)
+
+
+def rate_limit_error() -> anthropic.RateLimitError:
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    return anthropic.RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+
+
+UPSTREAM_ERRORS = {
+    "weaviate_timeout": WeaviateTimeoutError("timed out"),
+    "weaviate_unavailable": WeaviateConnectionError("refused"),
+    "anthropic_rate_limited": rate_limit_error(),
+    "internal": KeyError("title"),
+}
+limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=0, queue_timeout=0)
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/test-metrics/items/{item_id}")
+def get_item(item_id: int):
+    with timed("lookup"):
+        if item_id == 0:
+            raise http_error(HTTPException(status_code=404, detail="no item 0"))
+        return {"item_id": item_id}
+
+
+@app.get("/test-metrics/upstream/{category}")
+def upstream(category: str):
+    try:
+        raise UPSTREAM_ERRORS[category]
+    except Exception as e:
+        raise http_error(e)
+
+
+@app.get("/test-metrics/limited")
+def limited():
+    try:
+        with limiter.slot():
+            return {}
+    except Exception as e:
+        raise http_error(e)
+
+
+@app.get("/test-metrics/crash")
+def crash():
+    raise RuntimeError("not converted by http_error")
+
+
+client = TestClient(app, raise_server_exceptions=False)
+
+
+class Delta:
+    """Changes of a counter's values while the block runs."""
+
+    def __init__(self, counter):
+        self.counter = counter
+
+    def __enter__(self):
+        self.before = dict(self.counter._values)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.changes = {
+            labels: value - self.before.get(labels, 0.0)
+            for labels, value in self.counter._values.items()
+            if value != self.before.get(labels, 0.0)
+        }
+
+
+def test_success_is_labelled_by_route_template():
+    with Delta(REQUESTS) as requests, Delta(ERRORS) as errors:
+        assert client.get("/test-metrics/items/1").status_code == 200
+        assert client.get("/test-metrics/items/2").status_code == 200
+    assert requests.changes == {("/test-metrics/items/{item_id}", "200"): 2}
+    assert errors.changes == {}
+    assert ("/test-metrics/items/{item_id}", "lookup") in STAGE_DURATION._series
+
+
+def test_client_errors():
+    with Delta(REQUESTS) as requests, Delta(ERRORS) as errors:
+        assert client.get("/test-metrics/items/0").status_code == 404
+        assert client.get("/test-metrics/items/x").status_code == 422  # Rejected by FastAPI validation
+        assert client.get("/test-metrics/nowhere").status_code == 404
+    assert requests.changes == {
+        ("/test-metrics/items/{item_id}", "404"): 1,
+        ("/test-metrics/items/{item_id}", "422"): 1,
+        ("unmatched", "404"): 1,
+    }
+    assert errors.changes == {("/test-metrics/items/{item_id}", "http_404"): 1}
+
+
+@pytest.mark.parametrize(
+    "category, status",
+    [("weaviate_timeout", 504), ("weaviate_unavailable", 503), ("anthropic_rate_limited", 503), ("internal", 500)],
+)
+def test_upstream_errors_are_classified(category, status):
+    assert classify_error(UPSTREAM_ERRORS[category]) == (category, status)
+    with Delta(REQUESTS) as requests, Delta(ERRORS) as errors:
+        response = client.get(f"/test-metrics/upstream/{category}")
+    assert response.status_code == status
+    assert requests.changes == {("/test-metrics/upstream/{category}", str(status)): 1}
+    assert errors.changes == {("/test-metrics/upstream/{category}", category): 1}
+
+
+def test_shed_requests_are_counted_as_429():
+    with limiter.slot(), Delta(REQUESTS) as requests, Delta(ERRORS) as errors:
+        response = client.get("/test-metrics/limited")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert requests.changes == {("/test-metrics/limited", "429"): 1}
+    assert errors.changes == {("/test-metrics/limited", "http_429"): 1}
+
+
+def test_unhandled_exceptions_are_counted_as_500():
+    with Delta(REQUESTS) as requests:
+        assert client.get("/test-metrics/crash").status_code == 500
+    assert requests.changes == {("/test-metrics/crash", "500"): 1}
+
+
+def test_errors_off_the_request_path_are_reported_as_background(caplog):
+    with Delta(ERRORS) as errors:
+        report_error(WeaviateTimeoutError("timed out"), "refresh")
+    assert errors.changes == {("background", "weaviate_timeout"): 1}
+    assert "refresh" in caplog.text
+
+
+def test_render():
+    client.get("/test-metrics/items/1")
+    text = REGISTRY.render()
+    assert 'movieinsights_requests_total{endpoint="/test-metrics/items/{item_id}",status="200"}' in text
+    assert 'movieinsights_request_duration_seconds_bucket{endpoint="/test-metrics/items/{item_id}",le="+Inf"}' in text
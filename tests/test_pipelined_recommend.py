@@ -0,0 +1,141 @@
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+import pytest
+import pipelined_recommend
+from pipelined_recommend import pipelined_recommendation, reciprocal_rank_fusion, rewrite_cache
+
+
+RETRIEVAL_SECONDS = 0.2
+
+
+def movie_uuid(movie_id: int) -> uuid.UUID:
+    return uuid.UUID(int=movie_id)
+
+
+class FakeQuery:
+    """`near_text` returns fixed results per query text, taking RETRIEVAL_SECONDS."""
+
+    def __init__(self, results: dict, calls: list):
+        self.results, self.calls = results, calls
+
+    def near_text(self, query, limit, return_properties, **kwargs):
+        self.calls.append(("near_text", query, time.monotonic()))
+        time.sleep(RETRIEVAL_SECONDS)
+        return SimpleNamespace(objects=self._objects(self.results.get(query, [])[:limit]))
+
+    def fetch_objects(self, filters, limit, return_properties, **kwargs):
+        self.calls.append(("fetch_objects", kwargs.get("grouped_task"), time.monotonic()))
+        ids = {str(i) for i in filters.value}
+        # Unordered, like Weaviate
+        movie_ids = sorted(m for ids_ in self.results.values() for m in ids_ if str(movie_uuid(m)) in ids)
+        return SimpleNamespace(objects=self._objects(list(dict.fromkeys(movie_ids))), generative="text")
+
+    def _objects(self, movie_ids):
+        return [SimpleNamespace(uuid=movie_uuid(m), properties={"movie_id": m}) for m in movie_ids]
+
+
+class FakeCollection:
+    def __init__(self, results: dict):
+        self.calls = []
+        self.query = self.generate = FakeQuery(results, self.calls)
+
+
+@pytest.fixture
+def rewrites(monkeypatch):
+    """Rewrite occasions with this mapping, each taking `seconds` (tweakable per test)."""
+    rewrites = {"seconds": RETRIEVAL_SECONDS / 2, "started": []}
+
+    def rewrite(occasion, usage=None):
+        rewrites["started"].append(time.monotonic())
+        time.sleep(rewrites["seconds"])
+        if usage is not None:
+            usage["input_tokens"] = usage.get("input_tokens", 0) + 10
+        return rewrites[occasion]
+
+    monkeypatch.setattr(pipelined_recommend, "movie_occasion_to_query", rewrite)
+    rewrite_cache.clear()
+    yield rewrites
+    rewrite_cache.clear()
+
+
+def recommend(collection, occasion, grouped_task="task", usage=None):
+    return pipelined_recommendation(
+        collection,
+        occasion=occasion,
+        grouped_task=grouped_task,
+        generative_provider=None,
+        limit=4,
+        return_properties=["movie_id"],
+        usage={} if usage is None else usage,
+    )
+
+
+def test_rrf_favours_items_ranked_well_in_both_lists():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "c"]], 3) == ["b", "a", "c"]
+    assert reciprocal_rank_fusion([], 3) == []
+
+
+def test_rewrite_runs_during_retrieval_and_results_are_merged(rewrites):
+    rewrites["date night"] = "romantic comedy"
+    collection = FakeCollection({"date night": [1, 2, 3], "romantic comedy": [3, 4, 5]})
+    usage = {}
+
+    start = time.monotonic()
+    query_string, response = recommend(collection, "date night", usage=usage)
+    elapsed = time.monotonic() - start
+
+    (speculative, rewritten, generation) = collection.calls
+    assert speculative[:2] == ("near_text", "date night")
+    # The rewrite started before the speculative retrieval finished
+    assert rewrites["started"][0] < speculative[2] + RETRIEVAL_SECONDS
+    assert rewritten[:2] == ("near_text", "romantic comedy")
+    assert generation[:2] == ("fetch_objects", "task")
+    # Rewrite (0.1 s) + both retrievals in sequence would take 0.5 s
+    assert elapsed < RETRIEVAL_SECONDS * 2 + RETRIEVAL_SECONDS / 2
+
+    assert query_string == "romantic comedy"
+    # Fused: movie 3 is in both result sets, then the best of each, the rewritten query's first
+    assert [o.properties["movie_id"] for o in response.objects] == [3, 1, 4, 2]
+    assert usage == {"input_tokens": 10}
+    assert rewrite_cache.get("date night") == "romantic comedy"
+
+
+def test_late_rewrite_is_not_waited_for_but_cached(rewrites):
+    rewrites["seconds"] = RETRIEVAL_SECONDS * 2
+    rewrites["road trip"] = "adventure"
+    collection = FakeCollection({"road trip": [1, 2], "adventure": [7]})
+
+    query_string, response = recommend(collection, "road trip")
+    assert query_string == "road trip"
+    assert [o.properties["movie_id"] for o in response.objects] == [1, 2]
+    assert [call[0] for call in collection.calls] == ["near_text", "fetch_objects"]
+
+    time.sleep(RETRIEVAL_SECONDS * 2)
+    assert rewrite_cache.get("road trip") == "adventure"
+    collection.calls.clear()
+    query_string, _ = recommend(collection, "road trip")
+    assert query_string == "adventure"
+    assert [call[:2] for call in collection.calls] == [("near_text", "adventure")]
+
+
+def test_without_a_grouped_task_the_merged_retrieval_is_returned(rewrites):
+    rewrites["rainy day"] = "cozy"
+    collection = FakeCollection({"rainy day": [1], "cozy": [2]})
+    _, response = recommend(collection, "rainy day", grouped_task=None)
+    assert [o.properties["movie_id"] for o in response.objects] == [2, 1]
+    assert [call[0] for call in collection.calls] == ["near_text", "near_text"]
+
+
+def test_concurrent_misses_share_one_rewrite(rewrites):
+    rewrites["seconds"] = RETRIEVAL_SECONDS * 2
+    rewrites["party"] = "comedy"
+    collection = FakeCollection({"party": [1]})
+    threads = [threading.Thread(target=recommend, args=(collection, "party")) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    time.sleep(RETRIEVAL_SECONDS * 2)
+    assert len(rewrites["started"]) == 1
@@ -0,0 +1,95 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from _dev_0_preproc import _clusters, find_near_duplicates, minhash_signatures, remove_near_duplicates
+
+
+WORDS = (
+    "agent city night storm family secret river war island letter train doctor ship winter "
+    "detective village signal mountain daughter soldier engine garden mirror circus harbor"
+).split()
+
+WICK = (
+    "An ex-hitman comes out of retirement to track down the gangsters that took everything "
+    "from him after they killed the puppy his late wife left him"
+)
+PLACEHOLDER = "We don't have an overview translated in English yet, help expand our database by adding one."
+
+
+def random_overview(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(25))
+
+
+def make_df(movies: list[tuple[str, str, int, int]], filler: int = 200) -> pd.DataFrame:
+    """Movies as (title, overview, year, vote_count), plus unrelated ones."""
+    rng = random.Random(0)
+    movies = movies + [(f"Filler {i}", random_overview(rng), 2000, 1) for i in range(filler)]
+    return pd.DataFrame(
+        {
+            "id": range(1, len(movies) + 1),
+            "title": [title for title, _, _, _ in movies],
+            "overview": [overview for _, overview, _, _ in movies],
+            "year": [year for _, _, year, _ in movies],
+            "vote_count": [votes for _, _, _, votes in movies],
+            "revenue": 0,
+        }
+    )
+
+
+def clustered_titles(df: pd.DataFrame) -> list[set]:
+    report = find_near_duplicates(df)
+    return sorted((set(group["title"]) for _, group in report.groupby("cluster")), key=sorted)
+
+
+def test_identical_texts_have_identical_signatures():
+    signatures, has_shingles = minhash_signatures([WICK, WICK.upper(), "two words", ""])
+    assert (signatures[0] == signatures[1]).all()
+    assert has_shingles.tolist() == [True, True, False, False]
+
+
+def test_clusters_join_pairs_transitively():
+    labels = _clusters(6, np.array([[0, 2], [2, 4], [1, 5]]))
+    assert labels.tolist() == [0, 1, 0, 3, 0, 1]
+
+
+def test_re_releases_are_clustered_and_the_most_voted_is_kept():
+    df = make_df(
+        [
+            ("John Wick", WICK, 2014, 9000),
+            ("John Wick (Re-release)", WICK + ".", 2019, 40),
+            ("John Wick: Director's Cut", WICK + " and his car", 2014, 300),
+        ]
+    )
+    report = find_near_duplicates(df)
+    assert set(report["title"]) == {"John Wick", "John Wick (Re-release)", "John Wick: Director's Cut"}
+    assert report["cluster"].nunique() == 1
+    assert report.loc[report["kept"], "title"].tolist() == ["John Wick"]
+
+    deduplicated = remove_near_duplicates(df)
+    assert len(deduplicated) == len(df) - 2
+    assert "John Wick" in set(deduplicated["title"])
+
+
+def test_translations_released_the_same_year_are_clustered():
+    df = make_df([("The Hitman", WICK, 2014, 10), ("Der Auftragsmörder", WICK, 2015, 5)])
+    assert clustered_titles(df) == [{"The Hitman", "Der Auftragsmörder"}]
+
+
+def test_same_overview_without_a_second_signal_is_not_clustered():
+    df = make_df([("The Hitman", WICK, 1975, 10), ("Puppy Love", WICK, 2014, 5)])
+    assert clustered_titles(df) == []
+
+
+@pytest.mark.parametrize(
+    "overview",
+    ["A documentary about war.", "No overview found."],
+)
+def test_short_overviews_are_not_clustered(overview):
+    df = make_df([("Battlefields", overview, 2001, 10), ("Battlefields II", overview, 2001, 5)])
+    assert clustered_titles(df) == []
+
+
+def test_placeholder_overviews_are_not_clustered():
+    df = make_df([(f"Obscure Film {i}", PLACEHOLDER, 2001, i) for i in range(6)])
+    assert clustered_titles(df) == []
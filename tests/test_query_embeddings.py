@@ -0,0 +1,138 @@
+import importlib.util
+import os
+import time
+import uuid
+import zlib
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from metrics import ERRORS
+from query_embeddings import QueryEmbeddingCache, near_query
+
+
+def embed(text: str) -> np.ndarray:
+    """A deterministic stand-in for the model: a random unit vector per text."""
+    vector = np.random.default_rng(zlib.crc32(text.encode())).normal(size=64).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        cache = QueryEmbeddingCache(tmp_path / "query_embeddings.sqlite", embed=embed, **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache._executor.shutdown(wait=True)
+
+
+class FakeQuery:
+    """A collection query API over a few objects, where near_text embeds with `server_embed`."""
+
+    def __init__(self, server_embed):
+        self.server_embed = server_embed
+        self.objects = [(uuid.UUID(int=i), embed(f"movie {i}")) for i in range(20)]
+        self.calls = []
+
+    def near_text(self, query, **kwargs):
+        self.calls.append("near_text")
+        return self.near_vector(self.server_embed(query), record=False, **kwargs)
+
+    def near_vector(self, near_vector, limit=3, record=True, **kwargs):
+        if record:
+            self.calls.append("near_vector")
+        distances = [(1 - float(vector @ near_vector), id_) for id_, vector in self.objects]
+        return SimpleNamespace(
+            objects=[
+                SimpleNamespace(uuid=id_, metadata=SimpleNamespace(distance=distance))
+                for distance, id_ in sorted(distances)[:limit]
+            ]
+        )
+
+
+def error_count(category: str) -> float:
+    return ERRORS._values.get(("background", category), 0.0)
+
+
+def test_texts_are_cached_exactly_as_sent(make_cache):
+    cache = make_cache()
+    cache.put("Space", embed("Space"))
+    assert cache.get("Space") is not None
+    assert cache.get("space") is None
+
+
+def test_vectors_persist_on_disk(make_cache):
+    make_cache().put("heist movie", embed("heist movie"))
+    cache = make_cache()
+    assert np.array_equal(cache.get("heist movie"), embed("heist movie"))
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_no_vectors_are_served_until_verified(make_cache):
+    cache = make_cache()
+    cache.put("heist movie", embed("heist movie"))
+    assert cache.get_or_schedule("heist movie") is None
+    assert cache.verify(SimpleNamespace(query=FakeQuery(embed)))
+    assert cache.get_or_schedule("heist movie") is not None
+
+
+def test_verification_fails_when_the_server_embeds_differently(make_cache):
+    cache = make_cache()
+    before = error_count("internal")
+    # E.g. a different query prefix
+    assert not cache.verify(SimpleNamespace(query=FakeQuery(lambda text: embed(text + "!"))))
+    assert error_count("internal") == before + 1
+    assert cache.get_or_schedule("heist movie") is None
+
+
+def test_misses_are_embedded_in_the_background(make_cache):
+    cache = make_cache()
+    cache.verified = True
+    query = FakeQuery(embed)
+    near_query(query, "heist movie", cache)
+    cache._executor.submit(lambda: None).result()  # Wait for the background embedding
+    near_query(query, "heist movie", cache)
+    assert query.calls == ["near_text", "near_vector"]
+
+
+def test_embedding_failures_are_counted(make_cache):
+    def fail(text):
+        raise RuntimeError("model not available")
+
+    cache = make_cache()
+    cache.embed = fail
+    cache.verified = True
+    before = error_count("internal")
+    assert cache.get_or_schedule("heist movie") is None
+    cache._executor.submit(lambda: None).result()
+    assert error_count("internal") == before + 1
+
+
+def test_pruning_evicts_the_least_recently_used(make_cache):
+    cache = make_cache(capacity=1, disk_capacity=10)  # Prunes on every write
+    for i in range(10):
+        cache.put(f"query {i}", embed(f"query {i}"))
+        time.sleep(0.001)
+    assert cache.get("query 0") is not None  # A disk hit, which makes it the most recently used
+    cache.put("query 10", embed("query 10"))
+
+    texts = {text for (text,) in cache._db().execute("SELECT text FROM query_embeddings")}
+    assert "query 0" in texts
+    assert not texts & {"query 1", "query 2"}
+    assert len(texts) == 9
+
+
+@pytest.mark.skipif(
+    not (os.getenv("WCD_STUDENT_URL") and importlib.util.find_spec("sentence_transformers")),
+    reason="needs a Weaviate cluster (WCD_STUDENT_URL) and the `semantic` extra",
+)
+def test_local_vectors_match_the_collection_vectorizer(tmp_path):
+    from helpers import CollectionName, connect_to_weaviate
+
+    cache = QueryEmbeddingCache(tmp_path / "query_embeddings.sqlite")
+    with connect_to_weaviate() as client:
+        assert cache.verify(client.collections.use(CollectionName.MOVIES))
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+import pytest
+from query_filters import (
+    YearFilter,
+    bucket_year_range,
+    build_year_filter,
+    fetch_year_filtered,
+    year_range_filter,
+)
+
+
+def movies(years: list[int]):
+    return [SimpleNamespace(properties={"movie_id": i, "year": year}) for i, year in enumerate(years)]
+
+
+class FakeQuery:
+    """Results of a query as `fetch(offset, limit)`, recording the calls made."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = []
+
+    def __call__(self, offset: int, limit: int):
+        self.calls.append((offset, limit))
+        return self.objects[offset : offset + limit]
+
+
+@pytest.mark.parametrize(
+    "year_min, year_max, expected",
+    [
+        (1994, 2003, (1990, 2009)),
+        (1990, 1999, (1990, 1999)),
+        (None, 2003, (None, 2009)),
+        (1994, None, (1990, None)),
+        (None, None, (None, None)),
+    ],
+)
+def test_bucket_year_range(year_min, year_max, expected):
+    assert bucket_year_range(year_min, year_max) == expected
+
+
+def test_year_range_filters_are_interned():
+    assert year_range_filter(1990, 1999) is year_range_filter(1990, 1999)
+    assert year_range_filter(None, None) is None
+
+
+def test_unbucketed_filter_is_passed_through():
+    exact = year_range_filter(1994, 2003)
+    assert build_year_filter(1994, 2003, exact, bucketed=False) == YearFilter(exact)
+
+
+def test_bucketed_filter_covers_whole_decades():
+    year_filter = build_year_filter(1994, 2003, year_range_filter(1994, 2003), bucketed=True)
+    assert year_filter.filters is year_range_filter(1990, 2009)
+    assert [m.properties["year"] for m in year_filter.apply(movies([1990, 1994, 2003, 2009]))] == [1994, 2003]
+
+
+def test_bucket_aligned_range_needs_no_post_filter():
+    exact = year_range_filter(1990, 1999)
+    assert build_year_filter(1990, 1999, exact, bucketed=True) == YearFilter(exact)
+
+
+def test_fetch_without_post_filter_is_one_query_for_the_page():
+    query = FakeQuery(movies([2000] * 50))
+    page = fetch_year_filtered(query, YearFilter(None), offset=10, limit=5)
+    assert [m.properties["movie_id"] for m in page] == [10, 11, 12, 13, 14]
+    assert query.calls == [(10, 5)]
+
+
+def test_fetch_fills_pages_despite_post_filtering():
+    # Most results of the decade query fall outside the requested years
+    objects = movies([1990, 1991, 1992, 1995] * 25)
+    year_filter = build_year_filter(1995, 1995, None, bucketed=True)
+    query = FakeQuery(objects)
+
+    expected = [m for m in objects if m.properties["year"] == 1995]
+    assert fetch_year_filtered(query, year_filter, offset=0, limit=10) == expected[:10]
+    assert fetch_year_filtered(query, year_filter, offset=10, limit=10) == expected[10:20]
+    # Pages past the end are partial or empty, once the results run out
+    assert fetch_year_filtered(query, year_filter, offset=20, limit=10) == expected[20:]
+    assert fetch_year_filtered(query, year_filter, offset=30, limit=10) == []
+
+
+def test_fetch_stops_at_the_maximum_result_window():
+    # Sparse matches: the page can't be filled within the first 100 results
+    objects = movies([1990] * 95 + [1995] * 10)
+    year_filter = build_year_filter(1995, 1995, None, bucketed=True)
+    query = FakeQuery(objects)
+
+    page = fetch_year_filtered(query, year_filter, offset=0, limit=10, max_results=100)
+    assert [m.properties["year"] for m in page] == [1995] * 5
+    assert max(offset + limit for offset, limit in query.calls) == 100
+
+
+def test_unfiltered_pages_are_cut_at_the_maximum_result_window():
+    query = FakeQuery(movies([2000] * 200))
+    assert len(fetch_year_filtered(query, YearFilter(None), offset=95, limit=10, max_results=100)) == 5
+    assert fetch_year_filtered(query, YearFilter(None), offset=100, limit=10, max_results=100) == []
+    assert query.calls == [(95, 5)]
@@ -0,0 +1,105 @@
+import json
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.testclient import TestClient
+from query_log import (
+    REDACTED,
+    REPLAY_HEADER,
+    QueryLogger,
+    QueryLogMiddleware,
+    entry_params,
+    log_files,
+    read_entries,
+    top_requests,
+)
+
+
+def make_client(logger: QueryLogger, **options) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(QueryLogMiddleware, logger=logger, **options)
+
+    @app.get("/search")
+    def search(q: str, page: int = 1):
+        return {}
+
+    @app.get("/facets")
+    def facets(genre: Optional[list[str]] = Query(None)):
+        return {}
+
+    @app.get("/recommend")
+    def recommend(occasion: str):
+        raise HTTPException(status_code=429)
+
+    @app.get("/stats")
+    def stats():
+        return {}
+
+    return TestClient(app)
+
+
+def logged(logger: QueryLogger, *requests, **options) -> list[dict]:
+    """Send `requests` ((path, params) or (path, params, headers)), and return what was logged."""
+    logger.start()
+    client = make_client(logger, **options)
+    for path, params, *headers in requests:
+        client.get(path, params=params, headers=headers[0] if headers else None)
+    logger.stop()
+    return list(read_entries(log_files(logger.directory)))
+
+
+def test_entries_record_the_request(tmp_path):
+    [entry] = logged(QueryLogger(tmp_path), ("/search", {"q": "heist", "page": 2}), sample_rate=1.0)
+    assert entry["method"] == "GET"
+    assert (entry["path"], entry["route"], entry["status"]) == ("/search", "/search", 200)
+    assert entry_params(entry) == [("q", "heist"), ("page", "2")]
+    assert entry["duration_ms"] >= 0 and entry["ts"] > 0
+
+
+def test_only_data_routes_and_non_replayed_requests_are_logged(tmp_path):
+    entries = logged(
+        QueryLogger(tmp_path),
+        ("/stats", {}),
+        ("/search", {"q": "replayed"}, {REPLAY_HEADER.decode(): "warm-up"}),
+        ("/facets", [("genre", "Drama"), ("genre", "Comedy")]),
+        sample_rate=1.0,
+    )
+    assert [(entry["path"], entry_params(entry)) for entry in entries] == [
+        ("/facets", [("genre", "Drama"), ("genre", "Comedy")])
+    ]
+
+
+def test_sampling(tmp_path):
+    assert logged(QueryLogger(tmp_path), ("/search", {"q": "heist"}), sample_rate=0.0) == []
+
+
+def test_headers_and_redacted_params_are_not_logged(tmp_path):
+    [entry] = logged(
+        QueryLogger(tmp_path),
+        ("/recommend", {"occasion": "my sister Jane's birthday"}, {"Authorization": "Bearer secret"}),
+        sample_rate=1.0,
+        redacted_params=["occasion"],
+    )
+    assert entry_params(entry) == [("occasion", REDACTED)]
+    assert entry["status"] == 429
+    line = log_files(tmp_path)[0].read_text()
+    assert "Jane" not in line and "secret" not in line
+
+
+def test_top_requests_skip_failed_redacted_and_other_routes():
+    entries = [
+        {"path": "/search", "route": "/search", "params": [["q", "heist"]], "status": 200},
+        {"path": "/search", "route": "/search", "params": {"q": "heist"}},  # Older logs stored a dict
+        {"path": "/search", "route": "/search", "params": [["q", "space"]], "status": 200},
+        {"path": "/search", "route": "/search", "params": [["q", "space"]], "status": 502},
+        {"path": "/recommend", "route": "/recommend", "params": [["occasion", REDACTED]], "status": 200},
+        {"path": "/recommend", "route": "/recommend", "params": [["occasion", REDACTED]], "status": 200},
+        {"path": "/stats", "route": "/stats", "params": [], "status": 200},
+    ]
+    assert top_requests(entries, 5) == [("/search", [("q", "heist")]), ("/search", [("q", "space")])]
+    assert top_requests(entries, 5, routes=["/recommend"]) == []
+
+
+def test_read_entries_skips_partial_lines(tmp_path):
+    path = tmp_path / "queries.1.jsonl"
+    path.write_text(json.dumps({"path": "/search"}) + '\n{"path": "/sea')
+    assert list(read_entries([path])) == [{"path": "/search"}]
@@ -0,0 +1,95 @@
+import json
+import pytest
+from rag_context import build_context, context_prompt, estimate_tokens, render_movie, truncate_to_tokens
+
+
+WORDS = "one two three four five six seven eight nine ten".split()
+
+
+def movie(title: str, overview: str = None, **properties) -> dict:
+    return {"title": title, "overview": overview, **properties}
+
+
+def test_estimate_tokens_rounds_up_at_four_chars_per_token():
+    assert [estimate_tokens("x" * n) for n in (0, 1, 4, 5, 8)] == [0, 1, 1, 2, 2]
+
+
+def test_truncate_keeps_short_text():
+    assert truncate_to_tokens("x" * 40, 10) == "x" * 40
+
+
+def test_truncate_at_a_sentence_end_past_half_the_budget():
+    text = "A" * 25 + ". " + "b" * 30
+    assert truncate_to_tokens(text, 10) == "A" * 25 + "."
+
+
+def test_truncate_at_a_word_when_the_sentence_end_is_too_early():
+    assert truncate_to_tokens("Hi. one two three four five", 3) == "Hi. one two…"
+    assert truncate_to_tokens("alpha, betagamma delta", 3) == "alpha…"
+
+
+def test_render_movie():
+    alien = {"title": "Alien", "year": 1979, "genres": ["Horror", "Science Fiction"], "overview": "In space."}
+    assert render_movie(alien) == "- Alien (1979) [Horror, Science Fiction]: In space."
+    assert render_movie({"title": "Alien"}) == "- Alien"
+
+
+def test_only_context_properties_are_kept():
+    retrieved = movie("Alien", "In space.", year=1979, popularity=50.0, poster="/alien.jpg")
+    context = build_context([retrieved], budget_tokens=100)
+    assert context.text == "- Alien (1979): In space."
+    assert context.movies == [retrieved]
+    assert context.full_tokens == estimate_tokens(json.dumps(retrieved))
+
+
+def test_budget_stops_at_the_first_movie_that_does_not_fit():
+    movies = [movie("Abcd"), movie("Efgh" * 5), movie("Ijkl")]  # "- Abcd" is 2 tokens, + 1 for the newline
+    context = build_context(movies, budget_tokens=9)
+    assert [m["title"] for m in context.movies] == ["Abcd"]
+    assert context.tokens == 3
+    assert len(build_context(movies, budget_tokens=3 + 7 + 3).movies) == 3
+
+
+def test_best_movie_is_kept_over_budget():
+    context = build_context([movie("Abcd" * 10), movie("Efgh")], budget_tokens=0)
+    assert [m["title"] for m in context.movies] == ["Abcd" * 10]
+    assert context.tokens == estimate_tokens("- " + "Abcd" * 10) + 1
+
+
+@pytest.mark.parametrize("threshold, duplicates", [(0.8, 0), (7 / 9, 1), (0.5, 1)])
+def test_near_duplicate_threshold(threshold, duplicates):
+    # 8 shingles of 3 words each, 7 shared: a Jaccard similarity of 7/9
+    near = WORDS[:-1] + ["eleven"]
+    movies = [movie("First", " ".join(WORDS)), movie("Second", " ".join(near))]
+    context = build_context(movies, budget_tokens=1000, duplicate_threshold=threshold)
+    assert context.duplicates == duplicates
+    assert len(context.movies) == 2 - duplicates
+
+
+def test_duplicates_are_matched_ignoring_case_and_punctuation_and_keep_the_better_ranked():
+    movies = [
+        movie("Original", "A heist, in the city!"),
+        movie("Remake", "a HEIST in the city"),
+        movie("No overview"),
+        movie("Also no overview"),
+    ]
+    context = build_context(movies, budget_tokens=1000)
+    assert [m["title"] for m in context.movies] == ["Original", "No overview", "Also no overview"]
+    assert context.duplicates == 1
+
+
+def test_long_overviews_are_truncated_in_the_context_only():
+    overview = " ".join(WORDS * 10)
+    retrieved = movie("Long", overview)
+    context = build_context([retrieved, movie("Short", "Short.")], budget_tokens=1000, max_overview_tokens=5)
+    assert context.truncated == 1
+    assert context.text.splitlines()[0] == "- Long: " + truncate_to_tokens(overview, 5)
+    assert context.movies[0]["overview"] == overview
+    assert context.tokens_saved == context.full_tokens - context.tokens > 0
+
+
+def test_context_prompt():
+    context = build_context([movie("Alien")], budget_tokens=100)
+    assert context_prompt("Recommend one.", context) == (
+        "Recommend one.\n========== MOVIES ==========\n- Alien\n========== END MOVIES ==========\n"
+    )
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+from ranking import weighted_popularity_rerank
+
+
+def movie(title: str, score: float, popularity: float):
+    return SimpleNamespace(
+        properties={"title": title, "popularity": popularity}, metadata=SimpleNamespace(score=score)
+    )
+
+
+def titles(movies) -> list[str]:
+    return [m.properties["title"] for m in movies]
+
+
+CANDIDATES = [
+    movie("relevant", score=0.9, popularity=1.0),
+    movie("balanced", score=0.6, popularity=50.0),
+    movie("popular", score=0.1, popularity=500.0),
+]
+
+
+def test_weight_zero_keeps_relevance_order():
+    assert titles(weighted_popularity_rerank(CANDIDATES, 0.0, 3)) == ["relevant", "balanced", "popular"]
+
+
+def test_weight_one_orders_by_popularity():
+    assert titles(weighted_popularity_rerank(CANDIDATES, 1.0, 3)) == ["popular", "balanced", "relevant"]
+
+
+def test_blend_favours_candidates_strong_on_both():
+    assert titles(weighted_popularity_rerank(CANDIDATES, 0.5, 1)) == ["balanced"]
+
+
+def test_limit_and_empty_pool():
+    assert len(weighted_popularity_rerank(CANDIDATES, 0.5, 2)) == 2
+    assert weighted_popularity_rerank([], 0.5, 10) == []
+
+
+def test_missing_scores_and_popularity_count_as_zero():
+    candidates = [movie("none", score=None, popularity=None), movie("some", score=0.5, popularity=10.0)]
+    assert titles(weighted_popularity_rerank(candidates, 0.5, 2)) == ["some", "none"]
@@ -0,0 +1,84 @@
+import time
+import numpy as np
+import pytest
+from embeddings import hashing_embed, normalize_text
+from semantic_cache import SemanticCache
+
+
+# Occasions as fixed unit vectors, so similarities are exact: cos(a, b) = 0.95, cos(a, c) = 0
+VECTORS = {
+    "date night": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+    "romantic evening": np.array([0.95, np.sqrt(1 - 0.95**2), 0.0], dtype=np.float32),
+    "kids party": np.array([0.0, 0.0, 1.0], dtype=np.float32),
+}
+
+
+def embed(text: str) -> np.ndarray:
+    return VECTORS[text]
+
+
+def make_cache(**kwargs) -> SemanticCache:
+    return SemanticCache(embed=embed, **kwargs)
+
+
+def test_similar_keys_hit_above_the_threshold():
+    cache = make_cache(threshold=0.9)
+    cache.put("Date night!", "recommendation", tokens=100)
+    assert cache.get("date night") == "recommendation"
+    assert cache.get("romantic evening") == "recommendation"
+    assert cache.get("kids party") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["saved_llm_tokens"] == 200
+
+
+def test_keys_below_the_threshold_miss():
+    cache = make_cache(threshold=0.96)
+    cache.put("date night", "recommendation")
+    assert cache.get("romantic evening") is None
+    assert cache.get("date night") == "recommendation"
+
+
+def test_entries_expire_after_the_ttl():
+    cache = make_cache(ttl=0.05)
+    cache.put("date night", "recommendation")
+    assert cache.get("date night") == "recommendation"
+    time.sleep(0.06)
+    assert cache.get("date night") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(capacity=2)
+    cache.put("date night", "a")
+    cache.put("kids party", "b")
+    cache.get("date night")
+    cache.put("romantic evening", "c")  # Evicts "kids party", the least recently used
+    assert cache.get("kids party") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_new_generation_clears_the_cache():
+    generation = [1]
+    calls = []
+
+    def current_generation():
+        calls.append(1)
+        return generation[0]
+
+    cache = make_cache(generation=current_generation, generation_check_interval=0.05)
+    cache.put("date night", "old data")
+    generation[0] = 2
+    # The generation is only checked every generation_check_interval seconds
+    assert cache.get("date night") == "old data"
+    assert len(calls) == 1
+    time.sleep(0.06)
+    assert cache.get("date night") is None
+    cache.put("date night", "new data")
+    assert cache.get("date night") == "new data"
+
+
+@pytest.mark.parametrize("text", ["Date night!", "  date   NIGHT "])
+def test_hashing_embeddings_are_normalized(text):
+    vector = hashing_embed(text)
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+    assert np.array_equal(vector, hashing_embed(normalize_text(text)))
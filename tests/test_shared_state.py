@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pytest
+import shared_state
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    """Shared state under tmp_path, for a checkout whose data directory is tmp_path / "data"."""
+    generation_file = tmp_path / "data" / ".ingest_generation"
+    generation_file.parent.mkdir()
+    generation_file.write_text("1")
+    monkeypatch.setattr(shared_state, "SHARED_STATE_DIR", tmp_path / "shm")
+    monkeypatch.setattr(shared_state, "INGEST_GENERATION_FILE", generation_file)
+    monkeypatch.setattr(shared_state, "OWNER", {"collection": "Movies", "data_dir": str(generation_file.parent)})
+    return generation_file
+
+
+def test_bytes_round_trip(state):
+    shared_state.publish_bytes("info", 1, b"one")
+    assert shared_state.load_bytes("info", 1) == b"one"
+    assert shared_state.load_bytes("info", 2) is None
+    assert shared_state.snapshot_age("info", 1) >= 0
+    assert shared_state.load_bytes("info", 1, max_age=-1) is None
+
+
+def test_arrays_round_trip_and_are_not_replaced(state):
+    shared_state.publish_arrays("facets", 1, {"counts": np.arange(4)})
+    shared_state.publish_arrays("facets", 1, {"counts": np.arange(4)})
+    arrays = shared_state.load_arrays("facets", 1)
+    np.testing.assert_array_equal(arrays["counts"], np.arange(4))
+    assert not arrays["counts"].flags.writeable
+    assert not list(shared_state._state_dir().glob("*.tmp"))
+
+
+def test_publishing_a_generation_prunes_older_ones(state):
+    shared_state.publish_arrays("facets", 1, {"counts": np.arange(4)})
+    state.write_text("2")
+    shared_state.publish_arrays("facets", 2, {"counts": np.arange(2)})
+    assert [path.name for path in shared_state._state_dir().glob("facets.*")] == [
+        shared_state._path("facets", 2).name
+    ]
+
+
+def test_another_checkout_does_not_attach(state, monkeypatch, tmp_path):
+    shared_state.publish_bytes("info", 1, b"one")
+    monkeypatch.setattr(shared_state, "OWNER", {"collection": "Movies", "data_dir": str(tmp_path / "other")})
+    assert shared_state.load_bytes("info", 1) is None
+    assert shared_state.snapshot_age("info", 1) is None
+
+
+def test_tampered_owner_does_not_attach(state):
+    shared_state.publish_arrays("facets", 1, {"counts": np.arange(4)})
+    (shared_state._state_dir() / shared_state.OWNER_FILE).write_text("{}")
+    assert shared_state.load_arrays("facets", 1) is None
+
+
+def test_reset_data_directory_does_not_reuse_snapshots(state):
+    shared_state.publish_bytes("info", 1, b"before reset")
+    state.unlink()
+    state.write_text("1")
+    os.utime(state, ns=(1, 1))  # A new file even if the mtime resolution is coarse
+    assert shared_state.load_bytes("info", 1) is None
@@ -0,0 +1,57 @@
+import suggest
+from suggest import TitleIndex, normalize_title
+
+
+MOVIES = [
+    {"title": "The Dark Knight", "popularity": 90.0},
+    {"title": "Knight and Day", "popularity": 30.0},
+    {"title": "Amélie", "popularity": 40.0},
+    {"title": "Dark City", "popularity": 10.0},
+    {"title": "Up", "popularity": 50.0},
+    {"title": "Upside Down: Up Up", "popularity": 5.0},
+    {"title": None, "popularity": 1.0},
+]
+
+
+def titles(movies) -> list[str]:
+    return [movie["title"] for movie in movies]
+
+
+def test_normalize_title():
+    assert normalize_title("  Amélie!  ") == "amelie"
+    assert normalize_title("Upside Down: Up Up") == "upside down up up"
+
+
+def test_matches_any_word_most_popular_first():
+    index = TitleIndex(MOVIES)
+    assert titles(index.suggest("kni")) == ["The Dark Knight", "Knight and Day"]
+    assert titles(index.suggest("dark")) == ["The Dark Knight", "Dark City"]
+    assert titles(index.suggest("dark k")) == ["The Dark Knight"]
+
+
+def test_input_is_normalized():
+    index = TitleIndex(MOVIES)
+    assert titles(index.suggest("AME")) == ["Amélie"]
+    assert index.suggest("  ") == []
+    assert index.suggest("zzz") == []
+
+
+def test_each_movie_is_suggested_once():
+    index = TitleIndex(MOVIES)
+    assert titles(index.suggest("up")) == ["Up", "Upside Down: Up Up"]
+
+
+def test_precomputed_prefixes_match_searching():
+    index = TitleIndex(MOVIES, top_k=3)
+    for prefix in ["d", "da", "k", "u", "up", "t", "th"]:
+        assert len(prefix) <= suggest.PRECOMPUTED_PREFIX_LENGTH
+        for limit in (1, 3):
+            searched = [index.movies[rank]["title"] for rank in index._search(prefix, limit)]
+            assert titles(index.suggest(prefix, limit)) == searched
+    # Beyond top_k, short prefixes are searched ("dark", "day", "down")
+    assert titles(index.suggest("d", limit=10)) == [
+        "The Dark Knight",
+        "Knight and Day",
+        "Dark City",
+        "Upside Down: Up Up",
+    ]
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from vector_store import (
+    quantize,
+    read_vector_sidecars,
+    remove_vector_sidecars,
+    sidecar_paths,
+    write_vector_sidecars,
+)
+
+
+def make_vectors(rows: int = 50, dims: int = 32, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(rows, dims)).astype(np.float32)
+
+
+def test_float32_is_exact():
+    vectors = make_vectors()
+    np.testing.assert_array_equal(quantize(vectors, "float32").to_float32(), vectors)
+
+
+@pytest.mark.parametrize("dtype, relative_error", [("float16", 1e-3), ("int8", 1e-2)])
+def test_quantization_error(dtype, relative_error):
+    vectors = make_vectors()
+    quantized = quantize(vectors, dtype)
+    assert quantized.data.dtype == np.dtype(dtype)
+    assert (quantized.scales is not None) == (dtype == "int8")
+    error = np.abs(quantized.to_float32() - vectors).max(axis=1) / np.abs(vectors).max(axis=1)
+    assert error.max() < relative_error
+    np.testing.assert_array_equal(quantized.row(3), quantized.to_float32()[3])
+
+
+def test_int8_zero_vector():
+    vectors = np.zeros((2, 4), dtype=np.float32)
+    vectors[1, 0] = -1.0
+    quantized = quantize(vectors, "int8")
+    np.testing.assert_array_equal(quantized.to_float32(), vectors)
+    assert quantized.data[1, 0] == -127
+
+
+def test_unsupported_dtype():
+    with pytest.raises(ValueError, match="bfloat16"):
+        quantize(make_vectors(), "bfloat16")
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_sidecar_round_trip(tmp_path, dtype):
+    parquet_path = tmp_path / "movies_0.parquet"
+    vectors = {"default": make_vectors(seed=1), "title": make_vectors(dims=8, seed=2)}
+    write_vector_sidecars(parquet_path, vectors, dtype=dtype)
+
+    loaded = read_vector_sidecars(parquet_path)
+    assert list(loaded) == ["default", "title"]
+    for name, matrix in vectors.items():
+        assert isinstance(loaded[name].data, np.memmap)
+        np.testing.assert_array_equal(loaded[name].to_float32(), quantize(matrix, dtype).to_float32())
+    in_memory = read_vector_sidecars(parquet_path, mmap=False)
+    assert not isinstance(in_memory["default"].data, np.memmap)
+
+
+def test_rewriting_without_int8_removes_scales(tmp_path):
+    parquet_path = tmp_path / "movies_0.parquet"
+    write_vector_sidecars(parquet_path, {"default": make_vectors()}, dtype="int8")
+    _, scales_path = sidecar_paths(parquet_path, "default")
+    assert scales_path.exists()
+    write_vector_sidecars(parquet_path, {"default": make_vectors()}, dtype="float16")
+    assert not scales_path.exists()
+    assert read_vector_sidecars(parquet_path)["default"].scales is None
+
+
+def test_missing_and_removed_sidecars(tmp_path):
+    parquet_path = tmp_path / "movies_0.parquet"
+    assert read_vector_sidecars(parquet_path) is None
+    write_vector_sidecars(parquet_path, {"default": make_vectors()}, dtype="int8")
+    remove_vector_sidecars(parquet_path)
+    assert read_vector_sidecars(parquet_path) is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,110 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Union
+import numpy as np
+
+
+# Storage dtype for exported vectors: "float32" (exact), or, opting in to lossy quantization,
+# "float16" (half the size, ~1e-3 relative error) or "int8" (a quarter, with a per-vector scale).
+# "none" keeps vectors inline in the parquet files.
+VECTOR_SIDECAR_DTYPE = os.getenv("VECTOR_SIDECAR_DTYPE", "float32")
+SIDECAR_DTYPES = ("float32", "float16", "int8")
+
+
+class Vectors(NamedTuple):
+    """One named vector for every row of a parquet file, possibly memory-mapped and quantized."""
+
+    data: np.ndarray  # (rows, dims), float32 / float16 / int8
+    scales: Optional[np.ndarray] = None  # (rows,) float32, int8 only
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def row(self, i: int) -> np.ndarray:
+        """Row `i` as float32."""
+        vector = self.data[i].astype(np.float32)
+        if self.scales is not None:
+            vector *= self.scales[i]
+        return vector
+
+    def to_float32(self) -> np.ndarray:
+        """All rows as a float32 matrix (in memory)."""
+        matrix = self.data.astype(np.float32)
+        if self.scales is not None:
+            matrix *= self.scales[:, None]
+        return matrix
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Vectors:
+    """Convert a float matrix to the storage `dtype`; int8 uses symmetric per-vector scaling."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        data = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return Vectors(data, scales.astype(np.float32))
+    if dtype not in SIDECAR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype {dtype!r}, expected one of {SIDECAR_DTYPES}")
+    return Vectors(vectors.astype(dtype))
+
+
+def sidecar_paths(parquet_path: Union[str, Path], name: str) -> tuple[Path, Path]:
+    """(vectors, scales) `.npy` paths for named vector `name` of a parquet file."""
+    stem = Path(parquet_path).with_suffix("")
+    return stem.with_name(f"{stem.name}.{name}.npy"), stem.with_name(f"{stem.name}.{name}.scales.npy")
+
+
+def _manifest_path(parquet_path: Union[str, Path]) -> Path:
+    stem = Path(parquet_path).with_suffix("")
+    return stem.with_name(f"{stem.name}.vectors.json")
+
+
+def write_vector_sidecars(
+    parquet_path: Union[str, Path],
+    vectors: Dict[str, np.ndarray],
+    dtype: str = VECTOR_SIDECAR_DTYPE,
+):
+    """
+    Write each named vector matrix (rows aligned with the parquet file) to its own `.npy` file,
+    plus a small manifest listing them. The manifest is written last, so readers never see a
+    partial set.
+    """
+    _manifest_path(parquet_path).unlink(missing_ok=True)
+    for name, matrix in vectors.items():
+        data_path, scales_path = sidecar_paths(parquet_path, name)
+        quantized = quantize(matrix, dtype)
+        np.save(data_path, quantized.data)
+        if quantized.scales is not None:
+            np.save(scales_path, quantized.scales)
+        else:
+            scales_path.unlink(missing_ok=True)
+    _manifest_path(parquet_path).write_text(json.dumps({"dtype": dtype, "names": list(vectors)}))
+
+
+def read_vector_sidecars(parquet_path: Union[str, Path], mmap: bool = True) -> Optional[Dict[str, Vectors]]:
+    """
+    Load the named vectors stored alongside a parquet file, memory-mapped by default (so only
+    the rows read are paged in), or None if the file has no sidecars.
+    """
+    manifest_path = _manifest_path(parquet_path)
+    if not manifest_path.exists():
+        return None
+    manifest = json.loads(manifest_path.read_text())
+    mmap_mode = "r" if mmap else None
+    vectors = {}
+    for name in manifest["names"]:
+        data_path, scales_path = sidecar_paths(parquet_path, name)
+        scales = np.load(scales_path, mmap_mode=mmap_mode) if manifest["dtype"] == "int8" else None
+        vectors[name] = Vectors(np.load(data_path, mmap_mode=mmap_mode), scales)
+    return vectors
+
+
+def remove_vector_sidecars(parquet_path: Union[str, Path]):
+    """Remove a parquet file's vector sidecars (e.g. when re-exporting with inline vectors)."""
+    manifest_path = _manifest_path(parquet_path)
+    if manifest_path.exists():
+        for name in json.loads(manifest_path.read_text())["names"]:
+            for path in sidecar_paths(parquet_path, name):
+                path.unlink(missing_ok=True)
+        manifest_path.unlink()